@@ -68,19 +68,26 @@ from merlin.models.tf.blocks.retrieval.matrix_factorization import (
 from merlin.models.tf.blocks.retrieval.two_tower import TwoTowerBlock
 from merlin.models.tf.blocks.sampling.base import ItemSampler
 from merlin.models.tf.blocks.sampling.cross_batch import (
+    AliasPopularitySampler,
     CachedCrossBatchSampler,
     CachedUniformSampler,
     PopularityBasedSampler,
 )
+from merlin.models.tf.blocks.sampling.hard_negative import HardNegativeSampler
 from merlin.models.tf.blocks.sampling.in_batch import InBatchSampler
 from merlin.models.tf.blocks.sampling.queue import FIFOQueue
 from merlin.models.tf.dataset import sample_batch
 from merlin.models.tf.features.continuous import ContinuousFeatures
 from merlin.models.tf.features.embedding import (
+    CompositionalTableConfig,
     ContinuousEmbedding,
+    DynamicVocabTableConfig,
     EmbeddingFeatures,
     EmbeddingOptions,
     FeatureConfig,
+    MemoryMappedTableConfig,
+    MixedDimensionTableConfig,
+    QuantizedTableConfig,
     SequenceEmbeddingFeatures,
     TableConfig,
 )
@@ -101,6 +108,7 @@ from merlin.models.tf.models.retrieval import (
     TwoTowerModel,
     YoutubeDNNRetrievalModel,
 )
+from merlin.models.tf.optimizers import LazyAdam, MultiOptimizer, RowWiseAdagrad
 from merlin.models.tf.prediction_tasks.base import ParallelPredictionBlock, PredictionTask
 from merlin.models.tf.prediction_tasks.classification import (
     BinaryClassificationTask,
@@ -147,6 +155,11 @@ __all__ = [
     "EmbeddingOptions",
     "FeatureConfig",
     "TableConfig",
+    "CompositionalTableConfig",
+    "MixedDimensionTableConfig",
+    "MemoryMappedTableConfig",
+    "DynamicVocabTableConfig",
+    "QuantizedTableConfig",
     "ParallelPredictionBlock",
     "TwoTowerBlock",
     "MatrixFactorizationBlock",
@@ -190,6 +203,8 @@ __all__ = [
     "CachedCrossBatchSampler",
     "CachedUniformSampler",
     "PopularityBasedSampler",
+    "AliasPopularitySampler",
+    "HardNegativeSampler",
     "FIFOQueue",
     "YoutubeDNNRetrievalModel",
     "TwoTowerModel",
@@ -199,6 +214,9 @@ __all__ = [
     "DeepFMModel",
     "losses",
     "LossType",
+    "LazyAdam",
+    "RowWiseAdagrad",
+    "MultiOptimizer",
     "sample_batch",
     "TensorInitializer",
 ]
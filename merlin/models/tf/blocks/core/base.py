@@ -17,14 +17,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence, Type, Union
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Sequence, Type, Union
 
 import tensorflow as tf
 from tensorflow.keras.layers import Layer
+from tensorflow.python.framework import ops
 
 from merlin.models.config.schema import SchemaMixin
+from merlin.models.tf.optimizers.multi import mark_embedding_variable
 from merlin.models.tf.typing import TabularData
 from merlin.models.tf.utils.mixins import ModelLikeBlock
+from merlin.models.tf.utils.tf_utils import untrack_variable
 from merlin.models.utils.registry import Registry
 from merlin.schema import Schema, Tags
 
@@ -88,6 +91,13 @@ class PredictionOutput(NamedTuple):
 class ModelContext(Layer):
     """ModelContext is used to store/retrieve public variables across blocks.
 
+    The features registered with `add_features` (e.g. the item ids required by
+    `ItemRetrievalScorer` and the masking blocks) are not copied into variables at
+    every step: the tensors passed to the last `call()` are kept in a per-call dict
+    and returned by `context[feature_name]`. The variables created for them in `build()`
+    are only placeholders, returned when the features are read outside of the
+    graph of that call (e.g. when the blocks are built or traced for saving).
+
     (This is created automatically in the model and doesn't need to be created manually.)
     """
 
@@ -97,12 +107,41 @@ class ModelContext(Layer):
         super(ModelContext, self).__init__(**kwargs)
         self._feature_names = feature_names
         self._feature_dtypes = feature_dtypes
-
-    def add_embedding_weight(self, name, **kwargs):
+        self._set_call_features({})
+        self._set_embedding_functions({})
+        self._cache_named_variables(0)
+
+    def add_embedding_weight(self, name, embedding_rows: bool = True, **kwargs):
+        """Adds the weight `<name>/embedding` of an embedding table. If `embedding_rows`
+        is set (the rows of the table are looked up by id), the weight is marked with
+        `mark_embedding_variable()`, so that it is updated by the `embedding_optimizer`
+        of the model"""
         table = self.add_weight(name=f"{str(name)}/embedding", **kwargs)
+        if embedding_rows:
+            mark_embedding_variable(table)
 
         return table
 
+    def add_embedding_function(self, name, embedding_fn: Callable[[], tf.Tensor]):
+        """Registers the function returning the embedding table of `name` for
+        `get_embedding()`, for the tables which are not stored as a single
+        `<name>/embedding` weight (e.g. the int8 tables of `QuantizedTableConfig`,
+        which are dequantized)"""
+        self._embedding_functions[str(name)] = embedding_fn
+
+    def remove_weight(self, variable: tf.Variable):
+        """Removes a weight created by `add_weight()` (e.g. an embedding table replaced
+        by its quantized weights), so that it is not saved with the context anymore"""
+        untrack_variable(self, variable)
+        self._cache_named_variables(len(self._trainable_weights) + len(self._non_trainable_weights))
+
+    def add_call_feature(self, name: str, value: tf.Tensor):
+        """Adds a tensor computed during the current call (e.g. the query embeddings
+        of `ItemRetrievalScorer`) to the per-call features, so that it is returned by
+        `context[name]` in the same call (e.g. in `call_outputs()`), without being
+        assigned to a variable"""
+        self._call_features[name] = value
+
     def add_features(self, *name):
         self._feature_names = list({*self._feature_names, *name})
 
@@ -129,6 +168,8 @@ class ModelContext(Layer):
             item = item.value
         else:
             item = str(item)
+        if self._is_call_feature_in_scope(item):
+            return self._call_features[item]
         return self.named_variables[item]
 
     def get_embedding(self, item):
@@ -136,6 +177,8 @@ class ModelContext(Layer):
             item = item.value
         else:
             item = str(item)
+        if item in self._embedding_functions:
+            return self._embedding_functions[item]()
         return self.named_variables[f"{item}/embedding"]
 
     def get_mask(self):
@@ -148,6 +191,16 @@ class ModelContext(Layer):
 
     @property
     def named_variables(self) -> Dict[str, tf.Variable]:
+        # The map of names is rebuilt when the number of variables changes (when
+        # variables are added to the context), and by `remove_weight()`
+        num_variables = len(self._trainable_weights) + len(self._non_trainable_weights)
+        if num_variables != self._num_named_variables:
+            self._cache_named_variables(num_variables)
+
+        return self._named_variables
+
+    @tf.__internal__.tracking.no_automatic_dependency_tracking
+    def _cache_named_variables(self, num_variables: int):
         outputs = {}
         for var in self.variables:
             if var.name.endswith("/embedding:0"):
@@ -155,8 +208,36 @@ class ModelContext(Layer):
             else:
                 name = var.name.split("/")[-1]
             outputs[name.replace(":0", "")] = var
+        self._named_variables: Dict[str, tf.Variable] = outputs
+        self._num_named_variables = num_variables
 
-        return outputs
+    @tf.__internal__.tracking.no_automatic_dependency_tracking
+    def _set_call_features(self, features: TabularData):
+        self._call_features: TabularData = features
+
+    @tf.__internal__.tracking.no_automatic_dependency_tracking
+    def _set_embedding_functions(self, embedding_fns: Dict[str, Callable[[], tf.Tensor]]):
+        self._embedding_functions: Dict[str, Callable[[], tf.Tensor]] = embedding_fns
+
+    def _is_call_feature_in_scope(self, name: str) -> bool:
+        if name not in self._call_features:
+            return False
+
+        feature = self._call_features[name]
+        is_eager_feature = isinstance(feature, ops.EagerTensor)
+        # Eager tensors are only returned eagerly, so that they are not captured
+        # as constants by a graph that might be traced only once
+        if tf.executing_eagerly() or is_eager_feature:
+            return tf.executing_eagerly() and is_eager_feature
+
+        feature_graph = getattr(feature, "graph", None)
+        graph = tf.compat.v1.get_default_graph()
+        while graph is not None:
+            if graph is feature_graph:
+                return True
+            graph = getattr(graph, "outer_graph", None)
+
+        return False
 
     def _merge(self, other: "ModelContext"):
         self.public_variables.update(other.public_variables)
@@ -204,8 +285,15 @@ class ModelContext(Layer):
         super(ModelContext, self).build(input_shape)
 
     def call(self, features, **kwargs):
-        for feature_name in self._feature_names:
-            self.named_variables[feature_name].assign(features[feature_name])
+        # Gives the features the static shapes of their placeholder variables
+        self._set_call_features(
+            {
+                feature_name: tf.ensure_shape(
+                    features[feature_name], self.named_variables[feature_name].shape
+                )
+                for feature_name in self._feature_names
+            }
+        )
 
         return features
 
@@ -13,7 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from typing import Optional, Union
+import json
+import os
+from typing import Optional, Tuple, Union
 
 import numpy as np
 import tensorflow as tf
@@ -23,22 +25,55 @@ import merlin.io
 from merlin.core.dispatch import DataFrameType
 from merlin.models.tf.blocks.core.base import Block, PredictionOutput
 from merlin.models.tf.utils import tf_utils
-from merlin.models.tf.utils.batch_utils import TFModelEncode
+from merlin.models.tf.utils.batch_utils import TFModelEncode, compute_partitions
 from merlin.models.utils.constants import MIN_FLOAT
 from merlin.schema import Tags
 
+_INDEX_METADATA_FILE = "metadata.json"
+_INDEX_IDS_FILE = "ids.npy"
+_INDEX_VALUES_FILE = "values.npy"
+
 
 @tf.keras.utils.register_keras_serializable(package="merlin_models")
 class IndexBlock(Block):
-    def __init__(self, values: tf.Tensor, ids: Optional[tf.Tensor] = None, **kwargs):
+    """Index of the pre-computed embeddings of candidates.
+
+    Parameters:
+    -----------
+        values: tf.Tensor
+            The pre-computed embedddings of candidates.
+        ids: tf.Tensor
+            The candidates ids.
+        quantize: bool
+            Whether the embeddings are stored as int8 values with a float32
+            scale and zero-point per candidate (see `tf_utils.quantize_rows_int8(symmetric=False)`),
+            which takes about a quarter of the memory of the float32 embeddings.
+            By default False
+    """
+
+    def __init__(
+        self, values: tf.Tensor, ids: Optional[tf.Tensor] = None, quantize: bool = False, **kwargs
+    ):
         super(IndexBlock, self).__init__(**kwargs)
+        self.quantize = quantize
+        dim = tf.shape(values)[-1]
+        if quantize:
+            values, scales, zero_points = tf_utils.quantize_rows_int8(values, symmetric=False)
+            row_kwargs = dict(
+                trainable=False,
+                dtype=tf.float32,
+                validate_shape=False,
+                shape=tf.TensorShape([None]),
+            )
+            self.scales = tf.Variable(scales, name="scales", **row_kwargs)
+            self.zero_points = tf.Variable(zero_points, name="zero_points", **row_kwargs)
         self.values = tf.Variable(
             values,
             name="values",
             trainable=False,
-            dtype=tf.float32,
+            dtype=tf.int8 if quantize else tf.float32,
             validate_shape=False,
-            shape=tf.TensorShape([None, tf.shape(values)[-1]]),
+            shape=tf.TensorShape([None, dim]),
         )
         if ids is not None:
             id_dtype = ids.dtype
@@ -53,6 +88,29 @@ class IndexBlock(Block):
             validate_shape=False,
             shape=tf.TensorShape([None]),
         )
+        # The ids sorted once per update, to map excluded ids to their positions
+        sorted_positions, sorted_ids = self._sort_ids(self.ids)
+        self._sorted_positions = tf.Variable(
+            sorted_positions,
+            name="sorted_positions",
+            trainable=False,
+            dtype=tf.int32,
+            validate_shape=False,
+            shape=tf.TensorShape([None]),
+        )
+        self._sorted_ids = tf.Variable(
+            sorted_ids,
+            name="sorted_ids",
+            trainable=False,
+            dtype=id_dtype,
+            validate_shape=False,
+            shape=tf.TensorShape([None]),
+        )
+
+    @staticmethod
+    def _sort_ids(ids: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+        sorted_positions = tf.argsort(ids)
+        return sorted_positions, tf.gather(ids, sorted_positions)
 
     @classmethod
     def from_dataset(
@@ -63,7 +121,12 @@ class IndexBlock(Block):
 
     @classmethod
     def from_block(
-        cls, block: Block, data: merlin.io.Dataset, id_column: Optional[str] = None, **kwargs
+        cls,
+        block: Block,
+        data: merlin.io.Dataset,
+        id_column: Optional[str] = None,
+        num_workers: Optional[int] = None,
+        **kwargs,
     ) -> "IndexBlock":
         """Build candidates embeddings from applying `block` to a dataset of features `data`.
 
@@ -77,8 +140,11 @@ class IndexBlock(Block):
             The candidates ids column name.
             Note, this will be inferred automatically if the block contains
             a schema with an item-id Tag.
+        num_workers: Optional[int]
+            Number of threads used to encode the partitions of `data` in parallel.
+            By default None, which encodes one partition at a time.
         """
-        embedding_df = cls.get_candidates_dataset(block, data, id_column)
+        embedding_df = cls.get_candidates_dataset(block, data, id_column, num_workers=num_workers)
         return cls.from_dataset(embedding_df, **kwargs)
 
     @staticmethod
@@ -102,18 +168,22 @@ class IndexBlock(Block):
 
     @classmethod
     def get_candidates_dataset(
-        cls, block: Block, data: merlin.io.Dataset, id_column: Optional[str] = None
+        cls,
+        block: Block,
+        data: merlin.io.Dataset,
+        id_column: Optional[str] = None,
+        num_workers: Optional[int] = None,
     ):
         if not id_column and getattr(block, "schema", None):
             tagged = block.schema.select_by_tag(Tags.ITEM_ID)
             if tagged.column_schemas:
                 id_column = tagged.first.name
 
-        model_encode = TFModelEncode(model=block, output_concat_func=np.concatenate)
+        model_encode = TFModelEncode(model=block, output_concat_func=np.concatenate, in_memory=True)
 
         data = data.to_ddf()
         embedding_ddf = data.map_partitions(model_encode, filter_input_columns=[id_column])
-        embedding_df = embedding_ddf.compute(scheduler="synchronous")
+        embedding_df = compute_partitions(embedding_ddf, num_workers=num_workers)
 
         embedding_df.set_index(id_column, inplace=True)
         return embedding_df
@@ -124,8 +194,11 @@ class IndexBlock(Block):
         data: merlin.io.Dataset,
         id_column: Optional[str] = None,
         check_unique_ids: bool = True,
+        num_workers: Optional[int] = None,
     ):
-        embedding_df = IndexBlock.get_candidates_dataset(block, data, id_column)
+        embedding_df = IndexBlock.get_candidates_dataset(
+            block, data, id_column, num_workers=num_workers
+        )
         ids, embeddings = IndexBlock.extract_ids_embeddings(embedding_df, check_unique_ids)
         self.update(embeddings, ids)
 
@@ -134,25 +207,132 @@ class IndexBlock(Block):
             raise ValueError(f"The candidates embeddings tensor must be 2D (got {values.shape}).")
         _ids: tf.Tensor = ids if ids is not None else tf.range(values.shape[0])
         self.ids.assign(_ids)
+        sorted_positions, sorted_ids = self._sort_ids(self.ids)
+        self._sorted_positions.assign(sorted_positions)
+        self._sorted_ids.assign(sorted_ids)
+        if self.quantize:
+            values, scales, zero_points = tf_utils.quantize_rows_int8(values, symmetric=False)
+            self.scales.assign(scales)
+            self.zero_points.assign(zero_points)
         self.values.assign(values)
         return self
 
     def call(self, inputs: tf.Tensor, **kwargs) -> tf.Tensor:
+        if self.quantize:
+            return tf_utils.dequantize_rows_int8(
+                tf.gather(self.values, inputs),
+                tf.gather(self.scales, inputs),
+                tf.gather(self.zero_points, inputs),
+            )
         return self.values[inputs]
 
+    def float_values(self) -> tf.Tensor:
+        """Returns the float32 embeddings of the candidates
+        (dequantized if the index is quantized)"""
+        if self.quantize:
+            return tf_utils.dequantize_rows_int8(self.values, self.scales, self.zero_points)
+        return tf.convert_to_tensor(self.values)
+
+    def save(self, path: str, dtype: Optional[Union[str, np.dtype]] = None):
+        """Saves the index to `path` in a flat binary layout,
+        that can be loaded back with `IndexBlock.load()` without
+        restoring a SavedModel.
+
+        The directory will contain the candidate ids (`ids.npy`),
+        the candidate embeddings matrix (`values.npy`) and
+        a `metadata.json` file with the index configuration.
+
+        Parameters
+        ----------
+        path : str
+            Directory where the index files will be written
+        dtype : Optional[Union[str, np.dtype]], optional
+            Storage dtype of the embeddings matrix (e.g. "float16" to
+            halve the size on disk), by default None which keeps float32
+        """
+        os.makedirs(path, exist_ok=True)
+
+        values = self.float_values().numpy()
+        if dtype is not None:
+            values = values.astype(dtype)
+        ids = self.ids.numpy()
+
+        np.save(os.path.join(path, _INDEX_VALUES_FILE), values, allow_pickle=False)
+        np.save(os.path.join(path, _INDEX_IDS_FILE), ids, allow_pickle=False)
+
+        metadata = {
+            "class_name": self.__class__.__name__,
+            "num_candidates": int(values.shape[0]),
+            "dim": int(values.shape[1]),
+            "values_dtype": str(values.dtype),
+            "ids_dtype": str(ids.dtype),
+            "config": self._index_config(),
+        }
+        with open(os.path.join(path, _INDEX_METADATA_FILE), "w") as f:
+            json.dump(metadata, f)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "IndexBlock":
+        """Loads an index saved with `IndexBlock.save()`.
+        The candidates are read into memory, and the embeddings
+        stored with a lower precision (e.g. float16) are converted to float32.
+
+        Parameters
+        ----------
+        path : str
+            Directory containing the index files
+        **kwargs
+            Arguments for the index constructor, which override the saved ones
+
+        Returns
+        -------
+        IndexBlock
+            The index block with the saved candidates
+        """
+        with open(os.path.join(path, _INDEX_METADATA_FILE)) as f:
+            metadata = json.load(f)
+
+        values = np.load(os.path.join(path, _INDEX_VALUES_FILE))
+        ids = np.load(os.path.join(path, _INDEX_IDS_FILE))
+
+        if values.shape != (metadata["num_candidates"], metadata["dim"]):
+            raise ValueError(
+                f"The embeddings stored in {path} have shape {values.shape}, "
+                f"expected ({metadata['num_candidates']}, {metadata['dim']})"
+            )
+        if str(values.dtype) != metadata["values_dtype"]:
+            raise ValueError(
+                f"The embeddings stored in {path} have dtype {values.dtype}, "
+                f"expected {metadata['values_dtype']}"
+            )
+
+        # The stored config only applies when loading with the same index class
+        # (e.g. `k` of a TopKIndexBlock), otherwise it can be provided via kwargs
+        config = metadata["config"] if metadata["class_name"] == cls.__name__ else {}
+        config = {**config, **kwargs}
+        # Converting the embeddings in numpy, so that a float16 file
+        # is not copied into a float16 tensor before being cast
+        values = values.astype(np.float32, copy=False)
+
+        return cls(values=values, ids=ids, **config)
+
+    def _index_config(self):
+        return {"quantize": bool(self.quantize)}
+
     def to_dataset(self, gpu=True) -> merlin.io.Dataset:
+        values = self.float_values()
         if gpu:
             import cudf
 
-            df = cudf.from_dlpack(to_dlpack(tf.convert_to_tensor(self.values)))
+            df = cudf.from_dlpack(to_dlpack(values))
             df.columns = [str(col) for col in list(df.columns)]
-            df.set_index(cudf.RangeIndex(0, self.values.shape[0]))
+            df.set_index(cudf.RangeIndex(0, values.shape[0]))
         else:
             import pandas as pd
 
-            df = pd.DataFrame(self.values.numpy())
+            df = pd.DataFrame(values.numpy())
             df.columns = [str(col) for col in list(df.columns)]
-            df.set_index(pd.RangeIndex(0, self.values.shape[0]))
+            df.set_index(pd.RangeIndex(0, values.shape[0]))
 
         return merlin.io.Dataset(df)
 
@@ -169,6 +349,10 @@ class TopKIndexBlock(IndexBlock):
             The pre-computed embedddings of candidates.
         ids: tf.Tensor
             The candidates ids.
+        quantize: bool
+            Whether the embeddings are quantized to int8 (see `IndexBlock`),
+            in which case the scores are computed from the int8 values
+            and the scale and zero-point of each candidate. By default False
     """
 
     def __init__(self, k, values: tf.Tensor, ids: Optional[tf.Tensor] = None, **kwargs):
@@ -183,6 +367,7 @@ class TopKIndexBlock(IndexBlock):
         data: merlin.io.Dataset,
         k: int = 20,
         id_column: Optional[str] = None,
+        num_workers: Optional[int] = None,
         **kwargs,
     ) -> "TopKIndexBlock":
         """
@@ -204,10 +389,24 @@ class TopKIndexBlock(IndexBlock):
             The candidates ids column name.
             Note, this will be inferred automatically if the block contains
             a schema with an item-id Tag.
+        num_workers: Optional[int]
+            Number of threads used to encode the partitions of `data` in parallel.
+            By default None, which encodes one partition at a time.
         """
-        return super().from_block(block=block, data=data, id_column=id_column, k=k, **kwargs)
+        return super().from_block(
+            block=block, data=data, id_column=id_column, num_workers=num_workers, k=k, **kwargs
+        )
 
-    def call(self, inputs: tf.Tensor, k=None, **kwargs) -> Union[tf.Tensor, tf.Tensor]:
+    def _index_config(self):
+        return {"k": int(self._k), **super()._index_config()}
+
+    def call(
+        self,
+        inputs: tf.Tensor,
+        k=None,
+        exclude: Optional[Union[tf.Tensor, tf.RaggedTensor]] = None,
+        **kwargs,
+    ) -> Union[tf.Tensor, tf.Tensor]:
         """
         Compute Top-k scores and related indices from query inputs
 
@@ -218,18 +417,69 @@ class TopKIndexBlock(IndexBlock):
         k: int
             Number of top candidates to retrieve
             Defaults to constructor `_k` parameter.
+        exclude: Union[tf.Tensor, tf.RaggedTensor], optional
+            Candidates that should not be retrieved for each query
+            (e.g. items the user has already interacted with).
+            It can be either a 2D ragged (or dense, padded with ids that are not
+            in the index) tensor with the candidate ids to exclude for each query,
+            or a 2D boolean bitmap with shape (batch size, number of candidates)
+            where `True` marks the excluded candidates.
+            The scores of excluded candidates are masked before the top-k selection,
+            so that k valid candidates are returned without over-fetching.
         Returns
         -------
         top_scores, top_indices: tf.Tensor, tf.Tensor
             2D Tensors with the scores for the top-k candidates and related ids.
         """
         k = k if k is not None else self._k
-        scores = tf.matmul(inputs, self.values, transpose_b=True)
+        if self.quantize:
+            # inputs @ ((values - zero_points) * scales)^T, without dequantizing the values
+            scores = tf.matmul(inputs, tf.cast(self.values, inputs.dtype), transpose_b=True)
+            scores = (
+                scores - tf.reduce_sum(inputs, axis=-1, keepdims=True) * self.zero_points
+            ) * self.scales
+        else:
+            scores = tf.matmul(inputs, self.values, transpose_b=True)
+        if exclude is not None:
+            scores = self._mask_excluded(scores, exclude)
         top_scores, top_indices = tf.math.top_k(scores, k=k)
         top_indices = tf.gather(self.ids, top_indices)
 
         return top_scores, top_indices
 
+    def _mask_excluded(
+        self, scores: tf.Tensor, exclude: Union[tf.Tensor, tf.RaggedTensor]
+    ) -> tf.Tensor:
+        """Sets the scores of the excluded candidates to `false_negatives_score`"""
+        if not isinstance(exclude, tf.RaggedTensor) and exclude.dtype == tf.bool:
+            return tf.where(exclude, tf.cast(self.false_negatives_score, scores.dtype), scores)
+
+        if not isinstance(exclude, tf.RaggedTensor):
+            exclude = tf.RaggedTensor.from_tensor(exclude)
+        exclude = tf.cast(exclude, self.ids.dtype)
+
+        # Maps the excluded ids to their positions in the index with a binary search
+        # over the candidate ids (sorted when the index is updated), which avoids
+        # comparing every excluded id against every candidate
+        sorted_positions, sorted_ids = self._sorted_positions, self._sorted_ids
+        excluded_ids = exclude.flat_values
+        search_positions = tf.searchsorted(sorted_ids, excluded_ids, side="left")
+        search_positions = tf.minimum(search_positions, tf.shape(sorted_ids)[0] - 1)
+        found_mask = tf.equal(tf.gather(sorted_ids, search_positions), excluded_ids)
+
+        columns = tf.gather(sorted_positions, search_positions)
+        rows = exclude.value_rowids()
+        indices = tf.stack(
+            [
+                tf.boolean_mask(tf.cast(rows, tf.int32), found_mask),
+                tf.boolean_mask(tf.cast(columns, tf.int32), found_mask),
+            ],
+            axis=-1,
+        )
+        updates = tf.fill(tf.shape(indices)[:1], tf.cast(self.false_negatives_score, scores.dtype))
+
+        return tf.tensor_scatter_nd_update(scores, indices, updates)
+
     def call_outputs(
         self, outputs: PredictionOutput, training=False, **kwargs
     ) -> "PredictionOutput":
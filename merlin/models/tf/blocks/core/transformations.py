@@ -27,6 +27,7 @@ from merlin.models.tf.typing import TabularData, TensorOrTabularData
 from merlin.models.tf.utils.tf_utils import (
     df_to_tensor,
     get_candidate_probs,
+    tiled_softmax_logits,
     transform_label_to_onehot,
 )
 from merlin.models.utils import schema_utils
@@ -387,17 +388,28 @@ class RemovePad3D(Block):
         non_pad_mask = targets != self.padding_idx
         targets = tf.boolean_mask(targets, non_pad_mask)
 
-        assert isinstance(predictions, tf.Tensor), "Predictions must be a tensor"
-        if len(tuple(predictions.get_shape())) == 3:
-            predictions = tf.reshape(predictions, (-1, predictions.shape[-1]))
-            predictions = tf.boolean_mask(
-                predictions, tf.broadcast_to(tf.expand_dims(non_pad_mask, 1), tf.shape(predictions))
+        if isinstance(predictions, (tuple, list)):
+            # The top-k (scores, item ids) of `ItemRetrievalScorer`
+            predictions = type(predictions)(
+                self._remove_pad_predictions(p, non_pad_mask) for p in predictions
             )
+        else:
+            assert isinstance(predictions, tf.Tensor), "Predictions must be a tensor"
+            predictions = self._remove_pad_predictions(predictions, non_pad_mask)
         return outputs.copy_with_updates(
             predictions=predictions,
             targets=targets,
         )
 
+    @staticmethod
+    def _remove_pad_predictions(predictions: tf.Tensor, non_pad_mask: tf.Tensor) -> tf.Tensor:
+        if len(tuple(predictions.get_shape())) == 3:
+            predictions = tf.reshape(predictions, (-1, predictions.shape[-1]))
+            predictions = tf.boolean_mask(
+                predictions, tf.broadcast_to(tf.expand_dims(non_pad_mask, 1), tf.shape(predictions))
+            )
+        return predictions
+
 
 @tf.keras.utils.register_keras_serializable(package="merlin_models")
 class LogitsTemperatureScaler(Block):
@@ -453,6 +465,12 @@ class ItemsPredictionWeightTying(Block):
             The `Schema` with the input features
         bias_initializer : str, optional
             Initializer to use on the bias vector, by default "zeros"
+        logits_tile_size : Optional[int], optional
+            If set, the logits over all items are not materialized during training:
+            `call()` returns its inputs and `call_outputs()` returns the logits
+            `[positive, log-sum-exp of the other items]` computed over tiles of
+            `logits_tile_size` items (see `tiled_softmax_logits()`), whose
+            cross-entropy is the one of the full softmax, by default None
 
     References:
     -----------
@@ -461,9 +479,16 @@ class ItemsPredictionWeightTying(Block):
         arXiv:1611.01462
     """
 
-    def __init__(self, schema: Schema, bias_initializer="zeros", **kwargs):
+    def __init__(
+        self,
+        schema: Schema,
+        bias_initializer="zeros",
+        logits_tile_size: Optional[int] = None,
+        **kwargs,
+    ):
         super(ItemsPredictionWeightTying, self).__init__(**kwargs)
         self.bias_initializer = bias_initializer
+        self.logits_tile_size = logits_tile_size
         self.item_id_feature_name = schema.select_by_tag(Tags.ITEM_ID).column_names[0]
         self.num_classes = schema_utils.categorical_cardinalities(schema)[self.item_id_feature_name]
         self.item_domain = schema_utils.categorical_domains(schema)[self.item_id_feature_name]
@@ -477,12 +502,34 @@ class ItemsPredictionWeightTying(Block):
         return super().build(input_shape)
 
     def call(self, inputs, training=False, **kwargs) -> tf.Tensor:
+        if training and self.logits_tile_size:
+            # The logits are computed by tiles in call_outputs()
+            return inputs
+
         embedding_table = self.context.get_embedding(self.item_domain)
         logits = tf.matmul(inputs, embedding_table, transpose_b=True)
         logits = tf.nn.bias_add(logits, self.bias)
 
         return logits
 
+    def call_outputs(
+        self, outputs: PredictionOutput, training=True, **kwargs
+    ) -> "PredictionOutput":
+        if not (training and self.logits_tile_size):
+            return outputs
+
+        predictions = tiled_softmax_logits(
+            outputs.predictions,
+            self.context.get_embedding(self.item_domain),
+            self.bias,
+            outputs.targets,
+            tile_size=self.logits_tile_size,
+        )
+        # The positive logit is the first column
+        targets = tf.zeros(tf.shape(predictions)[:1], dtype=tf.int32)
+
+        return outputs.copy_with_updates(predictions=predictions, targets=targets)
+
 
 @Block.registry.register_with_multiple_names("categorical_to_onehot")
 @tf.keras.utils.register_keras_serializable(package="merlin_models")
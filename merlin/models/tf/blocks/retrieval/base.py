@@ -35,6 +35,7 @@ from merlin.models.tf.utils.tf_utils import (
     maybe_deserialize_keras_objects,
     maybe_serialize_keras_objects,
     rescore_false_negatives,
+    streaming_top_k,
 )
 from merlin.models.utils.constants import MIN_FLOAT
 from merlin.schema import Schema
@@ -166,8 +167,19 @@ class ItemRetrievalScorer(Block):
         Use sampled softmax for scoring, by default False
     store_negative_ids: bool
         Returns negative items ids as part of the output, by default False
+    top_k: int, optional
+        Only used with `sampled_softmax_mode=True`. If set, on inference / evaluation
+        the scorer returns the top-k scores and item ids over the item embedding table,
+        which is scored in chunks of `top_k_chunk_size` items, so that the logits
+        for all items are never materialized. The evaluation loss and metrics are then
+        computed on the logits of the positive item and of the top-k items.
+        By default None, which returns the logits for all items.
+    top_k_chunk_size: int
+        Number of items scored at once when `top_k` is set, by default 16384
     """
 
+    TOP_K_QUERY_NAME = "top_k_query"
+
     def __init__(
         self,
         samplers: Sequence[ItemSampler] = (),
@@ -180,6 +192,8 @@ class ItemRetrievalScorer(Block):
         cache_query: bool = False,
         sampled_softmax_mode: bool = False,
         store_negative_ids: bool = False,
+        top_k: Optional[int] = None,
+        top_k_chunk_size: int = 16384,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -197,6 +211,8 @@ class ItemRetrievalScorer(Block):
             samplers = (samplers,)  # type: ignore
         self.samplers = samplers
         self.sampled_softmax_mode = sampled_softmax_mode
+        self.top_k = top_k
+        self.top_k_chunk_size = top_k_chunk_size
 
         self.set_required_features()
 
@@ -285,6 +301,9 @@ class ItemRetrievalScorer(Block):
             return inputs
 
         if self.sampled_softmax_mode:
+            if self.top_k:
+                # The query is used to score the positive items in `call_outputs()`
+                self.context.add_call_feature(self.TOP_K_QUERY_NAME, inputs)
             return self._get_logits_for_sampled_softmax(inputs)
 
         self._check_input_from_two_tower(inputs)
@@ -293,7 +312,6 @@ class ItemRetrievalScorer(Block):
         )
         return positive_scores
 
-    @tf.function
     def call_outputs(
         self, outputs: PredictionOutput, training=True, eval_sampling=False, **kwargs
     ) -> "PredictionOutput":
@@ -314,13 +332,44 @@ class ItemRetrievalScorer(Block):
             Return tensor is 2D (batch size, 1 + #negatives)
         """
         self._check_required_context_item_features_are_present()
+
+        # The context features are passed as arguments of the traced function,
+        # so that it never holds tensors of the graph in which it was first traced
+        batch_items_metadata = self.get_batch_items_metadata()
+        if not (self.sampled_softmax_mode or isinstance(outputs.targets, tf.Tensor)):
+            batch_items_metadata[self.item_id_feature_name] = self.context[
+                self.item_id_feature_name
+            ]
+        top_k_query = None
+        if self.sampled_softmax_mode and self.top_k and not training and not eval_sampling:
+            top_k_query = self.context[self.TOP_K_QUERY_NAME]
+
+        return self._call_outputs(
+            outputs,
+            batch_items_metadata,
+            training=training,
+            eval_sampling=eval_sampling,
+            top_k_query=top_k_query,
+            **kwargs,
+        )
+
+    @tf.function
+    def _call_outputs(
+        self,
+        outputs: PredictionOutput,
+        batch_items_metadata: TabularData,
+        training=True,
+        eval_sampling=False,
+        top_k_query: Optional[tf.Tensor] = None,
+        **kwargs,
+    ) -> "PredictionOutput":
         targets, predictions = outputs.targets, outputs.predictions
         valid_negatives_mask = None
 
         if self.sampled_softmax_mode or isinstance(targets, tf.Tensor):
             positive_item_ids = targets
         else:
-            positive_item_ids = self.context[self.item_id_feature_name]
+            positive_item_ids = batch_items_metadata[self.item_id_feature_name]
 
         neg_items_ids = None
         if training or eval_sampling:
@@ -335,7 +384,6 @@ class ItemRetrievalScorer(Block):
                 )
 
             batch_items_embeddings = predictions[self.item_name]
-            batch_items_metadata = self.get_batch_items_metadata()
 
             positive_scores = tf.reduce_sum(
                 tf.multiply(predictions[self.query_name], predictions[self.item_name]),
@@ -345,6 +393,7 @@ class ItemRetrievalScorer(Block):
 
             neg_items_embeddings_list = []
             neg_items_ids_list = []
+            neg_items_log_q_list = []
 
             # Adds items from the current batch into samplers and sample a number of negatives
             for sampler in self.samplers:
@@ -352,12 +401,16 @@ class ItemRetrievalScorer(Block):
                 sampling_kwargs = {"training": training}
                 if "item_weights" in sampler._call_fn_args:
                     sampling_kwargs["item_weights"] = self.context.get_embedding(self.item_domain)
+                if "query_embeddings" in sampler._call_fn_args:
+                    sampling_kwargs["query_embeddings"] = predictions[self.query_name]
                 neg_items = sampler(input_data.__dict__, **sampling_kwargs)
+                neg_items_log_q = sampler.sampling_log_q(neg_items)
 
                 if tf.shape(neg_items.embeddings)[0] > 0:
                     # Accumulates sampled negative items from all samplers
                     neg_items_embeddings_list.append(neg_items.embeddings)
-                    if self.downscore_false_negatives:
+                    neg_items_log_q_list.append(neg_items_log_q)
+                    if self.downscore_false_negatives or self.store_negative_ids:
                         neg_items_ids_list.append(neg_items.metadata[self.item_id_feature_name])
                 else:
                     LOG.warn(
@@ -375,11 +428,22 @@ class ItemRetrievalScorer(Block):
                 predictions[self.query_name], neg_items_embeddings, transpose_b=True
             )
 
+            if any(log_q is not None for log_q in neg_items_log_q_list):
+                # Applies the logQ correction to the negatives of the samplers that support it
+                neg_items_log_q = tf.concat(
+                    [
+                        tf.zeros(tf.shape(emb)[:1]) if log_q is None else log_q
+                        for emb, log_q in zip(neg_items_embeddings_list, neg_items_log_q_list)
+                    ],
+                    axis=0,
+                )
+                negative_scores -= tf.cast(neg_items_log_q, negative_scores.dtype)
+
             if self.downscore_false_negatives or self.store_negative_ids:
                 if isinstance(targets, tf.Tensor):
                     positive_item_ids = targets
                 else:
-                    positive_item_ids = self.context[self.item_id_feature_name]
+                    positive_item_ids = batch_items_metadata[self.item_id_feature_name]
 
                 if len(neg_items_ids_list) == 1:
                     neg_items_ids = neg_items_ids_list[0]
@@ -396,6 +460,9 @@ class ItemRetrievalScorer(Block):
             # instabilities with mixed_float16 policy
             predictions = tf.cast(predictions, tf.float32)
 
+        if self.sampled_softmax_mode and self.top_k and not training and not eval_sampling:
+            return self._top_k_prediction_output(predictions, targets, top_k_query)
+
         assert isinstance(predictions, tf.Tensor), "Predictions must be a tensor"
         # prepare targets for computing the loss and metrics
         if self.sampled_softmax_mode and not training:
@@ -435,9 +502,41 @@ class ItemRetrievalScorer(Block):
                 f"Inputs to the Sampled Softmax block should be tensors, got {type(inputs)}"
             )
         embedding_table = self.context.get_embedding(self.item_domain)
-        all_scores = tf.matmul(inputs, tf.transpose(embedding_table))
+        if self.top_k:
+            return streaming_top_k(
+                inputs, embedding_table, k=self.top_k, chunk_size=self.top_k_chunk_size
+            )
+        all_scores = tf.matmul(inputs, embedding_table, transpose_b=True)
         return all_scores
 
+    def _top_k_prediction_output(self, predictions, targets, query) -> PredictionOutput:
+        """Converts the top-k (scores, item ids) returned by `call()` in sampled-softmax
+        mode (when `top_k` is set) into predictions with the positive item in the first
+        column followed by the top-k items, so that the loss is not zero when
+        the positive item is not retrieved"""
+        top_scores, top_ids = predictions
+        targets = tf.reshape(tf.cast(targets, top_ids.dtype), (-1, 1))
+        positive_embeddings = tf.gather(
+            self.context.get_embedding(self.item_domain), tf.reshape(targets, (-1,))
+        )
+        positive_scores = tf.reduce_sum(
+            tf.cast(query, positive_embeddings.dtype) * positive_embeddings, axis=-1, keepdims=True
+        )
+        # The positive item is masked in the top-k, so that it is not counted twice
+        top_scores = tf.where(
+            tf.equal(targets, top_ids),
+            tf.cast(self.false_negatives_score, top_scores.dtype),
+            top_scores,
+        )
+        predictions = tf.concat([positive_scores, top_scores], axis=-1)
+        targets_one_hot = tf.one_hot(tf.zeros_like(targets[:, 0]), tf.shape(predictions)[-1])
+        return PredictionOutput(
+            predictions,
+            targets_one_hot,
+            positive_item_ids=targets,
+            label_relevant_counts=tf.ones([tf.shape(predictions)[0]]),
+        )
+
     def _prepare_query_item_vectors_for_sampled_softmax(
         self, predictions: tf.Tensor, targets: tf.Tensor
     ):
@@ -461,6 +560,8 @@ class ItemRetrievalScorer(Block):
         config["downscore_false_negatives"] = self.downscore_false_negatives
         config["false_negatives_score"] = self.false_negatives_score
         config["item_id_feature_name"] = self.item_id_feature_name
+        config["top_k"] = self.top_k
+        config["top_k_chunk_size"] = self.top_k_chunk_size
 
         return config
 
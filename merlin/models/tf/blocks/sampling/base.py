@@ -53,6 +53,12 @@ class ItemSampler(abc.ABC, Layer):
                 f"features ({int(metadata_feat_batch_size)}) must match.",
             )
 
+    def sampling_log_q(self, sampled_items: EmbeddingWithMetadata) -> Optional[tf.Tensor]:
+        """Returns the log of the expected count of each sampled item, which is used
+        by `ItemRetrievalScorer` to apply the logQ correction to their scores,
+        or None if the scores of the sampled items should not be corrected"""
+        return None
+
     @property
     def required_features(self) -> List[str]:
         return []
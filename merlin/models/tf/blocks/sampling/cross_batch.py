@@ -13,14 +13,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import tensorflow as tf
 from tensorflow.python.ops import embedding_ops
 
 from merlin.models.tf.blocks.sampling.base import EmbeddingWithMetadata, ItemSampler
 from merlin.models.tf.blocks.sampling.queue import FIFOQueue
 from merlin.models.tf.typing import TabularData
+from merlin.models.tf.utils.tf_utils import (
+    dequantize_rows_int8,
+    df_to_tensor,
+    get_candidate_probs,
+    quantize_rows_int8,
+)
+
+_EMBEDDINGS_STORAGE_DTYPES = [tf.float32, tf.float16, tf.bfloat16, tf.int8]
 
 
 class CachedCrossBatchSampler(ItemSampler):
@@ -58,12 +67,18 @@ class CachedCrossBatchSampler(ItemSampler):
         Whether should include the last batch in the sampling. By default `False`,
         as for sampling from the current batch we recommend `InBatchSampler()`, which
         allows computing gradients for in-batch negative items
+    storage_dtype: Union[str, tf.DType], optional
+        The dtype used to store the item embeddings in the queue, which can be
+        "float32" (default), "float16" / "bfloat16" (half of the memory) or
+        "int8" (a quarter of the memory, with a per-embedding float32 scale).
+        The embeddings are up-cast to float32 when sampled.
     """
 
     def __init__(
         self,
         capacity: int,
         ignore_last_batch_on_sample: bool = True,
+        storage_dtype: Union[str, tf.DType] = tf.float32,
         **kwargs,
     ):
         assert capacity > 0
@@ -71,8 +86,16 @@ class CachedCrossBatchSampler(ItemSampler):
         self.ignore_last_batch_on_sample = ignore_last_batch_on_sample
         self.item_metadata_dtypes: Dict[str, tf.dtypes.DType] = {}
 
+        self.storage_dtype = tf.as_dtype(storage_dtype)
+        if self.storage_dtype not in _EMBEDDINGS_STORAGE_DTYPES:
+            raise ValueError(
+                f"Invalid storage_dtype: {self.storage_dtype.name}. "
+                f"Expected one of {[dtype.name for dtype in _EMBEDDINGS_STORAGE_DTYPES]}"
+            )
+
         self._last_batch_size = 0
         self._item_embeddings_queue: Optional[FIFOQueue] = None
+        self._item_embeddings_scales_queue: Optional[FIFOQueue] = None
 
     @property
     def item_embeddings_queue(self) -> FIFOQueue:
@@ -96,9 +119,16 @@ class CachedCrossBatchSampler(ItemSampler):
         self._item_embeddings_queue = FIFOQueue(
             capacity=queue_size,
             dims=item_embeddings_dims,
-            dtype=tf.float32,
+            dtype=self.storage_dtype,
             name="item_emb",
         )
+        if self.storage_dtype == tf.int8:
+            self._item_embeddings_scales_queue = FIFOQueue(
+                capacity=queue_size,
+                dims=item_embeddings_dims[:-1],
+                dtype=tf.float32,
+                name="item_emb_scales",
+            )
 
         self.items_metadata_queue = dict()
         items_metadata = input_shapes["metadata"]
@@ -108,8 +138,34 @@ class CachedCrossBatchSampler(ItemSampler):
                 dims=list(items_metadata[feat_name][1:]),
                 dtype=self.item_metadata_dtypes[feat_name],
                 name=f"item_metadata_{feat_name}",
+                index_ids=feat_name in self._indexed_metadata_features(),
             )
 
+    def _indexed_metadata_features(self) -> List[str]:
+        """Names of the metadata features whose queues keep an index
+        of their values, to support efficient `FIFOQueue.index_of()`"""
+        return []
+
+    def _enqueue_item_embeddings(self, embeddings: tf.Tensor) -> None:
+        if self._item_embeddings_scales_queue is not None:
+            embeddings, scales, _ = quantize_rows_int8(embeddings)
+            self._item_embeddings_scales_queue.enqueue_many(scales)
+        self.item_embeddings_queue.enqueue_many(tf.cast(embeddings, self.storage_dtype))
+
+    def _update_item_embeddings(self, indices: tf.Tensor, embeddings: tf.Tensor) -> None:
+        if self._item_embeddings_scales_queue is not None:
+            embeddings, scales, _ = quantize_rows_int8(embeddings)
+            self._item_embeddings_scales_queue.update_by_indices(indices=indices, values=scales)
+        self.item_embeddings_queue.update_by_indices(
+            indices=indices, values=tf.cast(embeddings, self.storage_dtype)
+        )
+
+    def _list_item_embeddings(self) -> tf.Tensor:
+        embeddings = self.item_embeddings_queue.list_all()
+        if self._item_embeddings_scales_queue is not None:
+            return dequantize_rows_int8(embeddings, self._item_embeddings_scales_queue.list_all())
+        return tf.cast(embeddings, tf.float32)
+
     def _check_built(self) -> None:
         if self._item_embeddings_queue is None:
             raise Exception(
@@ -163,7 +219,7 @@ class CachedCrossBatchSampler(ItemSampler):
             items_embeddings = inputs["embeddings"]
             items_metadata = inputs["metadata"]
 
-            self.item_embeddings_queue.enqueue_many(items_embeddings)
+            self._enqueue_item_embeddings(items_embeddings)
             for feat_name in items_metadata:
                 self.items_metadata_queue[feat_name].enqueue_many(items_metadata[feat_name])
 
@@ -171,7 +227,7 @@ class CachedCrossBatchSampler(ItemSampler):
 
     def sample(self) -> EmbeddingWithMetadata:
         self._check_built()
-        items_embeddings = self.item_embeddings_queue.list_all()
+        items_embeddings = self._list_item_embeddings()
         items_metadata = {
             feat_name: self.items_metadata_queue[feat_name].list_all()
             for feat_name in self.items_metadata_queue
@@ -222,6 +278,9 @@ class CachedUniformSampler(CachedCrossBatchSampler):
     item_id_feature_name: str
         Name of the column containing the item ids
         Defaults to `item_id`
+    storage_dtype: Union[str, tf.DType], optional
+        The dtype used to store the item embeddings in the queue, by default "float32".
+        See `CachedCrossBatchSampler`.
     """
 
     def __init__(
@@ -236,6 +295,9 @@ class CachedUniformSampler(CachedCrossBatchSampler):
         )
         self.item_id_feature_name = item_id_feature_name
 
+    def _indexed_metadata_features(self) -> List[str]:
+        return [str(self.item_id_feature_name)]
+
     def _check_inputs(self, inputs):
         assert (
             str(self.item_id_feature_name) in inputs["metadata"]
@@ -282,9 +344,9 @@ class CachedUniformSampler(CachedCrossBatchSampler):
 
             update_indices = tf.expand_dims(item_ids_idxs[existing_items_mask], -1)
             # Updating embeddings of existing items
-            self.item_embeddings_queue.update_by_indices(
+            self._update_item_embeddings(
                 indices=update_indices,
-                values=unique_items.embeddings[existing_items_mask],
+                embeddings=unique_items.embeddings[existing_items_mask],
             )
 
             for feat_name in self.items_metadata_queue:
@@ -461,3 +523,256 @@ class PopularityBasedSampler(ItemSampler):
             items_embeddings,
             metadata={self.item_id_feature_name: tf.cast(sampled_ids, tf.int32)},
         )
+
+
+class AliasPopularitySampler(ItemSampler):
+    """Provides a popularity-based negative sampling from the item frequency
+    distribution, using the alias method [1]_ [2]_.
+    Differently from the `PopularityBasedSampler`, which approximates the
+    popularity distribution from the item ids order, this sampler uses the
+    actual item frequencies. The alias tables are built once in O(catalog size)
+    (and rebuilt with `update()` when the item frequencies change),
+    so that each draw costs O(1) independently of the catalog size.
+    Negatives are sampled with replacement.
+
+    By default, the logQ correction [3]_ is automatically applied by
+    `ItemRetrievalScorer` to the scores of the negatives sampled by this sampler,
+    as `score -= log(max_num_samples * item_prob)` (like in `tf.nn.sampled_softmax_loss`).
+
+    P.s. Ignoring the false negatives (negative items equal to the positive ones) is
+    managed by `ItemRetrievalScorer(..., sampling_downscore_false_negatives=True)`
+
+    References
+    ----------
+    .. [1] Walker, Alastair J. "An efficient method for generating discrete random
+       variables with general distributions." ACM Transactions on Mathematical
+       Software (TOMS) 3.3 (1977): 253-256.
+
+    .. [2] Vose, Michael D. "A linear algorithm for generating random numbers with a given
+       distribution." IEEE Transactions on software engineering 17.9 (1991): 972-975.
+
+    .. [3] Yi, Xinyang, et al. "Sampling-bias-corrected neural modeling for large corpus
+       item recommendations." Proceedings of the 13th ACM Conference on Recommender
+       Systems. 2019.
+
+    Parameters
+    ----------
+    item_freq_probs : Union[tf.Tensor, Sequence]
+        A Tensor or list with item frequencies (if is_prob_distribution=False)
+        or with item probabilities (if is_prob_distribution=True), indexed by item id
+    is_prob_distribution: bool, optional
+        If True, the item_freq_probs should be a probability distribution of the items.
+        If False, the item frequencies is converted to probabilities
+    max_num_samples: int
+        The number of negatives to sample at each batch, by default 100
+    logq_correction: bool
+        Whether the scores of the sampled negatives should be corrected
+        by their sampling probability, by default True
+    seed: int
+        Fix the random values returned by the sampler to ensure reproducibility
+        Defaults to None
+    item_id_feature_name: str
+        Name of the column containing the item ids
+        Defaults to `item_id`
+    """
+
+    def __init__(
+        self,
+        item_freq_probs: Union[tf.Tensor, Sequence],
+        is_prob_distribution: bool = False,
+        max_num_samples: int = 100,
+        logq_correction: bool = True,
+        seed: Optional[int] = None,
+        item_id_feature_name: str = "item_id",
+        **kwargs,
+    ):
+        super().__init__(max_num_samples=max_num_samples, **kwargs)
+        self.logq_correction = logq_correction
+        self.seed = seed
+        self.item_id_feature_name = item_id_feature_name
+
+        candidate_probs = get_candidate_probs(item_freq_probs, is_prob_distribution)
+        accept_probs, aliases = build_alias_tables(candidate_probs.numpy())
+        self.candidate_probs = self._table_variable(candidate_probs, "candidate_probs")
+        self.accept_probs = self._table_variable(accept_probs, "alias_accept_probs")
+        self.aliases = self._table_variable(aliases, "alias_ids")
+
+    @staticmethod
+    def _table_variable(values, name: str) -> tf.Variable:
+        values = tf.convert_to_tensor(values)
+        return tf.Variable(
+            values,
+            name=name,
+            trainable=False,
+            dtype=values.dtype,
+            validate_shape=False,
+            shape=tf.TensorShape([None]),
+        )
+
+    @classmethod
+    def from_parquet(
+        cls,
+        parquet_path: str,
+        frequencies_probs_col: str,
+        is_prob_distribution: bool = False,
+        gpu: bool = True,
+        **kwargs,
+    ) -> "AliasPopularitySampler":
+        """Load the item frequency table from a parquet file
+        (in the format automatically generated by NVTabular with workflow.fit()).
+        It supposed the parquet file has a single column with the item frequencies
+        and is indexed by item ids.
+
+        Parameters
+        ----------
+        parquet_path : str
+            Path to the parquet file
+        frequencies_probs_col : str
+            Column name containing the items frequencies / probabilities
+        is_prob_distribution: bool, optional
+            If True, the frequencies_probs_col should contain the probability
+            distribution of the items. If False, the frequencies_probs_col values
+            are frequencies and will be converted to probabilities
+        gpu : bool, optional
+            Whether to load data using cudf, by default True
+
+        Returns
+        -------
+            An instance of AliasPopularitySampler
+        """
+        if gpu:
+            import cudf
+
+            df = cudf.read_parquet(parquet_path)
+            item_frequency = tf.squeeze(df_to_tensor(df[frequencies_probs_col]))
+        else:
+            import pandas as pd
+
+            df = pd.read_parquet(parquet_path)
+            item_frequency = tf.squeeze(tf.convert_to_tensor(df[frequencies_probs_col].values))
+        return cls(
+            item_freq_probs=item_frequency, is_prob_distribution=is_prob_distribution, **kwargs
+        )
+
+    def update(
+        self, item_freq_probs: Union[tf.Tensor, Sequence], is_prob_distribution: bool = False
+    ):
+        """Updates the item frequencies / probabilities and rebuilds the alias tables
+
+        Parameters:
+        ----------
+        item_freq_probs : Union[tf.Tensor, Sequence]
+            A Tensor or list with item frequencies (if is_prob_distribution=False)
+            or with item probabilities (if is_prob_distribution=True)
+        is_prob_distribution: bool, optional
+            If True, the item_freq_probs should be a probability distribution of the items.
+            If False, the item frequencies is converted to probabilities
+        """
+        candidate_probs = get_candidate_probs(item_freq_probs, is_prob_distribution)
+        accept_probs, aliases = build_alias_tables(candidate_probs.numpy())
+        self.candidate_probs.assign(candidate_probs)
+        self.accept_probs.assign(accept_probs)
+        self.aliases.assign(aliases)
+
+    def add(self, embeddings: tf.Tensor, items_metadata: TabularData, training=True):
+        pass
+
+    def call(
+        self, inputs: TabularData, item_weights: tf.Tensor, training=True
+    ) -> EmbeddingWithMetadata:
+        tf.assert_equal(
+            tf.shape(item_weights)[0],
+            tf.shape(self.accept_probs)[0],
+            "The first dimension of the items embeddings and the number of "
+            "items in the frequency table should match.",
+        )
+
+        return self.sample(item_weights)
+
+    def sample(self, item_weights) -> EmbeddingWithMetadata:  # type: ignore
+        num_items = tf.shape(self.accept_probs, out_type=tf.int64)[0]
+        # Each draw picks a bucket uniformly and then either the bucket item
+        # or its alias, according to the bucket acceptance probability
+        buckets = tf.random.uniform(
+            (self.max_num_samples,), maxval=num_items, dtype=tf.int64, seed=self.seed
+        )
+        coins = tf.random.uniform((self.max_num_samples,), seed=self.seed)
+        sampled_ids = tf.where(
+            coins < tf.gather(self.accept_probs, buckets),
+            buckets,
+            tf.gather(self.aliases, buckets),
+        )
+
+        items_embeddings = embedding_ops.embedding_lookup(item_weights, sampled_ids)
+
+        return EmbeddingWithMetadata(
+            items_embeddings,
+            metadata={self.item_id_feature_name: tf.cast(sampled_ids, tf.int32)},
+        )
+
+    def sampling_log_q(self, sampled_items: EmbeddingWithMetadata) -> Optional[tf.Tensor]:
+        if not self.logq_correction:
+            return None
+
+        item_probs = tf.gather(
+            self.candidate_probs, sampled_items.metadata[self.item_id_feature_name]
+        )
+        epsilon = 1e-16
+        return tf.math.log(self.max_num_samples * item_probs + epsilon)
+
+
+def build_alias_tables(probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Builds the tables of the alias method for sampling from the `probs`
+    distribution, with vectorized numpy ops instead of a Python loop.
+
+    The buckets of the items with a scaled probability below 1 (small) are
+    filled in order by the excess of the items above 1 (large), laid out
+    consecutively. Each small bucket takes its whole deficit from the large
+    item whose excess range contains the start of that deficit. A large
+    item that gives away more than its excess this way is drained below 1,
+    and its own bucket is filled by the next large item, as in Vose's
+    algorithm.
+
+    Parameters
+    ----------
+    probs : np.ndarray
+        1D array with the probability of each item
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The acceptance probability of each bucket and the
+        alias (item id) sampled when a bucket is not accepted
+    """
+    num_items = probs.shape[0]
+    scaled_probs = probs.astype(np.float64) * num_items / probs.sum()
+    accept_probs = np.ones(num_items, dtype=np.float32)
+    aliases = np.arange(num_items, dtype=np.int64)
+
+    is_small = scaled_probs < 1.0
+    small, large = np.flatnonzero(is_small), np.flatnonzero(~is_small)
+    if len(small) == 0 or len(large) == 0:
+        return accept_probs, aliases
+
+    deficits = 1.0 - scaled_probs[small]
+    deficits_end = np.cumsum(deficits)
+    deficits_start = deficits_end - deficits
+    excess_end = np.cumsum(scaled_probs[large] - 1.0)
+
+    # Small buckets past the total excess (up to numerical errors) are always accepted
+    donors = np.searchsorted(excess_end, deficits_start, side="right")
+    has_donor = donors < len(large)
+    accept_probs[small[has_donor]] = scaled_probs[small[has_donor]]
+    aliases[small[has_donor]] = large[donors[has_donor]]
+
+    # A large item is drained by the small bucket whose deficit straddles the
+    # end of its excess, and the overshoot is taken from the next large item
+    straddling = np.minimum(np.searchsorted(deficits_end, excess_end, side="right"), len(small) - 1)
+    overshoots = deficits_end[straddling] - excess_end
+    is_drained = (deficits_start[straddling] < excess_end) & (overshoots > 0.0)
+    is_drained[-1] = False
+    drained = np.flatnonzero(is_drained)
+    accept_probs[large[drained]] = 1.0 - overshoots[drained]
+    aliases[large[drained]] = large[drained + 1]
+
+    return accept_probs, aliases
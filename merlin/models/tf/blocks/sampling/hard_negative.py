@@ -0,0 +1,189 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import threading
+from typing import List, Optional
+
+import tensorflow as tf
+from tensorflow.python.ops import embedding_ops
+
+from merlin.models.tf.blocks.core.base import EmbeddingWithMetadata
+from merlin.models.tf.blocks.core.index import TopKIndexBlock
+from merlin.models.tf.blocks.sampling.base import ItemSampler
+from merlin.models.tf.typing import TabularData
+
+
+class HardNegativeSampler(ItemSampler):
+    """Provides hard negatives for item retrieval models, by retrieving
+    for each query embedding of the batch the top-k items of a `TopKIndexBlock`
+    built from the item embedding table (`ModelContext.get_embedding()`).
+    Instead of scoring the catalog against the latest item embeddings at every step,
+    the index holds a snapshot of the item embedding table, which is refreshed
+    every `refresh_every_n_steps` training steps (on a background thread by default,
+    so that training is not blocked while the snapshot is taken).
+    The positive item of each query is excluded from its retrieved items, and
+    the embeddings of the sampled items are looked up from the current item
+    embedding table, so that gradients are computed for them.
+    The hard negatives of all queries are de-duplicated and shared by the batch,
+    like the negatives of the other samplers.
+    As the query embeddings are scored against the item embedding table, their
+    dimensions should match (e.g. with `ItemRetrievalScorer(..., sampled_softmax_mode=True)`).
+    The index is exact (brute-force `TopKIndexBlock`), which is practical
+    for catalogs that fit in a single top-k matmul per batch.
+
+    P.s. Ignoring the false negatives (negative items equal to the positive ones of
+    other queries) is managed by
+    `ItemRetrievalScorer(..., sampling_downscore_false_negatives=True)`
+
+    Parameters
+    ----------
+    k: int
+        Number of hard negatives to retrieve for each query, by default 10
+    refresh_every_n_steps: int
+        Number of training steps between refreshes of the index, by default 100
+    background_refresh: bool
+        Whether the index is refreshed on a background thread (in which case
+        the steps following a refresh might still use the previous snapshot)
+        or synchronously, by default True
+    item_id_feature_name: str
+        Name of the column containing the item ids
+        Defaults to `item_id`
+    """
+
+    def __init__(
+        self,
+        k: int = 10,
+        refresh_every_n_steps: int = 100,
+        background_refresh: bool = True,
+        item_id_feature_name: str = "item_id",
+        **kwargs,
+    ):
+        assert refresh_every_n_steps > 0
+        super().__init__(max_num_samples=k, **kwargs)
+        self.k = k
+        self.refresh_every_n_steps = refresh_every_n_steps
+        self.background_refresh = background_refresh
+        self.item_id_feature_name = item_id_feature_name
+
+        self.num_steps = tf.Variable(0, trainable=False, dtype=tf.int64, name="num_steps")
+        self._index: Optional[TopKIndexBlock] = None
+        self._item_weights: Optional[tf.Variable] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def index(self) -> TopKIndexBlock:
+        if self._index is None:
+            raise ValueError("The index is not built yet, you need to call() the sampler first")
+
+        return self._index
+
+    @property
+    def required_features(self) -> List[str]:
+        return [self.item_id_feature_name]
+
+    def _build_index(self, item_weights: tf.Variable) -> None:
+        if not isinstance(item_weights, tf.Variable):
+            raise ValueError(
+                "The item_weights of HardNegativeSampler should be the item embedding "
+                "table variable, so that the index can be refreshed from it."
+            )
+        self._item_weights = item_weights
+        with tf.init_scope():
+            self._index = TopKIndexBlock(
+                k=self.k,
+                values=tf.convert_to_tensor(item_weights),
+                ids=tf.range(tf.shape(item_weights, out_type=tf.int64)[0]),
+            )
+
+    def refresh_index(self) -> None:
+        """Updates the index with a snapshot of the item embedding table"""
+        self.index.values.assign(tf.convert_to_tensor(self._item_weights))
+
+    def wait_for_refresh(self) -> None:
+        """Blocks until the running background refresh (if any) is finished"""
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+
+    def _maybe_refresh_index(self, step: tf.Tensor) -> bool:
+        if int(step) % self.refresh_every_n_steps != 0:
+            return False
+
+        if not self.background_refresh:
+            self.refresh_index()
+        elif self._refresh_thread is None or not self._refresh_thread.is_alive():
+            # Skipping the refresh if the previous one is still running
+            self._refresh_thread = threading.Thread(target=self.refresh_index, daemon=True)
+            self._refresh_thread.start()
+
+        return True
+
+    def add(self, embeddings: tf.Tensor, items_metadata: TabularData, training=True):
+        pass
+
+    def call(
+        self,
+        inputs: TabularData,
+        item_weights: tf.Variable,
+        query_embeddings: tf.Tensor,
+        training=True,
+    ) -> EmbeddingWithMetadata:
+        """Retrieves the hard negatives of the batch queries
+
+        Parameters
+        ----------
+        inputs : TabularData
+            Dict with two keys:
+              "items_embeddings": Items embeddings tensor
+              "items_metadata": Dict like `{"<feature name>": "<feature tensor>"}` which
+              must contain the (positive) item ids feature.
+        item_weights : tf.Variable
+            The item embedding table
+        query_embeddings : tf.Tensor
+            The batch query embeddings
+        training : bool, optional
+            Flag indicating if on training mode, by default True
+
+        Returns
+        -------
+        EmbeddingWithMetadata
+            Value object with the sampled item embeddings and item metadata
+        """
+        if self._index is None:
+            self._build_index(item_weights)
+
+        if training:
+            step = self.num_steps.assign_add(1)
+            tf.py_function(self._maybe_refresh_index, [step], tf.bool)
+
+        return self.sample(
+            query_embeddings, inputs["metadata"][self.item_id_feature_name], item_weights
+        )
+
+    def sample(  # type: ignore
+        self, query_embeddings: tf.Tensor, positive_item_ids: tf.Tensor, item_weights: tf.Tensor
+    ) -> EmbeddingWithMetadata:
+        _, top_ids = self.index(
+            tf.stop_gradient(query_embeddings),
+            k=self.k,
+            exclude=tf.reshape(positive_item_ids, (-1, 1)),
+        )
+        sampled_ids, _ = tf.unique(tf.reshape(top_ids, (-1,)))
+
+        items_embeddings = embedding_ops.embedding_lookup(item_weights, sampled_ids)
+
+        return EmbeddingWithMetadata(
+            items_embeddings,
+            metadata={self.item_id_feature_name: tf.cast(sampled_ids, tf.int32)},
+        )
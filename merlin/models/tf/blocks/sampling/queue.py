@@ -46,6 +46,13 @@ class FIFOQueue(Layer):
             P.s. It is important that for categorical features the storage Variable is not
             initialized with a valid categorical value (e.g. values >= 0), so that `index_of()`
             works properly
+        index_ids : bool, optional
+            Whether to keep a hash map from the stored ids to their position in the queue,
+            so that `index_of()` costs O(number of search ids) instead of
+            O(number of search ids x capacity), by default False.
+            Only available for queues of int scalars (dims=[]). It is recommended
+            when the stored ids are unique (e.g. item ids in `CachedUniformSampler`), as
+            for repeated ids the hash map keeps the position of the last one added.
     """
 
     def __init__(
@@ -55,9 +62,12 @@ class FIFOQueue(Layer):
         dims: List[int] = [],
         queue_name: str = "",
         initialize_tensor: tf.Tensor = None,
+        index_ids: bool = False,
         **kwargs,
     ):
         assert capacity > 0
+        if index_ids:
+            self._check_indexable(dtype, dims)
 
         super(FIFOQueue, self).__init__(**kwargs)
         self.capacity = capacity
@@ -99,6 +109,50 @@ class FIFOQueue(Layer):
             dtype=self.queue_dtype,
         )
 
+        self._ids_index = None
+        if index_ids:
+            self._ids_index = tf.lookup.experimental.MutableHashTable(
+                key_dtype=tf.int64,
+                value_dtype=tf.int64,
+                default_value=-1,
+                name=f"{self.queue_name}/fifo_queue_ids_index",
+            )
+
+    @staticmethod
+    def _check_indexable(dtype: tf.DType, dims: List[int]) -> None:
+        assert dtype in [tf.int8, tf.int16, tf.int32, tf.int64], (
+            "The index_of method is only available for queues with an int dtype "
+            "(tf.int8, tf.int16, tf.int32, tf.int64)"
+        )
+        assert dims == [], "The index_of method is only available for queues of scalars (dims=[])"
+
+    def _reindex_slots(self, slots: tf.Tensor, values: tf.Tensor) -> None:
+        """Updates the ids index before `values` are written into the
+        storage `slots`, removing the ids being overwritten"""
+        if self._ids_index is None:
+            return
+        slots = tf.cast(slots, tf.int64)
+        self._unindex_slots(slots)
+        self._ids_index.insert(tf.cast(values, tf.int64), slots)
+
+    def _unindex_slots(self, slots: tf.Tensor) -> None:
+        """Removes from the ids index the ids stored in `slots`"""
+        if self._ids_index is None:
+            return
+        slots = tf.cast(slots, tf.int64)
+        old_ids = tf.cast(tf.gather(self.storage, slots), tf.int64)
+        # Only removing ids whose indexed position is the slot, as
+        # a repeated id might have been added afterwards to another slot
+        is_indexed_slot = tf.equal(self._lookup_ids_index(old_ids), slots)
+        self._ids_index.remove(tf.boolean_mask(old_ids, is_indexed_slot))
+
+    def _lookup_ids_index(self, ids: tf.Tensor) -> tf.Tensor:
+        ids = tf.cast(ids, tf.int64)
+        indices = self._ids_index.lookup(ids)
+        # The hash table lookup does not keep the static shape of the ids
+        indices.set_shape(ids.shape)
+        return indices
+
     def enqueue(self, val: tf.Tensor) -> None:
         """Enqueues an example into the queue
 
@@ -111,15 +165,7 @@ class FIFOQueue(Layer):
         assert len(val.shape) == len(self.dims), "The rank of val and self.dims should match"
         assert list(val.shape) == self.dims, "The shape of val and self.dims should match"
 
-        self.storage[self.next_available_pointer].assign(val)
-
-        self.next_available_pointer.assign_add(1)
-        if self.next_available_pointer >= self.capacity:
-            self.next_available_pointer.assign(0)
-
-        if self.at_full_capacity or self.next_available_pointer == self.first_pointer:
-            self.first_pointer.assign(self.next_available_pointer)
-            self.at_full_capacity.assign(True)
+        self.enqueue_many(tf.expand_dims(val, 0))
 
     def _check_input_values(self, values):
         assert len(tf.shape(values)) == len(self.dims) + 1, (
@@ -131,8 +177,17 @@ class FIFOQueue(Layer):
             "self.dims should match"
         )
 
+    def _slots(self, start: tf.Tensor, num_slots: tf.Tensor) -> tf.Tensor:
+        """Returns the storage positions of `num_slots` consecutive
+        queue slots from the `start` position, wrapping around the storage"""
+        return (start + tf.range(num_slots, dtype=tf.int32)) % self.capacity
+
     def enqueue_many(self, vals: tf.Tensor) -> None:
         """Enqueues many examples into the queue.
+        The examples are written with a single scatter into the storage
+        slots `(next + arange(n)) % capacity` and the pointers are updated with
+        tensor ops, so that this method can be traced by `tf.function`
+        (including with `jit_compile=True`, if `index_ids=False`).
 
         Parameters
         ----------
@@ -146,32 +201,18 @@ class FIFOQueue(Layer):
 
         # if values are larger than the queue capacity N, enqueueing only the last N items
         vals = vals[-self.capacity :]
-        num_vals = int(tf.shape(vals)[0])
-
-        next_pos_start = self.next_available_pointer
-        next_pos_end = next_pos_start + num_vals
-        if next_pos_end < self.capacity:
-            self.storage[next_pos_start:next_pos_end].assign(vals)
+        num_vals = tf.shape(vals)[0]
 
-            if self.at_full_capacity or (
-                next_pos_start < self.first_pointer and next_pos_end >= self.first_pointer
-            ):
-                self.first_pointer.assign(next_pos_end)
-                self.at_full_capacity.assign(True)
-        else:
-            num_overplus_items = next_pos_end - self.capacity
-            next_pos_end = self.capacity
-            self.storage[next_pos_start:next_pos_end].assign(vals[: num_vals - num_overplus_items])
+        count = self.count()
+        slots = self._slots(self.next_available_pointer, num_vals)
+        self._reindex_slots(slots, vals)
+        self.storage.scatter_nd_update(tf.expand_dims(slots, -1), vals)
 
-            next_pos_start = 0
-            next_pos_end = num_overplus_items
-            self.storage[next_pos_start:next_pos_end].assign(vals[num_vals - num_overplus_items :])
-
-            if self.at_full_capacity or next_pos_end >= self.first_pointer:
-                self.first_pointer.assign(next_pos_end)
-                self.at_full_capacity.assign(True)
-
-        self.next_available_pointer.assign(next_pos_end)
+        new_count = tf.minimum(count + num_vals, self.capacity)
+        next_pointer = (self.next_available_pointer + num_vals) % self.capacity
+        self.next_available_pointer.assign(next_pointer)
+        self.first_pointer.assign((next_pointer - new_count) % self.capacity)
+        self.at_full_capacity.assign(tf.equal(new_count, self.capacity))
 
     def dequeue(self) -> tf.Tensor:
         """Dequeues a single example from the queue
@@ -186,17 +227,12 @@ class FIFOQueue(Layer):
         IndexError
             The queue is empty
         """
-        if self.first_pointer == self.next_available_pointer:
-            raise IndexError("The queue is empty")
-        self.at_full_capacity.assign(False)
-        val = self.storage[self.first_pointer]
-        self.first_pointer.assign_add(1)
-        if self.first_pointer >= self.capacity:
-            self.first_pointer.assign(0)
-        return val
+        return self.dequeue_many(1)[0]
 
     def dequeue_many(self, n: int) -> tf.Tensor:
-        """Dequeues many examples from the queue
+        """Dequeues many examples from the queue.
+        When running eagerly an `IndexError` is raised if the queue is empty,
+        when traced by `tf.function` an empty tensor is returned instead.
 
         Parameters
         ----------
@@ -215,31 +251,19 @@ class FIFOQueue(Layer):
         ValueError
             The number of elements to dequeue must be greater than 0
         """
-        if self.first_pointer == self.next_available_pointer:
+        count = self.count()
+        if tf.executing_eagerly() and count == 0:
             raise IndexError("The queue is empty")
         if n <= 0:
             raise ValueError("The number of elements to dequeue must be greater than 0.")
-        self.at_full_capacity.assign(False)
-        next_pos_start = self.first_pointer
-        next_pos_end = next_pos_start + n
-
-        if self.next_available_pointer > self.first_pointer:
-            next_pos_end = min(next_pos_end, self.next_available_pointer)
 
-        if next_pos_end < self.capacity:
-            vals = self.storage[next_pos_start:next_pos_end]
-        else:
-            num_missing_items = next_pos_end - self.capacity
-            next_pos_end = self.capacity
-            vals1 = self.storage[next_pos_start:next_pos_end]
+        num_vals = tf.minimum(n, count)
+        slots = self._slots(self.first_pointer, num_vals)
+        vals = tf.gather(self.storage, slots)
 
-            next_pos_start = 0
-            next_pos_end = min(num_missing_items, self.next_available_pointer)
-            vals2 = self.storage[next_pos_start:next_pos_end]
-
-            vals = tf.concat([vals1, vals2], axis=0)
-
-        self.first_pointer.assign(next_pos_end)
+        self._unindex_slots(slots)
+        self.first_pointer.assign((self.first_pointer + num_vals) % self.capacity)
+        self.at_full_capacity.assign(tf.logical_and(self.at_full_capacity, num_vals == 0))
         return vals
 
     def list_all(self) -> tf.Tensor:
@@ -251,35 +275,27 @@ class FIFOQueue(Layer):
         tf.Tensor
             Returns a tensor with all examples added to the queue
         """
-        if self.first_pointer < self.next_available_pointer:
-            return self.storage[self.first_pointer : self.next_available_pointer]
-        elif self.first_pointer == self.next_available_pointer and not self.at_full_capacity:
-            return self.storage[0:0]  # Returns empty Tensor when queue is empty
-        else:
-            return tf.concat(
-                [self.storage[self.first_pointer :], self.storage[: self.next_available_pointer]],
-                axis=0,
-            )
+        return tf.gather(self.storage, self._slots(self.first_pointer, self.count()))
 
-    def count(self) -> int:
+    def count(self) -> tf.Tensor:
         """Returns the number of examples added to the queue
 
         Returns
         -------
-        int
+        tf.Tensor
             The number of examples added to the queue
         """
-        if self.first_pointer < self.next_available_pointer:
-            return self.next_available_pointer - self.first_pointer
-        elif self.at_full_capacity:
-            return self.capacity
-        elif self.first_pointer == self.next_available_pointer:
-            return 0
-        else:
-            return self.capacity - self.first_pointer + self.next_available_pointer
+        return tf.where(
+            self.at_full_capacity,
+            self.capacity,
+            (self.next_available_pointer - self.first_pointer) % self.capacity,
+        )
 
     def clear(self) -> None:
         """Removes all examples from the queue"""
+        if self._ids_index is not None:
+            # The index only contains ids that are in the storage
+            self._ids_index.remove(tf.cast(self.storage, tf.int64))
         self.first_pointer.assign(0)
         self.next_available_pointer.assign(0)
         self.at_full_capacity.assign(False)
@@ -299,13 +315,10 @@ class FIFOQueue(Layer):
             1D tensor with the same size of the input ids, containing the indices of the
             ids in the queue (-1 if not found)
         """
-        assert self.queue_dtype in [tf.int8, tf.int16, tf.int32, tf.int64], (
-            "The index_of method is only available for queues with an int dtype "
-            "(tf.int8, tf.int16, tf.int32, tf.int64)"
-        )
-        assert (
-            self.dims == []
-        ), "The index_of method is only available for queues of scalars (dims=[])"
+        self._check_indexable(self.queue_dtype, self.dims)
+
+        if self._ids_index is not None:
+            return self._lookup_ids_index(ids)
 
         # item_ids_indices = tf.where(tf.equal(ids, self.storage))
         equal_tensor = tf.cast(tf.equal(self.storage, tf.expand_dims(ids, -1)), tf.int32)
@@ -353,4 +366,5 @@ class FIFOQueue(Layer):
             "The number of indices and values should match",
         )
 
+        self._reindex_slots(tf.reshape(indices, [-1]), values)
         self.storage.scatter_nd_update(indices, values)
@@ -14,10 +14,13 @@
 # limitations under the License.
 #
 
+import math
 from copy import copy, deepcopy
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional, Union
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union
 
+import numpy as np
 import tensorflow as tf
 from tensorflow.python import to_dlpack
 from tensorflow.python.keras import backend
@@ -33,13 +36,21 @@ from merlin.models.tf.blocks.core.tabular import (
     TabularBlock,
 )
 from merlin.models.tf.blocks.core.transformations import AsDenseFeatures, AsSparseFeatures
+from merlin.models.tf.features.embedding_cache import MemoryMappedEmbeddingCache
+from merlin.models.tf.optimizers.multi import mark_embedding_variable
 
 # pylint has issues with TF array ops, so disable checks until fixed:
 # https://github.com/PyCQA/pylint/issues/3613
 # pylint: disable=no-value-for-parameter, unexpected-keyword-arg
 from merlin.models.tf.typing import TabularData
+from merlin.models.tf.utils.tf_utils import (
+    dequantize_rows_int8,
+    quantize_rows_int8,
+    untrack_variable,
+)
 from merlin.models.utils import schema_utils
 from merlin.models.utils.doc_utils import docstring_parameter
+from merlin.models.utils.export_utils import embedding_writer
 from merlin.schema import Schema, Tags, TagsType
 
 EMBEDDING_FEATURES_PARAMS_DOCSTRING = """
@@ -48,6 +59,18 @@ EMBEDDING_FEATURES_PARAMS_DOCSTRING = """
         TableConfig can be used for multiple features.
     item_id: str, optional
         The name of the feature that's used for the item_id.
+    deduplicate_lookups: bool, optional
+        If enabled, the (dense) ids of the batch are de-duplicated with `tf.unique()` before
+        the embeddings are gathered, so that the gradient of the embedding tables has a single
+        row per unique id (which reduces the sparse updates of the optimizer for features
+        with many repeated ids, like popular items), by default False.
+        (The lookups of multi-hot features are always de-duplicated.)
+    fuse_lookups: bool, optional
+        If enabled, the ids of all the features that share the same table
+        (e.g. the features with the same domain in the schema) are concatenated
+        and looked up with a single gather, whose embeddings are split back per feature,
+        and the L2 regularization of the embeddings is added as a single loss,
+        by default False.
 """
 
 
@@ -63,6 +86,757 @@ class EmbeddingOptions:
     ] = None
     embeddings_l2_reg: float = 0.0
     combiner: Optional[str] = "mean"
+    deduplicate_lookups: bool = False
+    fuse_lookups: bool = False
+    # The options of the tables, keyed by feature name or by domain (table name).
+    # The features with the same domain share the same table, so its options
+    # can be set only once per domain.
+    compositional_embeddings: Optional[Dict[str, Dict[str, Any]]] = None
+    mixed_dimension_embeddings: Optional[Dict[str, Dict[str, Any]]] = None
+    memory_mapped_embeddings: Optional[Dict[str, Dict[str, Any]]] = None
+    dynamic_vocab_embeddings: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+class MultiTableConfig(TableConfig):
+    """Base configuration of the embedding tables that are stored as a few weights
+    (instead of a single `(vocabulary_size, dim)` table), which are looked up
+    by `embedding_lookup()`.
+    """
+
+    def table_weights(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Name suffixes and `add_weight()` arguments of the weights of the table"""
+        raise NotImplementedError()
+
+    def is_embedding_rows(self, suffix: str) -> bool:
+        """Whether the weight of the table with this name suffix stores embedding rows,
+        which are looked up by id (see `mark_embedding_variable()`), by default True"""
+        return True
+
+    def table_resources(self) -> List[Any]:
+        """Other trackable resources of the table (e.g. lookup tables), which are
+        created after the weights and passed to `embedding_lookup()` after them"""
+        return []
+
+    def embedding_lookup(self, tables: List[tf.Variable], ids: tf.Tensor) -> tf.Tensor:
+        """Looks up the embeddings of the ids from the weights of the table"""
+        raise NotImplementedError()
+
+    def materialize(self, tables: List[tf.Variable]) -> tf.Tensor:
+        """Returns the `(vocabulary_size, dim)` embeddings of all the ids"""
+        return self.embedding_lookup(tables, tf.range(self.vocabulary_size))
+
+    def materialized_ids(self, tables: List[tf.Variable]) -> Optional[tf.Tensor]:
+        """Returns the ids of the rows of `materialize()` (with -1 for the unused rows),
+        or None if the rows are the ids `[0, vocabulary_size)`"""
+        return None
+
+    def embedding_lookup_sparse(
+        self, tables: List[tf.Variable], sp_ids: tf.SparseTensor, **kwargs
+    ) -> tf.Tensor:
+        """Looks up and combines the embeddings of the (2-D) sparse ids for each row,
+        like `tf.nn.safe_embedding_lookup_sparse` (with the combiner of the table)"""
+        gather_fn = partial(self.embedding_lookup, **kwargs)
+
+        return pooled_embedding_lookup(gather_fn, tables, [sp_ids], combiner=self.combiner)[0]
+
+
+class CompositionalTableConfig(MultiTableConfig):
+    """Configuration of a compositional embedding table, which represents each of
+    the `vocabulary_size` ids by combining rows of a few smaller tables, so that the
+    memory grows sublinearly with the cardinality (e.g. with `num_buckets=sqrt(vocabulary_size)`).
+
+    Two strategies are supported to map an id to the rows of the smaller tables:
+      - "quotient_remainder" [1]: the rows `id // num_buckets` and `id % num_buckets`
+        of two tables. The pairs of rows are unique, so different ids never share
+        the same embedding.
+      - "multi_hash": the rows `h_i(id) % num_buckets` of `num_hashes` tables,
+        with `h_i` independent universal hash functions.
+
+    References
+    ----------
+    .. [1] Shi, Hao-Jun Michael, et al. "Compositional embeddings using complementary
+       partitions for memory-efficient recommendation systems." KDD 2020.
+
+    Parameters
+    ----------
+    vocabulary_size: int
+        Number of ids of the (virtual) table.
+    dim: int
+        Dimension of the embeddings.
+    strategy: str
+        Either "quotient_remainder" or "multi_hash", by default "quotient_remainder"
+    operation: str
+        How the rows of the smaller tables are combined: "mult" (element-wise product),
+        "sum" or "concat" (in which case the `dim` is split between the tables),
+        by default "mult"
+    num_buckets: Optional[int]
+        Number of rows of the remainder table ("quotient_remainder") or of each
+        hashed table ("multi_hash"), by default `ceil(sqrt(vocabulary_size))`
+    num_hashes: int
+        Number of hashed tables of the "multi_hash" strategy, by default 2
+    initializer, optimizer, combiner, name, **kwargs:
+        Same as `TableConfig`. With the "mult" operation, only the first table is
+        initialized with the `initializer` (the others are initialized close to one),
+        so that the initial embeddings follow its distribution.
+    """
+
+    STRATEGIES = ("quotient_remainder", "multi_hash")
+    OPERATIONS = ("mult", "sum", "concat")
+    # Mersenne prime used by the universal hash functions of the "multi_hash" strategy
+    HASH_PRIME = 2**31 - 1
+
+    def __init__(
+        self,
+        vocabulary_size: int,
+        dim: int,
+        strategy: str = "quotient_remainder",
+        operation: str = "mult",
+        num_buckets: Optional[int] = None,
+        num_hashes: int = 2,
+        initializer: Optional[Callable[[Any], None]] = None,
+        optimizer=None,
+        combiner: str = "mean",
+        name: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            vocabulary_size,
+            dim,
+            initializer=initializer,
+            optimizer=optimizer,
+            combiner=combiner,
+            name=name,
+            **kwargs,
+        )
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy must be one of {self.STRATEGIES}. Received: {strategy}")
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"operation must be one of {self.OPERATIONS}. Received: {operation}")
+        self.strategy = strategy
+        self.operation = operation
+        self.num_buckets = num_buckets or int(math.ceil(math.sqrt(vocabulary_size)))
+        self.num_hashes = num_hashes
+        if operation == "concat" and dim < self.num_tables:
+            raise ValueError(
+                f"The dim ({dim}) of a concatenated compositional table "
+                f"should be at least its number of tables ({self.num_tables})"
+            )
+
+    @property
+    def num_tables(self) -> int:
+        return 2 if self.strategy == "quotient_remainder" else self.num_hashes
+
+    @property
+    def table_shapes(self) -> List[Tuple[int, int]]:
+        """Shapes of the smaller tables"""
+        if self.operation == "concat":
+            dims = [
+                self.dim // self.num_tables + int(i < self.dim % self.num_tables)
+                for i in range(self.num_tables)
+            ]
+        else:
+            dims = [self.dim] * self.num_tables
+
+        if self.strategy == "quotient_remainder":
+            num_rows = [int(math.ceil(self.vocabulary_size / self.num_buckets)), self.num_buckets]
+        else:
+            num_rows = [self.num_buckets] * self.num_tables
+
+        return list(zip(num_rows, dims))
+
+    def table_initializer(self, index: int):
+        if self.operation == "mult" and index > 0:
+            return tf.keras.initializers.TruncatedNormal(mean=1.0, stddev=0.05)
+
+        return self.initializer
+
+    def table_weights(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [
+            (f"part_{i}", dict(shape=shape, initializer=self.table_initializer(i)))
+            for i, shape in enumerate(self.table_shapes)
+        ]
+
+    def table_ids(self, ids: tf.Tensor) -> List[tf.Tensor]:
+        """Maps the ids to the row ids of each of the smaller tables"""
+        ids = tf.cast(ids, tf.int64)
+        if self.strategy == "quotient_remainder":
+            return [ids // self.num_buckets, ids % self.num_buckets]
+
+        # Fixed coefficients, so that the ids are hashed the same way when the model is reloaded
+        coefficients = np.random.RandomState(0).randint(1, self.HASH_PRIME, (self.num_hashes, 2))
+        ids = ids % self.HASH_PRIME
+        return [
+            ((int(a) * ids + int(b)) % self.HASH_PRIME) % self.num_buckets for a, b in coefficients
+        ]
+
+    def embedding_lookup(self, tables: List[tf.Variable], ids: tf.Tensor) -> tf.Tensor:
+        """Looks up the (composed) embeddings of the ids"""
+        embeddings = [tf.gather(table, t_ids) for table, t_ids in zip(tables, self.table_ids(ids))]
+
+        if self.operation == "concat":
+            return tf.concat(embeddings, axis=-1)
+        outputs = embeddings[0]
+        for emb in embeddings[1:]:
+            outputs = outputs * emb if self.operation == "mult" else outputs + emb
+
+        return outputs
+
+
+class MixedDimensionTableConfig(MultiTableConfig):
+    """Configuration of a mixed-dimension embedding table [1], which partitions the ids
+    into buckets of decreasing frequency: the ids of the (small) head buckets have
+    wide embeddings, and the ids of the (large) tail buckets have narrow embeddings,
+    which are projected up to the common `dim`. This cuts the parameters
+    (and optimizer states) of long-tail features several-fold.
+
+    The buckets are defined on the frequency ranks of the ids. If the `frequencies`
+    are not provided, the ids are assumed to be sorted by decreasing frequency
+    (i.e. the rank of an id is the id itself).
+
+    References
+    ----------
+    .. [1] Ginart, Antonio A., et al. "Mixed dimension embeddings with application to
+       memory-efficient recommendation systems." ISIT 2021.
+
+    Parameters
+    ----------
+    vocabulary_size: int
+        Number of ids of the table.
+    dim: int
+        Dimension of the (projected) embeddings.
+    bucket_dims: Optional[Sequence[int]]
+        Dimensions of the embeddings of each bucket, from the most to the least
+        frequent ids, by default `dim` halved for each of the `num_buckets` buckets
+    bucket_sizes: Optional[Sequence[int]]
+        Number of ids of each bucket, summing to `vocabulary_size`. By default,
+        the buckets are computed from the `frequencies`, so that each bucket
+        accounts for the same share of the lookups.
+    num_buckets: int
+        Number of buckets, if neither `bucket_dims` nor `bucket_sizes` are provided,
+        by default 4
+    frequencies: Optional[Sequence[int]]
+        Number of occurrences of each id (e.g. from the unique values parquet file of
+        the NVTabular Categorify op, see
+        `merlin.models.utils.schema_utils.categorical_frequencies_from_parquet`).
+        The frequency ranks of the ids are stored as a (non-trainable) weight,
+        so the frequencies are not part of the serialized config.
+    rank_by_frequency: Optional[bool]
+        Whether the ids are mapped to their frequency ranks,
+        by default whether `frequencies` are provided
+    initializer, optimizer, combiner, name, **kwargs:
+        Same as `TableConfig`
+    """
+
+    def __init__(
+        self,
+        vocabulary_size: int,
+        dim: int,
+        bucket_dims: Optional[Sequence[int]] = None,
+        bucket_sizes: Optional[Sequence[int]] = None,
+        num_buckets: int = 4,
+        frequencies: Optional[Sequence[int]] = None,
+        rank_by_frequency: Optional[bool] = None,
+        initializer: Optional[Callable[[Any], None]] = None,
+        optimizer=None,
+        combiner: str = "mean",
+        name: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            vocabulary_size,
+            dim,
+            initializer=initializer,
+            optimizer=optimizer,
+            combiner=combiner,
+            name=name,
+            **kwargs,
+        )
+        if bucket_dims:
+            num_buckets = len(bucket_dims)
+        elif bucket_sizes:
+            num_buckets = len(bucket_sizes)
+        if not bucket_dims:
+            bucket_dims = [max(dim // 2**i, 1) for i in range(num_buckets)]
+
+        if frequencies is not None:
+            frequencies = np.asarray(frequencies)
+            if frequencies.shape != (vocabulary_size,):
+                raise ValueError(
+                    f"The frequencies should have one value for each of the "
+                    f"{vocabulary_size} ids. Received shape: {frequencies.shape}"
+                )
+        if not bucket_sizes:
+            if frequencies is None:
+                raise ValueError("Either the bucket_sizes or the frequencies should be provided")
+            bucket_sizes = self._equal_share_bucket_sizes(frequencies, len(bucket_dims))
+
+        if len(bucket_sizes) != len(bucket_dims) or sum(bucket_sizes) != vocabulary_size:
+            raise ValueError(
+                f"There should be one bucket size for each of the {len(bucket_dims)} bucket dims, "
+                f"summing to the vocabulary size ({vocabulary_size}). Received: {bucket_sizes}"
+            )
+        if min(bucket_sizes) < 1 or min(bucket_dims) < 1:
+            raise ValueError("The bucket sizes and dims should be positive")
+
+        self.bucket_dims = [int(d) for d in bucket_dims]
+        self.bucket_sizes = [int(size) for size in bucket_sizes]
+        self.rank_by_frequency = (
+            frequencies is not None if rank_by_frequency is None else rank_by_frequency
+        )
+        self.frequencies = frequencies
+
+    @staticmethod
+    def _equal_share_bucket_sizes(frequencies: np.ndarray, num_buckets: int) -> List[int]:
+        if len(frequencies) < num_buckets:
+            raise ValueError(f"Can't split {len(frequencies)} ids into {num_buckets} buckets")
+        sorted_frequencies = np.sort(frequencies.astype(np.float64))[::-1]
+        cumulative_share = np.cumsum(sorted_frequencies) / max(np.sum(sorted_frequencies), 1)
+        ends = np.searchsorted(cumulative_share, np.arange(1, num_buckets) / num_buckets) + 1
+        ends = list(ends) + [len(frequencies)]
+        # Each bucket should have at least one id
+        for i in range(num_buckets - 1):
+            lowest = ends[i - 1] + 1 if i > 0 else 1
+            ends[i] = min(max(ends[i], lowest), len(frequencies) - (num_buckets - 1 - i))
+
+        return list(np.diff([0] + ends))
+
+    def _id_ranks_initializer(self, shape, dtype=None):
+        if self.frequencies is None:
+            return tf.range(shape[0], dtype=dtype)
+        ranks = np.empty(self.vocabulary_size, dtype=np.int64)
+        ranks[np.argsort(-self.frequencies, kind="stable")] = np.arange(self.vocabulary_size)
+
+        return tf.constant(ranks, dtype=dtype)
+
+    def is_embedding_rows(self, suffix: str) -> bool:
+        # The projections of the buckets are dense weights
+        return not suffix.endswith("_projection")
+
+    def table_weights(self) -> List[Tuple[str, Dict[str, Any]]]:
+        weights = [
+            (f"bucket_{i}", dict(shape=(size, bucket_dim), initializer=self.initializer))
+            for i, (size, bucket_dim) in enumerate(zip(self.bucket_sizes, self.bucket_dims))
+        ]
+        for i, bucket_dim in enumerate(self.bucket_dims):
+            if bucket_dim != self.dim:
+                weights.append(
+                    (
+                        f"bucket_{i}_projection",
+                        dict(shape=(bucket_dim, self.dim), initializer="glorot_uniform"),
+                    )
+                )
+        if self.rank_by_frequency:
+            weights.append(
+                (
+                    "id_ranks",
+                    dict(
+                        shape=(self.vocabulary_size,),
+                        dtype=tf.int64,
+                        trainable=False,
+                        initializer=self._id_ranks_initializer,
+                    ),
+                )
+            )
+
+        return weights
+
+    def embedding_lookup(self, tables: List[tf.Variable], ids: tf.Tensor) -> tf.Tensor:
+        num_buckets = len(self.bucket_sizes)
+        projections = iter(tables[num_buckets:])
+        offsets = np.cumsum([0] + self.bucket_sizes)
+
+        flat_ids = tf.reshape(tf.cast(ids, tf.int64), (-1,))
+        ranks = tf.gather(tables[-1], flat_ids) if self.rank_by_frequency else flat_ids
+        buckets = tf.searchsorted(tf.constant(offsets[1:-1], dtype=tf.int64), ranks, side="right")
+        positions = tf.dynamic_partition(tf.range(tf.size(flat_ids)), buckets, num_buckets)
+        bucket_ranks = tf.dynamic_partition(ranks, buckets, num_buckets)
+
+        embeddings = []
+        for i, bucket_dim in enumerate(self.bucket_dims):
+            emb = tf.gather(tables[i], bucket_ranks[i] - offsets[i])
+            if bucket_dim != self.dim:
+                emb = tf.matmul(emb, next(projections))
+            embeddings.append(emb)
+
+        outputs = tf.dynamic_stitch(positions, embeddings)
+        outputs = tf.reshape(outputs, tf.concat([tf.shape(ids), [self.dim]], axis=0))
+        outputs.set_shape(ids.shape.concatenate([self.dim]))
+
+        return outputs
+
+
+class MemoryMappedTableConfig(MultiTableConfig):
+    """Configuration of a disk-backed embedding table, for tables larger than the host memory.
+    The full table is kept in a memory-mapped file at `path`, and the embeddings are
+    looked up from a cache variable of the `cache_size` hot rows, which are the ones
+    trained by the optimizer (see `MemoryMappedEmbeddingCache`).
+    The rows that are evicted from the cache (by the "lru" or "lfu" policy)
+    are written back to the file, and `flush()` writes back the rows
+    that are still in the cache (e.g. at the end of the training).
+
+    To read the rows of the upcoming batches from the file in the background,
+    `EmbeddingFeatures.prefetch` can be mapped on the data loader, whose map functions
+    are called when the batches of the next chunk are created:
+    `loader.map(embedding_features.prefetch)`.
+
+    The lookups run eagerly (in a `tf.py_function`), so models using this table
+    can't be exported as SavedModels for serving. Also note that the optimizer states
+    (e.g. Adam moments) are kept per cache row, so they are not carried over when a
+    row is evicted (stateless or row-wise optimizers like `SGD` or `RowWiseAdagrad`
+    are a better fit).
+
+    Parameters
+    ----------
+    vocabulary_size: int
+        Number of rows of the table.
+    dim: int
+        Dimension of the embeddings.
+    path: str
+        Path of the memory-mapped file. If it doesn't exist, it is created and
+        initialized with the `initializer`.
+    cache_size: int
+        Number of rows of the cache, which should be at least the number
+        of unique ids of a batch, by default 100000
+    eviction_policy: str
+        Either "lru" (least recently used) or "lfu" (least frequently used),
+        by default "lru"
+    initializer, optimizer, combiner, name, **kwargs:
+        Same as `TableConfig`
+    """
+
+    EVICTION_POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        vocabulary_size: int,
+        dim: int,
+        path: str,
+        cache_size: int = 100000,
+        eviction_policy: str = "lru",
+        initializer: Optional[Callable[[Any], None]] = None,
+        optimizer=None,
+        combiner: str = "mean",
+        name: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            vocabulary_size,
+            dim,
+            initializer=initializer,
+            optimizer=optimizer,
+            combiner=combiner,
+            name=name,
+            **kwargs,
+        )
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(
+                f"eviction_policy must be one of {self.EVICTION_POLICIES}. "
+                f"Received: {eviction_policy}"
+            )
+        self.path = path
+        self.cache_size = min(cache_size, vocabulary_size)
+        self.eviction_policy = eviction_policy
+        self._cache: Optional[MemoryMappedEmbeddingCache] = None
+
+    @property
+    def cache(self) -> MemoryMappedEmbeddingCache:
+        if self._cache is None:
+            raise ValueError("The cache is not created yet, the table needs to be looked up first")
+
+        return self._cache
+
+    def table_weights(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [("cache", dict(shape=(self.cache_size, self.dim), initializer="zeros"))]
+
+    def _get_cache(self, tables: List[tf.Variable]) -> MemoryMappedEmbeddingCache:
+        if self._cache is None or self._cache.cache is not tables[0]:
+            # The file might be initialized while the lookup is traced
+            with tf.init_scope():
+                self._cache = MemoryMappedEmbeddingCache(
+                    self.path,
+                    self.vocabulary_size,
+                    self.dim,
+                    tables[0],
+                    eviction_policy=self.eviction_policy,
+                    initializer=self.initializer,
+                )
+
+        return self._cache
+
+    def embedding_lookup(self, tables: List[tf.Variable], ids: tf.Tensor) -> tf.Tensor:
+        cache = self._get_cache(tables)
+        slots = tf.py_function(cache.lookup, [tf.reshape(ids, (-1,))], tf.int64)
+        slots = tf.reshape(slots, tf.shape(ids))
+        slots.set_shape(ids.shape)
+
+        return tf.gather(tables[0], slots)
+
+    def materialize(self, tables: List[tf.Variable]) -> tf.Tensor:
+        """Returns the whole table as a tensor, which reads all the rows of the file
+        in memory (`export_embedding_table()` streams them with `iter_chunks()` instead)"""
+        cache = self._get_cache(tables)
+        cache.flush()
+
+        return tf.constant(np.asarray(cache.table))
+
+    def iter_chunks(self, tables: List[tf.Variable], chunk_size: int) -> Iterator[np.ndarray]:
+        """Yields the rows of the table in chunks of `chunk_size` rows, which are
+        read from the file one chunk at a time (after writing back the cache)"""
+        cache = self._get_cache(tables)
+        cache.flush()
+        for start in range(0, self.vocabulary_size, chunk_size):
+            yield np.array(cache.table[start : start + chunk_size])
+
+    def prefetch(self, ids: np.ndarray):
+        """Reads the rows of the ids from the file, if the table was already looked up"""
+        if self._cache is not None:
+            self._cache.prefetch(ids)
+
+    def flush(self):
+        """Writes back the rows of the cache to the file"""
+        if self._cache is not None:
+            self._cache.flush()
+
+
+class DynamicVocabTableConfig(MultiTableConfig):
+    """Configuration of an embedding table with a dynamic vocabulary, for raw ids
+    (e.g. new items or users) that are not categorified into `[0, vocabulary_size)`.
+    The raw ids are mapped to the `vocabulary_size` slots (rows) of the table by a mutable
+    hash table, and the ids that are not in the table get a slot when they are first
+    looked up during training. When the table is full, the slots of the least recently
+    (LRU) or least frequently (LFU) looked up ids are reused for the new ids.
+
+    The ids that are not in the table are looked up as zeros during evaluation
+    and inference. The ids of the slots are stored in the `slot_ids` weight
+    (-1 for the free slots), so `EmbeddingFeatures.export_embedding_table()`
+    exports the raw ids of the occupied slots along with their embeddings.
+
+    Parameters
+    ----------
+    vocabulary_size: int
+        Number of slots (rows) of the table.
+    dim: int
+        Dimension of the embeddings.
+    capacity: Optional[int]
+        If set, overrides the `vocabulary_size` (e.g. to have a larger table than
+        the cardinality of the schema), by default None
+    eviction_policy: str
+        Either "lru" (least recently used) or "lfu" (least frequently used),
+        by default "lru"
+    initializer, optimizer, combiner, name, **kwargs:
+        Same as `TableConfig`
+    """
+
+    EVICTION_POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        vocabulary_size: int,
+        dim: int,
+        capacity: Optional[int] = None,
+        eviction_policy: str = "lru",
+        initializer: Optional[Callable[[Any], None]] = None,
+        optimizer=None,
+        combiner: str = "mean",
+        name: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            capacity or vocabulary_size,
+            dim,
+            initializer=initializer,
+            optimizer=optimizer,
+            combiner=combiner,
+            name=name,
+            **kwargs,
+        )
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(
+                f"eviction_policy must be one of {self.EVICTION_POLICIES}. "
+                f"Received: {eviction_policy}"
+            )
+        self.eviction_policy = eviction_policy
+
+    def table_weights(self) -> List[Tuple[str, Dict[str, Any]]]:
+        state_kwargs = dict(shape=(self.vocabulary_size,), dtype=tf.int64, trainable=False)
+        return [
+            ("embeddings", dict(shape=(self.vocabulary_size, self.dim), initializer="zeros")),
+            ("slot_ids", dict(initializer=tf.keras.initializers.Constant(-1), **state_kwargs)),
+            ("last_seen", dict(initializer="zeros", **state_kwargs)),
+            ("counts", dict(initializer="zeros", **state_kwargs)),
+            ("step", dict(shape=(), dtype=tf.int64, initializer="zeros", trainable=False)),
+        ]
+
+    def table_resources(self) -> List[tf.lookup.experimental.MutableHashTable]:
+        return [
+            tf.lookup.experimental.MutableHashTable(
+                key_dtype=tf.int64, value_dtype=tf.int64, default_value=-1
+            )
+        ]
+
+    def embedding_lookup(
+        self, tables: List[Any], ids: tf.Tensor, training: Optional[bool] = False
+    ) -> tf.Tensor:
+        embeddings, _, _, _, _, slot_of_id = tables
+        unique_ids, positions = tf.unique(tf.cast(tf.reshape(ids, (-1,)), tf.int64))
+        if training:
+            slots = self._assign_slots(tables, unique_ids)
+            unique_embeddings = tf.gather(embeddings, slots)
+        else:
+            slots = tf.reshape(slot_of_id.lookup(unique_ids), (-1,))
+            unique_embeddings = tf.gather(embeddings, tf.maximum(slots, 0))
+            unique_embeddings *= tf.expand_dims(tf.cast(slots >= 0, embeddings.dtype), -1)
+
+        outputs = _expand_unique_embeddings(unique_embeddings, positions)
+        outputs = tf.reshape(outputs, tf.concat([tf.shape(ids), [self.dim]], axis=0))
+        outputs.set_shape(ids.shape.concatenate([self.dim]))
+
+        return outputs
+
+    def _assign_slots(self, tables: List[Any], unique_ids: tf.Tensor) -> tf.Tensor:
+        embeddings, slot_ids, last_seen, counts, step, slot_of_id = tables
+        tf.debugging.assert_less_equal(
+            tf.size(unique_ids, out_type=tf.int64),
+            tf.constant(self.vocabulary_size, tf.int64),
+            message="The batch has more unique ids than the vocabulary_size of the table",
+        )
+        slots = tf.reshape(slot_of_id.lookup(unique_ids), (-1,))
+        is_missing = slots < 0
+        missing_ids = tf.boolean_mask(unique_ids, is_missing)
+        hit_slots = tf.boolean_mask(slots, ~is_missing)
+
+        # The free slots are used first, then the slots with the lowest priority
+        # (excluding the ones of the ids of the batch)
+        if self.eviction_policy == "lfu":
+            priority = counts * (step + 1) + last_seen
+        else:
+            priority = tf.identity(last_seen)
+        priority = tf.where(slot_ids < 0, tf.constant(-1, tf.int64), priority)
+        priority = tf.tensor_scatter_nd_update(
+            priority,
+            tf.expand_dims(hit_slots, -1),
+            tf.fill(tf.shape(hit_slots), tf.constant(np.iinfo(np.int64).max, tf.int64)),
+        )
+        _, new_slots = tf.math.top_k(-priority, k=tf.size(missing_ids))
+        new_slots = tf.cast(new_slots, tf.int64)
+
+        evicted_ids = tf.gather(slot_ids, new_slots)
+        remove = slot_of_id.remove(tf.boolean_mask(evicted_ids, evicted_ids >= 0))
+        with tf.control_dependencies([remove]):
+            insert = slot_of_id.insert(missing_ids, new_slots)
+        new_rows = self.initializer((tf.size(new_slots), self.dim))
+        updates = [
+            insert,
+            slot_ids.scatter_update(tf.IndexedSlices(missing_ids, new_slots)),
+            embeddings.scatter_update(tf.IndexedSlices(new_rows, new_slots)),
+            counts.scatter_update(tf.IndexedSlices(tf.zeros_like(new_slots), new_slots)),
+        ]
+        with tf.control_dependencies(updates):
+            slots = tf.tensor_scatter_nd_update(slots, tf.where(is_missing), new_slots)
+            step_t = step.assign_add(1)
+            updates = [
+                last_seen.scatter_update(tf.IndexedSlices(tf.fill(tf.shape(slots), step_t), slots)),
+                counts.scatter_add(tf.IndexedSlices(tf.ones_like(slots), slots)),
+            ]
+        with tf.control_dependencies(updates):
+            return tf.identity(slots)
+
+    def materialize(self, tables: List[Any]) -> tf.Tensor:
+        return tf.convert_to_tensor(tables[0])
+
+    def materialized_ids(self, tables: List[Any]) -> Optional[tf.Tensor]:
+        return tf.convert_to_tensor(tables[1])
+
+
+class QuantizedTableConfig(MultiTableConfig):
+    """Configuration of an embedding table quantized to int8 for inference, with a
+    float32 scale and zero-point per row (see `quantize_rows_int8(symmetric=False)`),
+    which takes about a quarter of the memory of the float32 table.
+    The rows are dequantized when they are looked up.
+
+    The tables are quantized after the training by `EmbeddingFeatures.quantize()`
+    (or `Model.quantize_embeddings()`), their weights are not trainable.
+
+    Parameters
+    ----------
+    vocabulary_size: int
+        Number of rows of the table.
+    dim: int
+        Dimension of the embeddings.
+    quantization: str
+        The quantization type, only "int8" is supported for now, by default "int8"
+    initializer, optimizer, combiner, name, **kwargs:
+        Same as `TableConfig`
+    """
+
+    QUANTIZATIONS = ("int8",)
+
+    def __init__(
+        self,
+        vocabulary_size: int,
+        dim: int,
+        quantization: str = "int8",
+        initializer: Optional[Callable[[Any], None]] = None,
+        optimizer=None,
+        combiner: str = "mean",
+        name: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            vocabulary_size,
+            dim,
+            initializer=initializer,
+            optimizer=optimizer,
+            combiner=combiner,
+            name=name,
+            **kwargs,
+        )
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(
+                f"quantization must be one of {self.QUANTIZATIONS}. Received: {quantization}"
+            )
+        self.quantization = quantization
+
+    @classmethod
+    def from_table(cls, table: TableConfig) -> "QuantizedTableConfig":
+        return cls(
+            table.vocabulary_size,
+            table.dim,
+            initializer=table.initializer,
+            optimizer=table.optimizer,
+            combiner=table.combiner,
+            name=table.name,
+        )
+
+    def table_weights(self) -> List[Tuple[str, Dict[str, Any]]]:
+        row_kwargs = dict(shape=(self.vocabulary_size,), dtype=tf.float32, trainable=False)
+        return [
+            (
+                "quantized",
+                dict(
+                    shape=(self.vocabulary_size, self.dim),
+                    dtype=tf.int8,
+                    initializer="zeros",
+                    trainable=False,
+                ),
+            ),
+            ("scales", dict(initializer="ones", **row_kwargs)),
+            ("zero_points", dict(initializer="zeros", **row_kwargs)),
+        ]
+
+    def embedding_lookup(self, tables: List[tf.Variable], ids: tf.Tensor) -> tf.Tensor:
+        quantized, scales, zero_points = [tf.gather(table, ids) for table in tables]
+        flat_ids_shape = (-1, self.dim)
+        outputs = dequantize_rows_int8(
+            tf.reshape(quantized, flat_ids_shape),
+            tf.reshape(scales, (-1,)),
+            tf.reshape(zero_points, (-1,)),
+        )
+
+        return tf.reshape(outputs, tf.shape(quantized))
+
+    def materialize(self, tables: List[tf.Variable]) -> tf.Tensor:
+        return dequantize_rows_int8(*tables)
 
 
 @docstring_parameter(
@@ -73,7 +847,8 @@ class EmbeddingOptions:
 class EmbeddingFeatures(TabularBlock):
     """Input block for embedding-lookups for categorical features.
 
-    For multi-hot features, the embeddings will be aggregated into a single tensor using the mean.
+    For multi-hot features (sparse, ragged or padded dense ids), the embeddings will be
+    aggregated into a single tensor using the combiner of their table (the mean by default).
 
     Parameters
     ----------
@@ -81,6 +856,8 @@ class EmbeddingFeatures(TabularBlock):
     {tabular_module_parameters}
     """
 
+    _output_sequence = False
+
     def __init__(
         self,
         feature_config: Dict[str, "FeatureConfig"],
@@ -91,6 +868,8 @@ class EmbeddingFeatures(TabularBlock):
         name=None,
         add_default_pre=True,
         l2_reg: Optional[float] = 0.0,
+        deduplicate_lookups: bool = False,
+        fuse_lookups: bool = False,
         **kwargs,
     ):
         if add_default_pre:
@@ -98,6 +877,8 @@ class EmbeddingFeatures(TabularBlock):
             pre = [embedding_pre, pre] if pre else embedding_pre  # type: ignore
         self.feature_config = feature_config
         self.l2_reg = l2_reg
+        self.deduplicate_lookups = deduplicate_lookups
+        self.fuse_lookups = fuse_lookups
         super().__init__(
             pre=pre,
             post=post,
@@ -169,17 +950,23 @@ class EmbeddingFeatures(TabularBlock):
         tables: Dict[str, TableConfig] = {}
 
         domains = schema_utils.categorical_domains(schema)
+        domain_table_options = cls._table_options_by_domain(embedding_options, domains)
         for name, (vocab_size, dim, emb_initilizer) in emb_config.items():
             table_name = domains[name]
             table = tables.get(table_name, None)
             if not table:
-                table = TableConfig(
+                table_kwargs = dict(
                     vocabulary_size=vocab_size,
                     dim=dim,
                     name=table_name,
                     combiner=embedding_options.combiner,
                     initializer=emb_initilizer,
                 )
+                if table_name in domain_table_options:
+                    table_cls, options = domain_table_options[table_name]
+                    table = table_cls(**table_kwargs, **options)
+                else:
+                    table = TableConfig(**table_kwargs)
                 tables[table_name] = table
             feature_config[name] = FeatureConfig(table)
 
@@ -190,11 +977,51 @@ class EmbeddingFeatures(TabularBlock):
             feature_config,
             schema=schema_copy,
             l2_reg=embedding_options.embeddings_l2_reg,
+            deduplicate_lookups=embedding_options.deduplicate_lookups,
+            fuse_lookups=embedding_options.fuse_lookups,
             **kwargs,
         )
 
         return output
 
+    @staticmethod
+    def _table_options_by_domain(
+        embedding_options: EmbeddingOptions, domains: Dict[str, str]
+    ) -> Dict[str, Tuple[Type[TableConfig], Dict[str, Any]]]:
+        """Returns the table class and options of each domain (table name), from the
+        compositional, mixed-dimension, memory-mapped and dynamic vocabulary embeddings
+        options, which are keyed by feature name or by domain"""
+        table_options = {
+            CompositionalTableConfig: embedding_options.compositional_embeddings or {},
+            MixedDimensionTableConfig: embedding_options.mixed_dimension_embeddings or {},
+            MemoryMappedTableConfig: embedding_options.memory_mapped_embeddings or {},
+            DynamicVocabTableConfig: embedding_options.dynamic_vocab_embeddings or {},
+        }
+        domain_names = set(domains.values())
+
+        outputs: Dict[str, Tuple[Type[TableConfig], Dict[str, Any]]] = {}
+        option_keys: Dict[str, str] = {}
+        for table_cls, options in table_options.items():
+            for key, kwargs in options.items():
+                if key in domains:
+                    domain = domains[key]
+                elif key in domain_names:
+                    domain = key
+                else:
+                    continue
+                if domain in outputs:
+                    raise ValueError(
+                        f"The table of the domain {domain} is configured by the embeddings "
+                        f"options of both {option_keys[domain]} and {key}. The features with "
+                        "the same domain share the same table, so only one of the compositional, "
+                        "mixed-dimension, memory-mapped or dynamic vocabulary embeddings options "
+                        "can be set per domain."
+                    )
+                outputs[domain] = (table_cls, kwargs)
+                option_keys[domain] = key
+
+        return outputs
+
     def build(self, input_shapes):
         self.embedding_tables = {}
         tables: Dict[str, TableConfig] = {}
@@ -204,10 +1031,18 @@ class EmbeddingFeatures(TabularBlock):
                 tables[table.name] = table
 
         for name, table in tables.items():
-            add_fn = (
-                self.context.add_embedding_weight if hasattr(self, "_context") else self.add_weight
-            )
-            self.embedding_tables[name] = add_fn(
+            if isinstance(table, MultiTableConfig):
+                self.embedding_tables[name] = [
+                    self._add_table_weight(
+                        name=f"{name}_{suffix}",
+                        embedding_rows=table.is_embedding_rows(suffix),
+                        **{"trainable": True, **weight_kwargs},
+                    )
+                    for suffix, weight_kwargs in table.table_weights()
+                ] + table.table_resources()
+                self._maybe_add_context_embedding_function(name, table)
+                continue
+            self.embedding_tables[name] = self._add_table_weight(
                 name=name,
                 trainable=True,
                 initializer=table.initializer,
@@ -218,10 +1053,39 @@ class EmbeddingFeatures(TabularBlock):
         else:
             tf.keras.layers.Layer.build(self, input_shapes)
 
+    def _add_table_weight(self, name: str, embedding_rows: bool = True, **kwargs) -> tf.Variable:
+        """Adds a weight of a table, to the model context if any. The embedding rows
+        are marked with `mark_embedding_variable()`"""
+        if hasattr(self, "_context"):
+            return self.context.add_embedding_weight(
+                name=name, embedding_rows=embedding_rows, **kwargs
+            )
+        weight = self.add_weight(name=name, **kwargs)
+        if embedding_rows:
+            mark_embedding_variable(weight)
+
+        return weight
+
     def call(self, inputs: TabularData, **kwargs) -> TabularData:
+        training = kwargs.get("training")
+        if self.fuse_lookups:
+            embedded_outputs, table_outputs = self._fused_lookup(inputs, training=training)
+            if self.l2_reg > 0:
+                l2_loss = tf.add_n([tf.reduce_sum(tf.square(out)) for out in table_outputs])
+                self.add_loss(self.l2_reg * l2_loss)
+
+            return embedded_outputs
+
+        pooled_outputs = self.lookup_multi_hot_features(
+            {name: val for name, val in inputs.items() if self.is_multi_hot(val)},
+            training=training,
+        )
         embedded_outputs = {}
         for name, val in inputs.items():
-            embedded_outputs[name] = self.lookup_feature(name, val)
+            if name in pooled_outputs:
+                embedded_outputs[name] = pooled_outputs[name]
+            else:
+                embedded_outputs[name] = self.lookup_feature(name, val, training=training)
             if self.l2_reg > 0:
                 self.add_loss(self.l2_reg * tf.reduce_sum(tf.square(embedded_outputs[name])))
 
@@ -236,25 +1100,109 @@ class EmbeddingFeatures(TabularBlock):
 
         return output_shapes
 
-    def lookup_feature(self, name, val, output_sequence=False):
+    def is_multi_hot(self, val) -> bool:
+        """Whether the feature has multiple ids per row (as a sparse, ragged
+        or padded dense tensor), whose embeddings are pooled by the combiner of the table"""
+        if isinstance(val, (tf.SparseTensor, tf.RaggedTensor)):
+            return True
+
+        return val.shape.rank == 2 and val.shape[1] != 1
+
+    def lookup_feature(self, name, val, output_sequence=False, training=False):
+        if not output_sequence and self.is_multi_hot(val):
+            return self.lookup_multi_hot_features({name: val}, training=training)[name]
+
         dtype = backend.dtype(val)
         if dtype != "int32" and dtype != "int64":
             val = tf.cast(val, "int32")
 
         table: TableConfig = self.feature_config[name].table
         table_var = self.embedding_tables[table.name]
-        if isinstance(val, tf.SparseTensor):
-            out = tf.nn.safe_embedding_lookup_sparse(table_var, val, None, combiner=table.combiner)
-        else:
-            if output_sequence:
-                out = tf.gather(table_var, tf.cast(val, tf.int32))
-            else:
-                if len(val.shape) > 1:
-                    # TODO: Check if it is correct to retrieve only the 1st element
-                    # of second dim for non-sequential multi-hot categ features
-                    out = tf.gather(table_var, tf.cast(val, tf.int32)[:, 0])
-                else:
-                    out = tf.gather(table_var, tf.cast(val, tf.int32))
+        gather_fn, ids_dtype = self._gather_fn(table, training)
+        if self.deduplicate_lookups:
+            gather_fn = partial(unique_embedding_lookup, gather_fn)
+        out = gather_fn(table_var, self._lookup_ids(val, ids_dtype, output_sequence))
+
+        return self._cast_output(out)
+
+    def lookup_multi_hot_features(self, inputs: TabularData, training=False) -> TabularData:
+        """Looks up the embeddings of the multi-hot features (see `is_multi_hot()`)
+        and pools them with the combiner of their table, with a single gather and
+        segment reduction for all the features of each table
+        (see `pooled_embedding_lookup()`)"""
+        features_by_table: Dict[str, List[str]] = {}
+        for name in inputs:
+            features_by_table.setdefault(self.feature_config[name].table.name, []).append(name)
+
+        outputs = {}
+        for table_name, names in features_by_table.items():
+            table: TableConfig = self.feature_config[names[0]].table
+            gather_fn, ids_dtype = self._gather_fn(table, training)
+            pooled = pooled_embedding_lookup(
+                gather_fn,
+                self.embedding_tables[table_name],
+                [inputs[name] for name in names],
+                combiner=table.combiner,
+                ids_dtype=ids_dtype,
+            )
+            for name, out in zip(names, pooled):
+                outputs[name] = self._cast_output(out)
+
+        return outputs
+
+    def _fused_lookup(self, inputs: TabularData, training=False):
+        """Looks up the features of each table with a single gather of their concatenated ids
+        (and the multi-hot features with `lookup_multi_hot_features()`), returns the outputs
+        and the embeddings looked up for each table (for the regularization)"""
+        multi_hot = {name: val for name, val in inputs.items() if self.is_multi_hot(val)}
+        outputs = self.lookup_multi_hot_features(multi_hot, training=training)
+        table_outputs = list(outputs.values())
+
+        features_by_table: Dict[str, List[str]] = {}
+        for name in inputs:
+            if name not in multi_hot:
+                table_name = self.feature_config[name].table.name
+                features_by_table.setdefault(table_name, []).append(name)
+
+        for table_name, names in features_by_table.items():
+            table: TableConfig = self.feature_config[names[0]].table
+            gather_fn, ids_dtype = self._gather_fn(table, training)
+            if self.deduplicate_lookups:
+                gather_fn = partial(unique_embedding_lookup, gather_fn)
+            ids = [
+                self._lookup_ids(inputs[name], ids_dtype, self._output_sequence) for name in names
+            ]
+            fused_ids = tf.concat([tf.reshape(feature_ids, (-1,)) for feature_ids in ids], axis=0)
+            embeddings = gather_fn(self.embedding_tables[table_name], fused_ids)
+            table_outputs.append(embeddings)
+
+            sizes = tf.stack([tf.size(feature_ids) for feature_ids in ids])
+            split_embeddings = tf.split(embeddings, sizes, num=len(names))
+            for name, feature_ids, out in zip(names, ids, split_embeddings):
+                out = tf.reshape(out, tf.concat([tf.shape(feature_ids), [table.dim]], axis=0))
+                out.set_shape(feature_ids.shape.concatenate([table.dim]))
+                outputs[name] = self._cast_output(out)
+
+        return {name: outputs[name] for name in inputs}, table_outputs
+
+    def _lookup_ids(self, val, ids_dtype: tf.DType, output_sequence=False) -> tf.Tensor:
+        ids = tf.cast(val, ids_dtype)
+        if not output_sequence and len(val.shape) > 1:
+            # Single-hot features with a (batch size, 1) shape
+            ids = ids[:, 0]
+
+        return ids
+
+    def _gather_fn(self, table: TableConfig, training=False):
+        if isinstance(table, DynamicVocabTableConfig):
+            # The raw ids of dynamic vocabulary tables might not fit in int32
+            return partial(table.embedding_lookup, training=training), tf.int64
+        if isinstance(table, MultiTableConfig):
+            return table.embedding_lookup, tf.int32
+
+        return tf.gather, tf.int32
+
+    def _cast_output(self, out: tf.Tensor) -> tf.Tensor:
         if self._dtype_policy.compute_dtype != self._dtype_policy.variable_dtype:
             # Instead of casting the variable as in most layers, cast the output, as
             # this is mathematically equivalent but is faster.
@@ -265,6 +1213,109 @@ class EmbeddingFeatures(TabularBlock):
     def table_config(self, feature_name: str):
         return self.feature_config[feature_name].table
 
+    def prefetch(self, inputs: TabularData, targets=None):
+        """Reads the rows of the ids of the inputs from the files of the memory-mapped
+        tables (see `MemoryMappedTableConfig`), so that they are ready when the inputs
+        are looked up. This can be mapped on the data loader, so that the rows of
+        the upcoming batches are read in the background: `loader.map(embeddings.prefetch)`.
+
+        Returns
+        -------
+        The inputs (and targets if provided), unchanged
+        """
+        for name, val in inputs.items():
+            feature = self.feature_config.get(name)
+            if feature is None or not isinstance(feature.table, MemoryMappedTableConfig):
+                continue
+            if isinstance(val, tuple):
+                # List features of the data loader are (values, offsets) tuples
+                val = val[0]
+            if isinstance(val, (tf.SparseTensor, tf.RaggedTensor)):
+                val = val.values
+            feature.table.prefetch(np.asarray(val))
+
+        if targets is None:
+            return inputs
+
+        return inputs, targets
+
+    def quantize(self, table_names: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Post-training quantization of the embedding tables to int8, with a scale and
+        a zero-point per row (see `QuantizedTableConfig`). The float32 tables are replaced
+        by the quantized weights, and the rows are dequantized when they are looked up.
+
+        Parameters
+        ----------
+        table_names : Optional[Sequence[str]], optional
+            Names of the tables to quantize, by default None which quantizes
+            all the tables that are not already stored as multiple weights
+            (e.g. compositional or mixed-dimension tables)
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            For each quantized table, the memory of the float32 and quantized weights
+            (in bytes), the memory saving (fraction of the float32 memory) and the
+            mean and max absolute errors of the dequantized embeddings
+        """
+        if not self.built:
+            raise ValueError("The embedding tables must be built before being quantized")
+
+        tables: Dict[str, TableConfig] = {}
+        for feature in self.feature_config.values():
+            tables.setdefault(feature.table.name, feature.table)
+        if table_names is None:
+            table_names = [
+                name for name, table in tables.items() if not isinstance(table, MultiTableConfig)
+            ]
+
+        has_context = hasattr(self, "_context")
+        report = {}
+        for table_name in table_names:
+            table = tables[table_name]
+            if isinstance(table, MultiTableConfig):
+                raise ValueError(f"The table {table_name} can't be quantized")
+
+            embeddings = self.embedding_tables[table_name]
+            quantized_table = QuantizedTableConfig.from_table(table)
+            weights = [
+                self._add_table_weight(name=f"{table_name}_{suffix}", **weight_kwargs)
+                for suffix, weight_kwargs in quantized_table.table_weights()
+            ]
+            for weight, values in zip(weights, quantize_rows_int8(embeddings, symmetric=False)):
+                weight.assign(values)
+
+            errors = tf.abs(quantized_table.materialize(weights) - embeddings)
+            float_bytes = int(np.prod(embeddings.shape)) * embeddings.dtype.size
+            quantized_bytes = sum(int(np.prod(w.shape)) * w.dtype.size for w in weights)
+            report[table_name] = {
+                "float_bytes": float_bytes,
+                "quantized_bytes": quantized_bytes,
+                "memory_saving": 1.0 - quantized_bytes / float_bytes,
+                "mean_abs_error": float(tf.reduce_mean(errors)),
+                "max_abs_error": float(tf.reduce_max(errors)),
+            }
+
+            if has_context:
+                self.context.remove_weight(embeddings)
+            else:
+                untrack_variable(self, embeddings)
+            self.embedding_tables[table_name] = weights
+            for feature in self.feature_config.values():
+                if feature.table.name == table_name:
+                    feature.table = quantized_table
+            self._maybe_add_context_embedding_function(table_name, quantized_table)
+
+        return report
+
+    def _maybe_add_context_embedding_function(self, table_name: str, table: TableConfig):
+        # The (dequantized) quantized tables are returned by `ModelContext.get_embedding()`,
+        # e.g. for the weight-tying and retrieval blocks that share the item embeddings
+        if isinstance(table, QuantizedTableConfig) and hasattr(self, "_context"):
+            self.context.add_embedding_function(
+                table_name, partial(table.materialize, self.embedding_tables[table_name])
+            )
+
     def get_embedding_table(self, table_name: Union[str, Tags], l2_normalization: bool = False):
         if isinstance(table_name, Tags):
             feature_names = self.schema.select_by_tag(table_name).column_names
@@ -278,11 +1329,27 @@ class EmbeddingFeatures(TabularBlock):
                 raise ValueError(f"Could not find a feature associated to the tag {table_name}")
 
         embeddings = self.embedding_tables[table_name]
+        table = {f.table.name: f.table for f in self.feature_config.values()}.get(table_name)
+        if isinstance(table, MultiTableConfig):
+            # The tables stored as multiple weights are materialized for all the ids
+            embeddings = table.materialize(embeddings)
         if l2_normalization:
             embeddings = tf.linalg.l2_normalize(embeddings, axis=-1)
 
         return embeddings
 
+    def get_embedding_table_ids(self, table_name: Union[str, Tags]) -> Optional[tf.Tensor]:
+        """Returns the ids of the rows of `get_embedding_table()` (with -1 for the unused rows)
+        for the tables with a dynamic vocabulary (see `DynamicVocabTableConfig`),
+        or None if the rows are the ids `[0, vocabulary_size)`"""
+        if isinstance(table_name, Tags):
+            table_name = self.schema.select_by_tag(table_name).column_names[0]
+        table = {f.table.name: f.table for f in self.feature_config.values()}.get(table_name)
+        if not isinstance(table, MultiTableConfig):
+            return None
+
+        return table.materialized_ids(self.embedding_tables[table_name])
+
     def embedding_table_df(
         self, table_name: Union[str, Tags], l2_normalization: bool = False, gpu: bool = True
     ):
@@ -349,6 +1416,9 @@ class EmbeddingFeatures(TabularBlock):
         export_path: str,
         l2_normalization: bool = False,
         gpu=True,
+        batch_size: Optional[int] = None,
+        output_format: str = "parquet",
+        dtype: Optional[str] = None,
     ):
         """Exports the embedding table to parquet file
 
@@ -358,15 +1428,65 @@ class EmbeddingFeatures(TabularBlock):
             Tag or name of the embedding table
         export_path : str
             Path for the generated parquet file
+            (or directory of `.npy` shards if `output_format="npy"`)
         l2_normalization : bool, optional
             Whether the L2-normalization should be applied to
             embeddings (common approach for Matrix Factorization
             and Retrieval models in general), by default False
         gpu : bool, optional
             Whether or not should use GPU, by default True
+        batch_size : Optional[int], optional
+            If set, the table is streamed to disk in slices of `batch_size` rows
+            (one parquet row group or `.npy` shard per slice), without converting
+            the whole table to a dataframe, by default None
+        output_format : str, optional
+            Either "parquet" or "npy", by default "parquet"
+        dtype : Optional[str], optional
+            If set, embeddings are cast to this dtype (e.g. "float16")
+            before being written, by default None
+
+        For the tables with a dynamic vocabulary (see `DynamicVocabTableConfig`), only the
+        rows of the ids that are in the table are exported, with the ids in an "id" column
+        (or `ids_*.npy` shards), so that the exported embeddings include the id mapping.
+
+        The memory-mapped tables (see `MemoryMappedTableConfig`) are read from their file
+        one slice at a time (of `batch_size` rows, or `cache_size` rows by default),
+        so that the table is not loaded in memory.
         """
-        df = self.embedding_table_df(table_name, l2_normalization, gpu=gpu)
-        df.to_parquet(export_path)
+        if isinstance(table_name, Tags):
+            table_name = self.schema.select_by_tag(table_name).column_names[0]
+        table = {f.table.name: f.table for f in self.feature_config.values()}.get(table_name)
+        if isinstance(table, MemoryMappedTableConfig):
+            chunks = table.iter_chunks(
+                self.embedding_tables[table_name], batch_size or table.cache_size
+            )
+            with embedding_writer(export_path, output_format, dtype) as writer:
+                for batch in chunks:
+                    if l2_normalization:
+                        batch = tf.linalg.l2_normalize(batch, axis=-1).numpy()
+                    writer.write(batch)
+            return
+
+        ids = self.get_embedding_table_ids(table_name)
+        if batch_size is None and output_format == "parquet" and dtype is None and ids is None:
+            df = self.embedding_table_df(table_name, l2_normalization, gpu=gpu)
+            df.to_parquet(export_path)
+            return
+
+        embeddings = self.get_embedding_table(table_name)
+        if ids is not None:
+            # Only the rows of the ids that are in the table are exported (with their ids)
+            embeddings = tf.boolean_mask(embeddings, ids >= 0)
+            ids = tf.boolean_mask(ids, ids >= 0)
+        num_rows = int(embeddings.shape[0])
+        batch_size = batch_size or max(num_rows, 1)
+        with embedding_writer(export_path, output_format, dtype) as writer:
+            for start in range(0, num_rows, batch_size):
+                batch = embeddings[start : start + batch_size]
+                if l2_normalization:
+                    batch = tf.linalg.l2_normalize(batch, axis=-1)
+                batch_ids = None if ids is None else ids[start : start + batch_size].numpy()
+                writer.write(batch.numpy(), batch_ids)
 
     def get_config(self):
         config = super().get_config()
@@ -380,6 +1500,10 @@ class EmbeddingFeatures(TabularBlock):
             feature_configs[key] = feature_config_dict
 
         config["feature_config"] = feature_configs
+        if self.deduplicate_lookups:
+            config["deduplicate_lookups"] = True
+        if self.fuse_lookups:
+            config["fuse_lookups"] = True
 
         return config
 
@@ -422,6 +1546,8 @@ class SequenceEmbeddingFeatures(EmbeddingFeatures):
     {tabular_module_parameters}
     """
 
+    _output_sequence = True
+
     def __init__(
         self,
         feature_config: Dict[str, FeatureConfig],
@@ -453,9 +1579,13 @@ class SequenceEmbeddingFeatures(EmbeddingFeatures):
         self.padding_idx = padding_idx
         self.mask_zero = mask_zero
 
+    def is_multi_hot(self, val) -> bool:
+        # The sequences are looked up without pooling
+        return False
+
     def lookup_feature(self, name, val, **kwargs):
         return super(SequenceEmbeddingFeatures, self).lookup_feature(
-            name, val, output_sequence=True
+            name, val, output_sequence=True, training=kwargs.get("training")
         )
 
     def compute_call_output_shape(self, input_shapes):
@@ -506,24 +1636,145 @@ def ContinuousEmbedding(
     return outputs
 
 
+def pooled_embedding_lookup(
+    gather_fn: Callable[[Any, tf.Tensor], tf.Tensor],
+    table: Any,
+    ids_list: Sequence[Union[tf.Tensor, tf.SparseTensor, tf.RaggedTensor]],
+    combiner: str = "mean",
+    padding_idx: int = 0,
+    ids_dtype: tf.DType = tf.int32,
+) -> List[tf.Tensor]:
+    """Looks up the embeddings of the multi-hot ids of a few features sharing the same table
+    and pools them for each row with the `combiner` ("mean", "sum" or "sqrtn"), with a single
+    gather of the unique ids and a single segment reduction for all the features.
+
+    Parameters
+    ----------
+    gather_fn : Callable[[Any, tf.Tensor], tf.Tensor]
+        Function that gathers the embeddings of 1-D ids from the table (e.g. `tf.gather`)
+    table : Any
+        The embedding table (or the weights of a `MultiTableConfig` table)
+    ids_list : Sequence[Union[tf.Tensor, tf.SparseTensor, tf.RaggedTensor]]
+        The 2-D ids of the features, as sparse, ragged or dense tensors
+        (padded with `padding_idx`). The negative ids are ignored,
+        like in `tf.nn.safe_embedding_lookup_sparse`.
+    combiner : str, optional
+        How the embeddings of each row are combined, by default "mean"
+    padding_idx : int, optional
+        The id used for padding the dense ids, by default 0
+    ids_dtype : tf.DType, optional
+        The dtype the ids are cast to before the lookup, by default tf.int32
+
+    Returns
+    -------
+    List[tf.Tensor]
+        The `(batch size, dim)` pooled embeddings of each feature
+        (zeros for the rows without ids)
+    """
+    values, segment_ids, row_counts = [], [], []
+    num_segments = tf.constant(0, tf.int64)
+    for ids in ids_list:
+        if isinstance(ids, tf.SparseTensor):
+            ids_values, row_ids, num_rows = ids.values, ids.indices[:, 0], ids.dense_shape[0]
+        elif isinstance(ids, tf.RaggedTensor):
+            ids_values, row_ids, num_rows = ids.values, ids.value_rowids(), ids.nrows()
+        else:
+            is_id = tf.not_equal(ids, tf.cast(padding_idx, ids.dtype))
+            ids_values, row_ids = tf.boolean_mask(ids, is_id), tf.where(is_id)[:, 0]
+            num_rows = tf.shape(ids, out_type=tf.int64)[0]
+        ids_values = tf.cast(ids_values, ids_dtype)
+        is_valid = ids_values >= 0
+        values.append(tf.boolean_mask(ids_values, is_valid))
+        segment_ids.append(tf.boolean_mask(tf.cast(row_ids, tf.int64), is_valid) + num_segments)
+        row_counts.append(tf.cast(num_rows, tf.int64))
+        num_segments += row_counts[-1]
+
+    segment_ids = tf.concat(segment_ids, axis=0)
+    embeddings = unique_embedding_lookup(gather_fn, table, tf.concat(values, axis=0))
+    outputs = tf.math.unsorted_segment_sum(embeddings, segment_ids, num_segments)
+    if combiner != "sum":
+        counts = tf.math.unsorted_segment_sum(
+            tf.ones_like(segment_ids, dtype=outputs.dtype), segment_ids, num_segments
+        )
+        counts = tf.maximum(counts, 1.0)
+        if combiner == "sqrtn":
+            counts = tf.sqrt(counts)
+        outputs = outputs / tf.expand_dims(counts, -1)
+
+    outputs = tf.split(outputs, tf.stack(row_counts), num=len(row_counts))
+    for ids, out in zip(ids_list, outputs):
+        out.set_shape(ids.shape[:1].concatenate(embeddings.shape[-1:]))
+
+    return outputs
+
+
+def unique_embedding_lookup(
+    gather_fn: Callable[[Any, tf.Tensor], tf.Tensor], table: Any, ids: tf.Tensor
+) -> tf.Tensor:
+    """Gathers the embeddings of the unique ids and expands them back to the shape of the ids,
+    so that the gradient of the table has a single row per unique id"""
+    unique_ids, positions = tf.unique(tf.reshape(ids, (-1,)))
+    outputs = _expand_unique_embeddings(gather_fn(table, unique_ids), positions)
+    dim = outputs.shape[-1:]
+    outputs = tf.reshape(outputs, tf.concat([tf.shape(ids), tf.shape(outputs)[-1:]], axis=0))
+    outputs.set_shape(ids.shape.concatenate(dim))
+
+    return outputs
+
+
+@tf.custom_gradient
+def _expand_unique_embeddings(unique_embeddings: tf.Tensor, positions: tf.Tensor):
+    def grad(upstream):
+        # Summing the gradients of the duplicates directly in a dense tensor
+        # (instead of going through IndexedSlices of unknown dense shape)
+        num_unique = tf.shape(unique_embeddings)[0]
+        return tf.math.unsorted_segment_sum(upstream, positions, num_unique), None
+
+    return tf.gather(unique_embeddings, positions), grad
+
+
 def serialize_table_config(table_config: TableConfig) -> Dict[str, Any]:
-    table = deepcopy(table_config.__dict__)
+    table = {key: val for key, val in table_config.__dict__.items() if not key.startswith("_")}
+    # The frequencies of mixed-dimension tables are stored as weights (the id ranks)
+    table.pop("frequencies", None)
+    table = deepcopy(table)
     if "initializer" in table:
         table["initializer"] = tf.keras.initializers.serialize(table["initializer"])
     if "optimizer" in table:
         table["optimizer"] = tf.keras.optimizers.serialize(table["optimizer"])
+    table["class_name"] = table_config.__class__.__name__
 
     return table
 
 
+_TABLE_CONFIG_CLASSES = {
+    table_class.__name__: table_class
+    for table_class in [
+        TableConfig,
+        CompositionalTableConfig,
+        MixedDimensionTableConfig,
+        MemoryMappedTableConfig,
+        DynamicVocabTableConfig,
+        QuantizedTableConfig,
+    ]
+}
+
+
 def deserialize_table_config(table_params: Dict[str, Any]) -> TableConfig:
+    table_params = dict(table_params)
     if "initializer" in table_params and table_params["initializer"]:
         table_params["initializer"] = tf.keras.initializers.deserialize(table_params["initializer"])
     if "optimizer" in table_params and table_params["optimizer"]:
         table_params["optimizer"] = tf.keras.optimizers.deserialize(table_params["optimizer"])
-    table = TableConfig(**table_params)
+    # The configs serialized without class name are plain `TableConfig`
+    class_name = table_params.pop("class_name", TableConfig.__name__)
+    if class_name not in _TABLE_CONFIG_CLASSES:
+        raise ValueError(
+            f"Unknown table config class {class_name}, "
+            f"expected one of {list(_TABLE_CONFIG_CLASSES)}"
+        )
 
-    return table
+    return _TABLE_CONFIG_CLASSES[class_name](**table_params)
 
 
 def serialize_feature_config(feature_config: FeatureConfig) -> Dict[str, Any]:
@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import tensorflow as tf
+
+
+class MemoryMappedEmbeddingCache:
+    """Keeps the rows of an embedding table in a memory-mapped file, and the hot rows
+    in a cache variable (of `cache_size` rows) which is used for the lookups.
+
+    The rows of the ids which are missing from the cache are loaded into the cache
+    before the lookup (from the rows staged by `prefetch()`, or from the file),
+    replacing the least recently (LRU) or least frequently (LFU) used rows,
+    which are written back to the file if they were looked up since they were loaded
+    (as they might have been updated by the optimizer).
+
+    Parameters
+    ----------
+    path : str
+        Path of the memory-mapped file (float32 values, in row-major order).
+        If it doesn't exist, it is created and initialized with the `initializer`.
+    vocabulary_size : int
+        Number of rows of the table
+    dim : int
+        Dimension of the embeddings
+    cache : tf.Variable
+        The `(cache_size, dim)` cache variable
+    eviction_policy : str
+        Either "lru" or "lfu", by default "lru"
+    initializer : Optional[Callable], optional
+        Initializer of the rows of the new files, by default None (zeros)
+    init_chunk_size : int
+        Number of rows initialized at once in new files, by default 100000
+    """
+
+    def __init__(
+        self,
+        path: str,
+        vocabulary_size: int,
+        dim: int,
+        cache: tf.Variable,
+        eviction_policy: str = "lru",
+        initializer: Optional[Callable[[Any], Any]] = None,
+        init_chunk_size: int = 100000,
+    ):
+        self.path = path
+        self.vocabulary_size = vocabulary_size
+        self.dim = dim
+        self.cache = cache
+        self.cache_size = int(cache.shape[0])
+        self.eviction_policy = eviction_policy
+
+        if not os.path.exists(path):
+            table = np.memmap(path, dtype=np.float32, mode="w+", shape=(vocabulary_size, dim))
+            if initializer is not None:
+                for start in range(0, vocabulary_size, init_chunk_size):
+                    num_rows = min(init_chunk_size, vocabulary_size - start)
+                    table[start : start + num_rows] = np.asarray(initializer((num_rows, dim)))
+            table.flush()
+            del table
+        self.table = np.memmap(path, dtype=np.float32, mode="r+", shape=(vocabulary_size, dim))
+
+        self._lock = threading.Lock()
+        self._slot_of_id = np.full(vocabulary_size, -1, dtype=np.int64)
+        self._id_of_slot = np.full(self.cache_size, -1, dtype=np.int64)
+        self._last_access = np.zeros(self.cache_size, dtype=np.int64)
+        self._num_accesses = np.zeros(self.cache_size, dtype=np.int64)
+        self._dirty = np.zeros(self.cache_size, dtype=bool)
+        self._staged: Dict[int, np.ndarray] = {}
+        self._step = 0
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def lookup(self, ids: tf.Tensor) -> tf.Tensor:
+        """Loads the missing ids into the cache and returns the cache slots of the ids"""
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        unique_ids, positions = np.unique(ids, return_inverse=True)
+        if len(unique_ids) > self.cache_size:
+            raise ValueError(
+                f"The batch has more unique ids ({len(unique_ids)}) than "
+                f"the cache size ({self.cache_size})"
+            )
+
+        with self._lock:
+            slots = self._slot_of_id[unique_ids]
+            is_missing = slots < 0
+            self.num_hits += int(np.sum(~is_missing))
+            self.num_misses += int(np.sum(is_missing))
+            if np.any(is_missing):
+                slots[is_missing] = self._load(unique_ids[is_missing], slots[~is_missing])
+
+            self._step += 1
+            self._last_access[slots] = self._step
+            self._num_accesses[slots] += 1
+            self._dirty[slots] = True
+
+        return tf.constant(slots[positions])
+
+    def _load(self, ids: np.ndarray, used_slots: np.ndarray) -> np.ndarray:
+        if self.eviction_policy == "lfu":
+            priority = self._num_accesses * (self._step + 1) + self._last_access
+        else:
+            priority = self._last_access.copy()
+        priority[self._id_of_slot < 0] = -1
+        priority[used_slots] = np.iinfo(np.int64).max
+        slots = np.argpartition(priority, len(ids) - 1)[: len(ids)]
+
+        victims = slots[(self._id_of_slot[slots] >= 0) & self._dirty[slots]]
+        if len(victims):
+            self._write_back(victims)
+        evicted_ids = self._id_of_slot[slots]
+        self._slot_of_id[evicted_ids[evicted_ids >= 0]] = -1
+
+        rows = np.empty((len(ids), self.dim), dtype=np.float32)
+        staged = np.array([i in self._staged for i in ids.tolist()], dtype=bool)
+        for i in np.flatnonzero(staged):
+            rows[i] = self._staged.pop(int(ids[i]))
+        if not np.all(staged):
+            order = np.argsort(ids[~staged])
+            unstaged_rows = np.empty((int(np.sum(~staged)), self.dim), dtype=np.float32)
+            unstaged_rows[order] = self.table[ids[~staged][order]]
+            rows[~staged] = unstaged_rows
+        self.cache.scatter_update(tf.IndexedSlices(tf.constant(rows), tf.constant(slots)))
+
+        self._id_of_slot[slots] = ids
+        self._slot_of_id[ids] = slots
+        self._num_accesses[slots] = 0
+        self._dirty[slots] = False
+
+        return slots
+
+    def _write_back(self, slots: np.ndarray):
+        ids = self._id_of_slot[slots]
+        order = np.argsort(ids)
+        self.table[ids[order]] = tf.gather(self.cache, slots[order]).numpy()
+        self._dirty[slots] = False
+
+    def prefetch(self, ids: np.ndarray):
+        """Reads the rows of the ids which are not in the cache from the file
+        (e.g. for the upcoming batches), so that they are not read from the file
+        when they are looked up. At most `cache_size` rows are staged."""
+        ids = np.unique(np.asarray(ids, dtype=np.int64).reshape(-1))
+        with self._lock:
+            ids = ids[self._slot_of_id[ids] < 0]
+            ids = np.array([i for i in ids.tolist() if i not in self._staged], dtype=np.int64)
+            ids = ids[: max(self.cache_size - len(self._staged), 0)]
+            if len(ids):
+                self._staged.update(zip(ids.tolist(), np.array(self.table[ids])))
+
+    def flush(self):
+        """Writes back the rows of the cache which were looked up since they were loaded"""
+        with self._lock:
+            slots = np.flatnonzero((self._id_of_slot >= 0) & self._dirty)
+            if len(slots):
+                self._write_back(slots)
+            self.table.flush()
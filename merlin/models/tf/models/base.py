@@ -1,7 +1,17 @@
 from __future__ import annotations
 
 from collections.abc import Sequence as SequenceCollection
-from typing import TYPE_CHECKING, Dict, List, Optional, Protocol, Union, runtime_checkable
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+    runtime_checkable,
+)
 
 import tensorflow as tf
 
@@ -9,6 +19,7 @@ import merlin.io
 from merlin.models.tf.blocks.core.base import Block, ModelContext
 from merlin.models.tf.blocks.core.combinators import SequentialBlock
 from merlin.models.tf.metrics.ranking import RankingMetric
+from merlin.models.tf.optimizers.multi import MultiOptimizer
 from merlin.models.tf.prediction_tasks.base import ParallelPredictionBlock, PredictionTask
 from merlin.models.tf.typing import TabularData
 from merlin.models.tf.utils.mixins import LossMixin, MetricsMixin, ModelLikeBlock
@@ -177,6 +188,7 @@ class Model(tf.keras.Model, LossMixin, MetricsMixin):
             self.block._set_context(context)
         self.context = context
         self._is_fitting = False
+        self._num_weights_updates = 0
 
         # Initializing model control flags controlled by MetricsComputeCallback()
         self._should_compute_train_metrics_for_batch = tf.Variable(
@@ -187,6 +199,50 @@ class Model(tf.keras.Model, LossMixin, MetricsMixin):
             initial_value=lambda: False,
         )
 
+    def compile(self, optimizer="rmsprop", *args, embedding_optimizer=None, **kwargs):
+        """Configures the model for training, like `tf.keras.Model.compile()`.
+
+        Parameters
+        ----------
+        optimizer : str or tf.keras.optimizers.Optimizer
+            Optimizer of the model (or only of the variables which aren't
+            embedding tables, if `embedding_optimizer` is set), by default "rmsprop"
+        embedding_optimizer : str or tf.keras.optimizers.Optimizer, optional
+            If set, optimizer of the rows of the embedding tables (marked by
+            `mark_embedding_variable()` when they are created), e.g. `mm.LazyAdam()` or
+            `mm.RowWiseAdagrad()` to only update the rows looked up in the batch,
+            by default None. The optimizers are then combined by a `MultiOptimizer`,
+            which resolves the optimizer identifiers (e.g. "adam") to the OptimizerV2
+            optimizers of `tf.keras.optimizers.legacy` on TF >= 2.11
+        """
+        if embedding_optimizer is not None:
+            optimizer = MultiOptimizer(optimizer, embedding_optimizer)
+
+        super(Model, self).compile(optimizer, *args, **kwargs)
+        # The iterations of the new optimizer start again from 0
+        self._num_weights_updates += 1
+
+    def set_weights(self, weights):
+        super(Model, self).set_weights(weights)
+        self._num_weights_updates += 1
+
+    def load_weights(self, *args, **kwargs):
+        status = super(Model, self).load_weights(*args, **kwargs)
+        self._num_weights_updates += 1
+
+        return status
+
+    @property
+    def weights_version(self) -> Tuple[int, int]:
+        """Version of the weights of the model, which changes at every step of the optimizer
+        and when the weights are set, loaded or quantized (see `quantize_embeddings()`)
+        through the model. It is used to invalidate the caches computed from the weights
+        (e.g. the evaluation index of `RetrievalModel`) without reading the weights."""
+        optimizer = getattr(self, "optimizer", None)
+        iterations = int(optimizer.iterations) if optimizer is not None else 0
+
+        return self._num_weights_updates, iterations
+
     def call(self, inputs, **kwargs):
         outputs = self.block(inputs, **kwargs)
         return outputs
@@ -458,7 +514,11 @@ class Model(tf.keras.Model, LossMixin, MetricsMixin):
         )
 
     def batch_predict(
-        self, dataset: merlin.io.Dataset, batch_size: int, **kwargs
+        self,
+        dataset: merlin.io.Dataset,
+        batch_size: int,
+        num_workers: Optional[int] = None,
+        **kwargs,
     ) -> merlin.io.Dataset:
         """Batched prediction using the Dask.
         Parameters
@@ -467,6 +527,10 @@ class Model(tf.keras.Model, LossMixin, MetricsMixin):
             Dataset to predict on.
         batch_size: int
             Batch size to use for prediction.
+        num_workers: Optional[int]
+            If set, the predictions are computed eagerly by a pool of `num_workers`
+            threads that share the model, keeping the order of the partitions.
+            By default None, which returns a lazy dataset.
         Returns merlin.io.Dataset
         -------
         """
@@ -481,13 +545,70 @@ class Model(tf.keras.Model, LossMixin, MetricsMixin):
         if hasattr(dataset, "to_ddf"):
             dataset = dataset.to_ddf()
 
-        from merlin.models.tf.utils.batch_utils import TFModelEncode
+        from merlin.models.tf.utils.batch_utils import TFModelEncode, compute_partitions
 
         model_encode = TFModelEncode(self, batch_size=batch_size, **kwargs)
         predictions = dataset.map_partitions(model_encode)
+        if num_workers:
+            predictions = compute_partitions(predictions, num_workers=num_workers)
 
         return merlin.io.Dataset(predictions)
 
+    def quantize_embeddings(
+        self, eval_data: Optional[merlin.io.Dataset] = None, **evaluate_kwargs
+    ) -> Dict[str, Any]:
+        """Post-training quantization of the embedding tables of the model to int8,
+        for inference (see `EmbeddingFeatures.quantize()`).
+        The quantized tables are not trainable anymore.
+
+        Parameters
+        ----------
+        eval_data: Optional[merlin.io.Dataset]
+            If set, the model is evaluated on `eval_data` before and after the quantization,
+            to report the impact of the quantization on the metrics. By default None
+        **evaluate_kwargs
+            Arguments for `evaluate()` (e.g. `batch_size` or `item_corpus`)
+
+        Returns
+        -------
+        Dict[str, Any]
+            The report of each quantized table (`tables`), the memory of the float32 and
+            quantized tables (in bytes) and the memory saving (fraction of the float32 memory).
+            If `eval_data` is set, the metrics before (`metrics`) and after
+            (`quantized_metrics`) the quantization, and their difference (`metrics_delta`)
+        """
+        from merlin.models.tf.features.embedding import EmbeddingFeatures
+
+        evaluate_kwargs = {"verbose": 0, **evaluate_kwargs, "return_dict": True}
+        if eval_data is not None:
+            metrics = self.evaluate(eval_data, **evaluate_kwargs)
+
+        tables: Dict[str, Dict[str, float]] = {}
+        for layer in self._flatten_layers(include_self=False):
+            if isinstance(layer, EmbeddingFeatures) and layer.built:
+                tables.update(layer.quantize())
+        # The functions are traced again with the quantized tables
+        self.train_function, self.test_function, self.predict_function = None, None, None
+        self._num_weights_updates += 1
+
+        float_bytes = sum(table["float_bytes"] for table in tables.values())
+        quantized_bytes = sum(table["quantized_bytes"] for table in tables.values())
+        report: Dict[str, Any] = {
+            "tables": tables,
+            "float_bytes": float_bytes,
+            "quantized_bytes": quantized_bytes,
+            "memory_saving": 1.0 - quantized_bytes / float_bytes if float_bytes else 0.0,
+        }
+        if eval_data is not None:
+            quantized_metrics = self.evaluate(eval_data, **evaluate_kwargs)
+            report["metrics"] = metrics
+            report["quantized_metrics"] = quantized_metrics
+            report["metrics_delta"] = {
+                name: quantized_metrics[name] - value for name, value in metrics.items()
+            }
+
+        return report
+
     @classmethod
     def from_config(cls, config, custom_objects=None):
         block = tf.keras.utils.deserialize_keras_object(config.pop("block"))
@@ -521,6 +642,8 @@ class RetrievalModel(Model):
         if not any(isinstance(b, RetrievalBlock) for b in self.block):
             raise ValueError("Model must contain a `RetrievalBlock`.")
 
+        self._item_corpus_cache: Optional[_ItemCorpusCache] = None
+
     def evaluate(
         self,
         x=None,
@@ -547,24 +670,9 @@ class RetrievalModel(Model):
 
             if isinstance(item_corpus, TopKIndexBlock):
                 self.loss_block.pre_eval_topk = item_corpus  # type: ignore
+                self._item_corpus_cache = None
             elif isinstance(item_corpus, merlin.io.Dataset):
-                item_corpus = unique_rows_by_features(item_corpus, Tags.ITEM, Tags.ITEM_ID)
-                item_block = self.retrieval_block.item_block()
-                loss_block = self.loss_block
-
-                if loss_block.pre_eval_topk is None:
-                    ranking_metrics = list(
-                        [metric for metric in self.metrics if isinstance(metric, RankingMetric)]
-                    )
-                    loss_block.pre_eval_topk = TopKIndexBlock.from_block(
-                        item_block,
-                        data=item_corpus,
-                        k=tf.reduce_max([metric.k for metric in ranking_metrics]),
-                        context=self.context,
-                        **kwargs,
-                    )
-                else:
-                    loss_block.pre_eval_topk.update_from_block(item_block, item_corpus)
+                self._set_pre_eval_topk_from_corpus(item_corpus, **kwargs)
             else:
                 raise ValueError(
                     "`item_corpus` must be either a `TopKIndexBlock` or a `Dataset`. ",
@@ -589,6 +697,47 @@ class RetrievalModel(Model):
             **kwargs,
         )
 
+    def _set_pre_eval_topk_from_corpus(self, item_corpus: merlin.io.Dataset, **kwargs):
+        """Sets the top-k index used for evaluation from the `item_corpus`.
+
+        The de-duplicated item features and the encoded index are cached, and
+        they are only recomputed when a different corpus is provided or when
+        the weights changed since the index was built (see `weights_version`),
+        e.g. not when evaluating several validation sets after one epoch.
+        """
+        from merlin.models.tf.blocks.core.index import TopKIndexBlock
+
+        item_block = self.retrieval_block.item_block()
+        loss_block = self.loss_block
+        cache = self._item_corpus_cache
+
+        if cache is not None and cache.item_corpus is item_corpus:
+            is_index_valid = cache.weights_version == self.weights_version
+            if loss_block.pre_eval_topk is not None and is_index_valid:
+                return
+            unique_item_corpus = cache.unique_item_corpus
+        else:
+            unique_item_corpus = unique_rows_by_features(item_corpus, Tags.ITEM, Tags.ITEM_ID)
+            unique_item_corpus = merlin.io.Dataset(unique_item_corpus.to_ddf().persist())
+
+        if loss_block.pre_eval_topk is None:
+            ranking_metrics = list(
+                [metric for metric in self.metrics if isinstance(metric, RankingMetric)]
+            )
+            loss_block.pre_eval_topk = TopKIndexBlock.from_block(
+                item_block,
+                data=unique_item_corpus,
+                k=tf.reduce_max([metric.k for metric in ranking_metrics]),
+                context=self.context,
+                **kwargs,
+            )
+        else:
+            loss_block.pre_eval_topk.update_from_block(item_block, unique_item_corpus)
+
+        self._item_corpus_cache = _ItemCorpusCache(
+            item_corpus, unique_item_corpus, self.weights_version
+        )
+
     def compute_loss_metrics(
         self, inputs, targets, training: bool = False, compute_metrics=True, **kwargs
     ):
@@ -608,6 +757,8 @@ class RetrievalModel(Model):
         batch_size: int,
         query_tag: Union[str, Tags] = Tags.USER,
         query_id_tag: Union[str, Tags] = Tags.USER_ID,
+        in_memory: bool = False,
+        num_workers: Optional[int] = None,
     ) -> merlin.io.Dataset:
         """Export query embeddings from the model.
 
@@ -621,6 +772,13 @@ class RetrievalModel(Model):
             Tag to use for the query.
         query_id_tag: Union[str, Tags], optional
             Tag to use for the query id.
+        in_memory: bool, optional
+            Whether to encode the data with the live query tower instead of
+            saving and reloading it, by default False
+        num_workers: Optional[int], optional
+            If set, the embeddings are computed eagerly by a pool of `num_workers`
+            threads, keeping the order of the partitions.
+            By default None, which returns a lazy dataset.
 
         Returns
         -------
@@ -628,12 +786,14 @@ class RetrievalModel(Model):
             Dataset with the user/query features and the embeddings
             (one dim per column in the data frame)
         """
-        from merlin.models.tf.utils.batch_utils import QueryEmbeddings
+        from merlin.models.tf.utils.batch_utils import QueryEmbeddings, compute_partitions
 
-        get_user_emb = QueryEmbeddings(self, batch_size=batch_size)
+        get_user_emb = QueryEmbeddings(self, batch_size=batch_size, in_memory=in_memory)
 
         dataset = unique_rows_by_features(dataset, query_tag, query_id_tag).to_ddf()
         embeddings = dataset.map_partitions(get_user_emb)
+        if num_workers:
+            embeddings = compute_partitions(embeddings, num_workers=num_workers)
 
         return merlin.io.Dataset(embeddings)
 
@@ -643,6 +803,8 @@ class RetrievalModel(Model):
         batch_size: int,
         item_tag: Union[str, Tags] = Tags.ITEM,
         item_id_tag: Union[str, Tags] = Tags.ITEM_ID,
+        in_memory: bool = False,
+        num_workers: Optional[int] = None,
     ) -> merlin.io.Dataset:
         """Export item embeddings from the model.
 
@@ -656,6 +818,13 @@ class RetrievalModel(Model):
             Tag to use for the item.
         item_id_tag : Union[str, Tags], optional
             Tag to use for the item id, by default Tags.ITEM_ID
+        in_memory : bool, optional
+            Whether to encode the data with the live item tower instead of
+            saving and reloading it, by default False
+        num_workers : Optional[int], optional
+            If set, the embeddings are computed eagerly by a pool of `num_workers`
+            threads, keeping the order of the partitions.
+            By default None, which returns a lazy dataset.
 
         Returns
         -------
@@ -663,15 +832,67 @@ class RetrievalModel(Model):
             Dataset with the item features and the embeddings
             (one dim per column in the data frame)
         """
-        from merlin.models.tf.utils.batch_utils import ItemEmbeddings
+        from merlin.models.tf.utils.batch_utils import ItemEmbeddings, compute_partitions
 
-        get_item_emb = ItemEmbeddings(self, batch_size=batch_size)
+        get_item_emb = ItemEmbeddings(self, batch_size=batch_size, in_memory=in_memory)
 
         dataset = unique_rows_by_features(dataset, item_tag, item_id_tag).to_ddf()
         embeddings = dataset.map_partitions(get_item_emb)
+        if num_workers:
+            embeddings = compute_partitions(embeddings, num_workers=num_workers)
 
         return merlin.io.Dataset(embeddings)
 
+    def export_item_embeddings(
+        self,
+        dataset: merlin.io.Dataset,
+        export_path: str,
+        batch_size: int,
+        output_format: str = "parquet",
+        dtype: Optional[str] = None,
+        item_tag: Union[str, Tags] = Tags.ITEM,
+        item_id_tag: Union[str, Tags] = Tags.ITEM_ID,
+    ) -> str:
+        """Streams item embeddings to disk, writing one parquet row group
+        or `.npy` shard per batch, so that the peak memory is bounded by
+        a batch instead of the whole output (as in `item_embeddings()`).
+
+        Parameters
+        ----------
+        dataset : merlin.io.Dataset
+            Dataset to export embeddings from.
+        export_path : str
+            Path of the parquet file (`output_format="parquet"`) or
+            directory of shards (`output_format="npy"`)
+        batch_size : int
+            Batch size to use for embedding extraction.
+        output_format : str, optional
+            Either "parquet" or "npy", by default "parquet"
+        dtype : Optional[str], optional
+            If set, embeddings are cast to this dtype (e.g. "float16")
+            before being written, by default None
+        item_tag : Union[str, Tags], optional
+            Tag to use for the item.
+        item_id_tag : Union[str, Tags], optional
+            Tag to use for the item id, by default Tags.ITEM_ID
+
+        Returns
+        -------
+        str
+            The export path
+        """
+        from merlin.models.tf.utils.batch_utils import export_embeddings
+        from merlin.models.utils.export_utils import embedding_writer
+
+        id_column = dataset.schema.select_by_tag(item_id_tag).first.name
+        data = unique_rows_by_features(dataset, item_tag, item_id_tag).to_ddf()
+        item_block = self.retrieval_block.item_block()
+
+        with embedding_writer(export_path, output_format, dtype, id_column=id_column) as writer:
+            export_embeddings(item_block, data, writer, id_column, batch_size=batch_size)
+
+        return export_path
+
     def check_for_retrieval_task(self):
         if not (
             getattr(self, "loss_block", None)
@@ -695,6 +916,9 @@ class RetrievalModel(Model):
             Dataset to convert to a Top-k Recommender.
         k: int
             Number of recommendations to make.
+        **kwargs
+            Arguments for `TopKIndexBlock.from_block()`, e.g. `quantize=True`
+            to store the item embeddings of the index as int8 values.
         Returns
         -------
         SequentialBlock
@@ -725,6 +949,16 @@ class RetrievalModel(Model):
         return recommender
 
 
+class _ItemCorpusCache:
+    """Item corpus used to build the evaluation top-k index, its de-duplicated
+    item features and the version of the model weights used to encode it"""
+
+    def __init__(self, item_corpus, unique_item_corpus, weights_version):
+        self.item_corpus = item_corpus
+        self.unique_item_corpus = unique_item_corpus
+        self.weights_version = weights_version
+
+
 def _maybe_convert_merlin_dataset(data, batch_size, shuffle=True, **kwargs):
     # Check if merlin-dataset is passed
     if hasattr(data, "to_ddf"):
@@ -0,0 +1,34 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from merlin.models.tf.optimizers.multi import (
+    LegacyOptimizer,
+    MultiOptimizer,
+    get_optimizer,
+    is_embedding_variable,
+    mark_embedding_variable,
+)
+from merlin.models.tf.optimizers.sparse import LazyAdam, RowWiseAdagrad
+
+__all__ = [
+    "LegacyOptimizer",
+    "MultiOptimizer",
+    "get_optimizer",
+    "is_embedding_variable",
+    "mark_embedding_variable",
+    "LazyAdam",
+    "RowWiseAdagrad",
+]
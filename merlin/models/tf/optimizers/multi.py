@@ -0,0 +1,153 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from typing import Union
+
+import tensorflow as tf
+
+# The optimizers of this package are implemented with the OptimizerV2 API,
+# which was moved to `tf.keras.optimizers.legacy` in TF 2.11
+if hasattr(tf.keras.optimizers.Optimizer, "_set_hyper"):
+    LegacyOptimizer = tf.keras.optimizers.Optimizer
+    _LEGACY_OPTIMIZER_KWARGS = {}
+else:
+    LegacyOptimizer = tf.keras.optimizers.legacy.Optimizer
+    _LEGACY_OPTIMIZER_KWARGS = {"use_legacy_optimizer": True}
+
+OptimizerType = Union[str, tf.keras.optimizers.Optimizer]
+
+
+def get_optimizer(identifier: OptimizerType, custom_objects=None) -> LegacyOptimizer:
+    """Like `tf.keras.optimizers.get()`, but the optimizer identifiers (and configs)
+    are resolved to the OptimizerV2 optimizers (see `LegacyOptimizer`), like the
+    optimizers of this package, so that they can be combined by `MultiOptimizer`"""
+    if isinstance(identifier, str):
+        identifier = {"class_name": identifier, "config": {}}
+    if isinstance(identifier, dict):
+        identifier = tf.keras.optimizers.deserialize(
+            identifier, custom_objects=custom_objects, **_LEGACY_OPTIMIZER_KWARGS
+        )
+    if not isinstance(identifier, LegacyOptimizer):
+        raise ValueError(
+            f"Expected an optimizer identifier or a {LegacyOptimizer.__module__}."
+            f"{LegacyOptimizer.__name__} optimizer, received: {identifier}"
+        )
+
+    return identifier
+
+
+def mark_embedding_variable(variable: tf.Variable) -> tf.Variable:
+    """Marks the variable as the rows of an embedding table (which are looked up by id),
+    whose gradients are applied by the `embedding_optimizer` of `MultiOptimizer`.
+    It is called when the rows of the tables are created
+    (e.g. by `ModelContext.add_embedding_weight()`)"""
+    variable._is_embedding_variable = True
+
+    return variable
+
+
+def is_embedding_variable(variable: tf.Variable) -> bool:
+    """Whether the variable was marked as the rows of an embedding table
+    by `mark_embedding_variable()`. The other weights of the tables (e.g. the
+    projections of `MixedDimensionTableConfig`) are dense variables"""
+    return getattr(variable, "_is_embedding_variable", False)
+
+
+@tf.keras.utils.register_keras_serializable(package="merlin.models")
+class MultiOptimizer(LegacyOptimizer):
+    """Optimizer that applies the gradients of the embedding tables (see `is_embedding_variable`)
+    with the `embedding_optimizer` and the gradients of the other variables with the
+    `default_optimizer`, e.g. to use a `LazyAdam` or `RowWiseAdagrad` optimizer for the sparse
+    updates of the embedding tables and `Adam` for the dense layers.
+
+    It is created by `Model.compile(optimizer=..., embedding_optimizer=...)`.
+
+    Parameters
+    ----------
+    default_optimizer: OptimizerType
+        Optimizer (or optimizer identifier) of the variables which aren't embedding tables.
+        The optimizer instances must be OptimizerV2 optimizers (see `get_optimizer()`)
+    embedding_optimizer: OptimizerType
+        Optimizer (or optimizer identifier) of the embedding tables
+    name: str
+        Name of the optimizer, by default "MultiOptimizer"
+
+    The `learning_rate` (or `lr`) of the `MultiOptimizer` is the learning rate of the
+    `default_optimizer`, so that the learning-rate callbacks (e.g.
+    `tf.keras.callbacks.ReduceLROnPlateau`) update the learning rate of the dense layers.
+    The `embedding_optimizer` keeps its own learning rate.
+    """
+
+    def __init__(
+        self,
+        default_optimizer: OptimizerType,
+        embedding_optimizer: OptimizerType,
+        name: str = "MultiOptimizer",
+        **kwargs,
+    ):
+        super().__init__(name, **kwargs)
+        self.default_optimizer = get_optimizer(default_optimizer)
+        self.embedding_optimizer = get_optimizer(embedding_optimizer)
+        self._track_trackable(self.default_optimizer, "default_optimizer")
+        self._track_trackable(self.embedding_optimizer, "embedding_optimizer")
+
+    @property
+    def learning_rate(self):
+        return self.default_optimizer.learning_rate
+
+    @learning_rate.setter
+    def learning_rate(self, learning_rate):
+        self.default_optimizer.learning_rate = learning_rate
+
+    lr = learning_rate
+
+    def apply_gradients(self, grads_and_vars, name=None, experimental_aggregate_gradients=True):
+        default_grads_and_vars, embedding_grads_and_vars = [], []
+        for grad, var in grads_and_vars:
+            if is_embedding_variable(var):
+                embedding_grads_and_vars.append((grad, var))
+            else:
+                default_grads_and_vars.append((grad, var))
+
+        update_ops = []
+        for optimizer, optimizer_grads_and_vars in [
+            (self.default_optimizer, default_grads_and_vars),
+            (self.embedding_optimizer, embedding_grads_and_vars),
+        ]:
+            if optimizer_grads_and_vars:
+                update_ops.append(
+                    optimizer.apply_gradients(
+                        optimizer_grads_and_vars,
+                        experimental_aggregate_gradients=experimental_aggregate_gradients,
+                    )
+                )
+
+        with tf.control_dependencies(update_ops):
+            return self.iterations.assign_add(1)
+
+    def get_config(self):
+        config = super().get_config()
+        config["default_optimizer"] = tf.keras.optimizers.serialize(self.default_optimizer)
+        config["embedding_optimizer"] = tf.keras.optimizers.serialize(self.embedding_optimizer)
+
+        return config
+
+    @classmethod
+    def from_config(cls, config, custom_objects=None):
+        config = dict(config)
+        for key in ["default_optimizer", "embedding_optimizer"]:
+            config[key] = get_optimizer(config[key], custom_objects=custom_objects)
+
+        return cls(**config)
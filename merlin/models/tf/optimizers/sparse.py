@@ -0,0 +1,222 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import tensorflow as tf
+
+from merlin.models.tf.optimizers.multi import LegacyOptimizer
+
+
+def _row_wise_shape(var: tf.Variable) -> tf.TensorShape:
+    # Variables with less than 2 dims have a single value per row
+    return var.shape[:1] if var.shape.rank >= 2 else var.shape
+
+
+def _row_mean(var: tf.Variable, values: tf.Tensor) -> tf.Tensor:
+    if var.shape.rank < 2:
+        return values
+    return tf.reduce_mean(tf.reshape(values, (tf.shape(values)[0], -1)), axis=1)
+
+
+def _expand_rows(var: tf.Variable, row_values: tf.Tensor) -> tf.Tensor:
+    if var.shape.rank < 2:
+        return row_values
+    return tf.reshape(row_values, [-1] + [1] * (var.shape.rank - 1))
+
+
+@tf.keras.utils.register_keras_serializable(package="merlin.models")
+class RowWiseAdagrad(LegacyOptimizer):
+    """Adagrad optimizer with a single (scalar) accumulator per row of the variables,
+    the mean of the squared gradients of the row, which is typically used for
+    embedding tables (the optimizer state is `vocabulary_size` instead of
+    `vocabulary_size x dim` values).
+    Only the rows of `IndexedSlices` gradients (e.g. from embedding lookups) are updated.
+
+    Parameters
+    ----------
+    learning_rate: float
+        The learning rate, by default 0.001
+    initial_accumulator_value: float
+        Starting value for the accumulators, by default 0.1
+    epsilon: float
+        Small floating point value to avoid zero denominator, by default 1e-7
+    name: str
+        Name of the optimizer, by default "RowWiseAdagrad"
+    """
+
+    _HAS_AGGREGATE_GRAD = True
+
+    def __init__(
+        self,
+        learning_rate=0.001,
+        initial_accumulator_value: float = 0.1,
+        epsilon: float = 1e-7,
+        name: str = "RowWiseAdagrad",
+        **kwargs,
+    ):
+        if initial_accumulator_value < 0.0:
+            raise ValueError(
+                "initial_accumulator_value must be non-negative: %s" % initial_accumulator_value
+            )
+        super().__init__(name, **kwargs)
+        self._set_hyper("learning_rate", kwargs.get("lr", learning_rate))
+        self._set_hyper("decay", self._initial_decay)
+        self._initial_accumulator_value = initial_accumulator_value
+        self.epsilon = epsilon or tf.keras.backend.epsilon()
+
+    def _create_slots(self, var_list):
+        for var in var_list:
+            self.add_slot(
+                var,
+                "accumulator",
+                tf.keras.initializers.Constant(self._initial_accumulator_value),
+                shape=_row_wise_shape(var),
+            )
+
+    def _resource_apply_sparse(self, grad, var, indices, apply_state=None):
+        lr = self._decayed_lr(var.dtype.base_dtype)
+        accumulator = self.get_slot(var, "accumulator")
+
+        accumulator_t = tf.gather(accumulator, indices) + _row_mean(var, tf.square(grad))
+        update_accumulator = accumulator.scatter_update(tf.IndexedSlices(accumulator_t, indices))
+        var_update = lr * grad / (_expand_rows(var, tf.sqrt(accumulator_t)) + self.epsilon)
+        update_var = var.scatter_sub(tf.IndexedSlices(var_update, indices))
+
+        return tf.group(update_accumulator, update_var)
+
+    def _resource_apply_dense(self, grad, var, apply_state=None):
+        return self._resource_apply_sparse(grad, var, tf.range(tf.shape(var)[0]), apply_state)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update(
+            {
+                "learning_rate": self._serialize_hyperparameter("learning_rate"),
+                "decay": self._initial_decay,
+                "initial_accumulator_value": self._initial_accumulator_value,
+                "epsilon": self.epsilon,
+            }
+        )
+        return config
+
+
+@tf.keras.utils.register_keras_serializable(package="merlin.models")
+class LazyAdam(LegacyOptimizer):
+    """Adam optimizer that only updates the moments (and values) of the rows of the
+    `IndexedSlices` gradients (e.g. from embedding lookups), instead of decaying the
+    moments of all the rows of the variables at every step like `tf.keras.optimizers.Adam`.
+    The moments of the rows that are not in the batch are left as is, so this is
+    not equivalent to Adam for sparse gradients, but it is much faster for large tables.
+
+    Parameters
+    ----------
+    learning_rate: float
+        The learning rate, by default 0.001
+    beta_1: float
+        The exponential decay rate for the 1st moment estimates, by default 0.9
+    beta_2: float
+        The exponential decay rate for the 2nd moment estimates, by default 0.999
+    epsilon: float
+        Small floating point value to avoid zero denominator, by default 1e-7
+    row_wise_second_moment: bool
+        Whether the 2nd moment is stored as a single (scalar) value per row
+        (the mean of the squared gradients of the row), which reduces the optimizer
+        state by about a third, by default False
+    name: str
+        Name of the optimizer, by default "LazyAdam"
+    """
+
+    _HAS_AGGREGATE_GRAD = True
+
+    def __init__(
+        self,
+        learning_rate=0.001,
+        beta_1: float = 0.9,
+        beta_2: float = 0.999,
+        epsilon: float = 1e-7,
+        row_wise_second_moment: bool = False,
+        name: str = "LazyAdam",
+        **kwargs,
+    ):
+        super().__init__(name, **kwargs)
+        self._set_hyper("learning_rate", kwargs.get("lr", learning_rate))
+        self._set_hyper("decay", self._initial_decay)
+        self._set_hyper("beta_1", beta_1)
+        self._set_hyper("beta_2", beta_2)
+        self.epsilon = epsilon or tf.keras.backend.epsilon()
+        self.row_wise_second_moment = row_wise_second_moment
+
+    def _create_slots(self, var_list):
+        for var in var_list:
+            self.add_slot(var, "m")
+        for var in var_list:
+            shape = _row_wise_shape(var) if self.row_wise_second_moment else None
+            self.add_slot(var, "v", shape=shape)
+
+    def _prepare_local(self, var_device, var_dtype, apply_state):
+        super()._prepare_local(var_device, var_dtype, apply_state)
+
+        local_step = tf.cast(self.iterations + 1, var_dtype)
+        beta_1_t = tf.identity(self._get_hyper("beta_1", var_dtype))
+        beta_2_t = tf.identity(self._get_hyper("beta_2", var_dtype))
+        beta_1_power = tf.pow(beta_1_t, local_step)
+        beta_2_power = tf.pow(beta_2_t, local_step)
+        lr = apply_state[(var_device, var_dtype)]["lr_t"] * (
+            tf.sqrt(1 - beta_2_power) / (1 - beta_1_power)
+        )
+        apply_state[(var_device, var_dtype)].update(
+            dict(lr=lr, beta_1_t=beta_1_t, beta_2_t=beta_2_t)
+        )
+
+    def _resource_apply_sparse(self, grad, var, indices, apply_state=None):
+        var_device, var_dtype = var.device, var.dtype.base_dtype
+        coefficients = (apply_state or {}).get(
+            (var_device, var_dtype)
+        ) or self._fallback_apply_state(var_device, var_dtype)
+        beta_1_t, beta_2_t = coefficients["beta_1_t"], coefficients["beta_2_t"]
+
+        m = self.get_slot(var, "m")
+        m_t = beta_1_t * tf.gather(m, indices) + (1 - beta_1_t) * grad
+        update_m = m.scatter_update(tf.IndexedSlices(m_t, indices))
+
+        v = self.get_slot(var, "v")
+        squared_grad = tf.square(grad)
+        if self.row_wise_second_moment:
+            squared_grad = _row_mean(var, squared_grad)
+        v_t = beta_2_t * tf.gather(v, indices) + (1 - beta_2_t) * squared_grad
+        update_v = v.scatter_update(tf.IndexedSlices(v_t, indices))
+        if self.row_wise_second_moment:
+            v_t = _expand_rows(var, v_t)
+
+        var_update = coefficients["lr"] * m_t / (tf.sqrt(v_t) + self.epsilon)
+        update_var = var.scatter_sub(tf.IndexedSlices(var_update, indices))
+
+        return tf.group(update_m, update_v, update_var)
+
+    def _resource_apply_dense(self, grad, var, apply_state=None):
+        return self._resource_apply_sparse(grad, var, tf.range(tf.shape(var)[0]), apply_state)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update(
+            {
+                "learning_rate": self._serialize_hyperparameter("learning_rate"),
+                "decay": self._initial_decay,
+                "beta_1": self._serialize_hyperparameter("beta_1"),
+                "beta_2": self._serialize_hyperparameter("beta_2"),
+                "epsilon": self.epsilon,
+                "row_wise_second_moment": self.row_wise_second_moment,
+            }
+        )
+        return config
@@ -259,6 +259,12 @@ class PredictionTask(Layer, LossMixin, MetricsMixin, ContextMixin):
             training=training,
         )
 
+        if training and self._has_tiled_logits():
+            # The training logits computed over tiles of items only have the positive
+            # and the log-sum-exp columns (see `tiled_softmax_logits()`), which the
+            # metrics can't be computed (nor traced in the `tf.cond()` below) on
+            return loss
+
         loss = tf.cond(
             tf.convert_to_tensor(compute_metrics),
             lambda: self.attach_metrics_calculation_to_loss(prediction_output, loss, training),
@@ -267,6 +273,14 @@ class PredictionTask(Layer, LossMixin, MetricsMixin, ContextMixin):
 
         return loss
 
+    def _has_tiled_logits(self) -> bool:
+        if self.pre is None:
+            return False
+
+        return any(
+            getattr(layer, "logits_tile_size", None) for layer in [self.pre, *self.pre.submodules]
+        )
+
     def attach_metrics_calculation_to_loss(
         self, outputs: PredictionOutput, loss: tf.Tensor, training: bool
     ):
@@ -20,12 +20,13 @@ import tensorflow as tf
 from tensorflow.keras.layers import Layer
 from tensorflow.python.keras.layers import Dense
 
-from merlin.models.tf.blocks.core.base import Block, MetricOrMetrics
+from merlin.models.tf.blocks.core.base import Block, MetricOrMetrics, PredictionOutput
 from merlin.models.tf.losses import LossType, loss_registry
 from merlin.models.tf.prediction_tasks.base import PredictionTask
 from merlin.models.tf.utils.tf_utils import (
     maybe_deserialize_keras_objects,
     maybe_serialize_keras_objects,
+    tiled_softmax_logits,
 )
 from merlin.models.utils.schema_utils import categorical_cardinalities
 from merlin.schema import Schema, Tags
@@ -136,7 +137,14 @@ class BinaryClassificationTask(PredictionTask):
 
 @tf.keras.utils.register_keras_serializable(package="merlin.models")
 class CategFeaturePrediction(Block):
-    """Block that predicts a categorical feature. num_classes is inferred from the"""
+    """Block that predicts a categorical feature. num_classes is inferred from the
+
+    If `logits_tile_size` is set, the logits over all classes are not materialized
+    during training: `call()` returns its inputs and `call_outputs()` returns the logits
+    `[positive, log-sum-exp of the other classes]` computed over tiles of
+    `logits_tile_size` classes (see `tiled_softmax_logits()`), whose cross-entropy
+    is the one of the full softmax.
+    """
 
     def __init__(
         self,
@@ -145,14 +153,18 @@ class CategFeaturePrediction(Block):
         bias_initializer="zeros",
         kernel_initializer="random_normal",
         activation=None,
+        logits_tile_size: Optional[int] = None,
         **kwargs,
     ):
         super(CategFeaturePrediction, self).__init__(**kwargs)
+        if logits_tile_size and activation is not None:
+            raise ValueError("The logits_tile_size option requires a linear activation.")
         self.bias_initializer = bias_initializer
         self.kernel_initializer = kernel_initializer
         self.feature_name = feature_name or schema.select_by_tag(Tags.ITEM_ID).column_names[0]
         self.num_classes = categorical_cardinalities(schema)[self.feature_name]
         self.activation = activation
+        self.logits_tile_size = logits_tile_size
 
         # To ensure that the output is always fp32, avoiding numerical
         # instabilities with mixed_float16 policy
@@ -168,11 +180,37 @@ class CategFeaturePrediction(Block):
             name=f"{self.feature_name}-prediction",
             activation="linear",
         )
+        if self.logits_tile_size:
+            # The output layer might not be called during training
+            self.output_layer.build(input_shape)
         return super().build(input_shape)
 
     def call(self, inputs, training=False, **kwargs) -> tf.Tensor:
+        if training and self.logits_tile_size:
+            # The logits are computed by tiles in call_outputs()
+            return inputs
+
         return self.output_activation(self.output_layer(inputs))
 
+    def call_outputs(
+        self, outputs: PredictionOutput, training=True, **kwargs
+    ) -> "PredictionOutput":
+        if not (training and self.logits_tile_size):
+            return outputs
+
+        predictions = tiled_softmax_logits(
+            outputs.predictions,
+            self.output_layer.kernel,
+            self.output_layer.bias,
+            outputs.targets,
+            tile_size=self.logits_tile_size,
+            transpose_b=False,
+        )
+        # The positive logit is the first column
+        targets = tf.zeros(tf.shape(predictions)[:1], dtype=tf.int32)
+
+        return outputs.copy_with_updates(predictions=predictions, targets=targets)
+
     def compute_output_shape(self, input_shape):
         return input_shape[:-1] + (self.num_classes,)
 
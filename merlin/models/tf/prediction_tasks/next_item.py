@@ -57,6 +57,8 @@ def ItemsPredictionSampled(
     num_sampled: int,
     min_id: int = 0,
     ignore_false_negatives: bool = True,
+    top_k: Optional[int] = None,
+    top_k_chunk_size: int = 16384,
 ):
     """
     Compute the items logits on a subset of sampled candidates to optimize
@@ -77,6 +79,14 @@ def ItemsPredictionSampled(
         ignore_false_negatives: bool
             Ignore sampled items that are equal to the target classes
             Defaults to True
+        top_k: Optional[int]
+            If set, during inference and evaluation only the top-k scores and item ids
+            are returned, which are computed over chunks of `top_k_chunk_size` items
+            without materializing the logits of all items (see `ItemRetrievalScorer`).
+            Defaults to None
+        top_k_chunk_size: int
+            Number of items scored at once when `top_k` is set.
+            Defaults to 16384
 
     Returns:
     -------
@@ -101,6 +111,8 @@ def ItemsPredictionSampled(
         item_id_feature_name=item_id_feature_name,
         item_domain=item_domain,
         sampled_softmax_mode=True,
+        top_k=top_k,
+        top_k_chunk_size=top_k_chunk_size,
     )
 
     return logits
@@ -121,6 +133,9 @@ def NextItemPredictionTask(
     sampled_softmax: bool = False,
     num_sampled: int = 100,
     min_sampled_id: int = 0,
+    logits_tile_size: Optional[int] = None,
+    top_k: Optional[int] = None,
+    top_k_chunk_size: int = 16384,
 ) -> MultiClassClassificationTask:
     """
     Function to create the NextItemPrediction task with the right parameters.
@@ -169,6 +184,21 @@ def NextItemPredictionTask(
             The minimum id value to be sampled. Useful to ignore the first categorical
             encoded ids, which are usually reserved for <nulls>, out-of-vocabulary or padding.
             Defaults to 0.
+        logits_tile_size: Optional[int]
+            If set (and sampled_softmax is disabled), the cross-entropy over all items
+            of the catalog is computed during training over tiles of `logits_tile_size`
+            items, without materializing the (batch size x number of items) logits.
+            As the metrics can't be computed on the training logits in that case,
+            they are only computed during evaluation (over the logits of all items).
+            Defaults to None
+        top_k: Optional[int]
+            Only used with `sampled_softmax=True`. If set, during inference and evaluation
+            only the top-k scores and item ids are computed, over chunks of
+            `top_k_chunk_size` items, instead of the logits of all items.
+            Defaults to None
+        top_k_chunk_size: int
+            Number of items scored at once when `top_k` is set.
+            Defaults to 16384
     Returns
     -------
         PredictionTask
@@ -176,17 +206,29 @@ def NextItemPredictionTask(
     """
     item_id_feature_name = schema.select_by_tag(Tags.ITEM_ID).column_names[0]
 
+    if logits_tile_size and (sampled_softmax or logits_temperature != 1):
+        raise ValueError(
+            "logits_tile_size cannot be combined with sampled_softmax or logits_temperature"
+        )
+
+    if top_k and not sampled_softmax:
+        raise ValueError("top_k is only supported with sampled_softmax")
+
     if sampled_softmax:
         prediction_call = ItemsPredictionSampled(
-            schema, num_sampled=num_sampled, min_id=min_sampled_id
+            schema,
+            num_sampled=num_sampled,
+            min_id=min_sampled_id,
+            top_k=top_k,
+            top_k_chunk_size=top_k_chunk_size,
         )
 
     else:
         if weight_tying:
-            prediction_call = ItemsPredictionWeightTying(schema)
+            prediction_call = ItemsPredictionWeightTying(schema, logits_tile_size=logits_tile_size)
 
         else:
-            prediction_call = ItemsPrediction(schema)
+            prediction_call = ItemsPrediction(schema, logits_tile_size=logits_tile_size)
 
         prediction_call = prediction_call.connect(LabelToOneHot())
 
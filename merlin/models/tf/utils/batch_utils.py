@@ -1,4 +1,5 @@
 import tempfile
+import threading
 import typing as tp
 
 import numpy as np
@@ -8,6 +9,7 @@ from merlin.core.dispatch import DataFrameType, concat_columns, get_lib
 from merlin.models.tf.blocks.core.base import Block
 from merlin.models.tf.dataset import BatchedDataset
 from merlin.models.tf.models.base import Model, RetrievalModel
+from merlin.models.utils.export_utils import EmbeddingWriter
 from merlin.models.utils.schema_utils import select_targets
 from merlin.schema import Schema, Tags
 
@@ -29,13 +31,27 @@ class ModelEncode:
         self.model_load_func = model_load_func
         self.model_encode_func = model_encode_func
         self.output_concat_func = output_concat_func
+        self._model_lock = threading.Lock()
 
     @property
     def model(self):
         if isinstance(self._model, str):
-            self._model = self.model_load_func(self._model)
+            # Partitions can be encoded by a pool of threads sharing this encoder,
+            # so we make sure the model is loaded only once
+            with self._model_lock:
+                if isinstance(self._model, str):
+                    self._model = self.model_load_func(self._model)
         return self._model
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_model_lock", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._model_lock = threading.Lock()
+
     def __call__(
         self,
         df: DataFrameType,
@@ -64,6 +80,34 @@ class ModelEncode:
 
 
 class TFModelEncode(ModelEncode):
+    """Encodes dataframe partitions with a Keras model/block.
+
+    Parameters
+    ----------
+    model : tp.Union[Model, tf.keras.Model]
+        The model (or block) used to encode the data
+    output_names : tp.Optional[tp.List[str]], optional
+        Names of the output columns, by default inferred from the model tasks
+    batch_size : int, optional
+        Batch size used to iterate over each partition, by default 512
+    save_path : tp.Optional[str], optional
+        Where the model is saved to be reloaded for encoding,
+        by default a temporary directory. Ignored when `in_memory=True`
+    block_load_func : tp.Optional[tp.Callable[[str], Block]], optional
+        Function to load the saved model, by default `tf.keras.models.load_model`
+    schema : tp.Optional[Schema], optional
+        Schema of the input features, by default the model schema
+    output_concat_func : optional
+        Function to concatenate the outputs of the batches
+    in_memory : bool, optional
+        If True, the partitions are encoded with the live model through a
+        traced `tf.function` (cached across partitions), instead of saving
+        the model and loading it back, by default False.
+        Note that the encoder then holds a reference to the model, so it is
+        meant to be used in the same process (e.g. with a synchronous or
+        threaded dask scheduler).
+    """
+
     def __init__(
         self,
         model: tp.Union[Model, tf.keras.Model],
@@ -73,11 +117,16 @@ class TFModelEncode(ModelEncode):
         block_load_func: tp.Optional[tp.Callable[[str], Block]] = None,
         schema: tp.Optional[Schema] = None,
         output_concat_func=None,
+        in_memory: bool = False,
     ):
-        save_path = save_path or tempfile.mkdtemp()
-        model.save(save_path)
-
-        model_load_func = block_load_func if block_load_func else tf.keras.models.load_model
+        if in_memory:
+            model_or_path = traced_model_call(model)
+            model_load_func = None
+        else:
+            save_path = save_path or tempfile.mkdtemp()
+            model.save(save_path)
+            model_or_path = save_path
+            model_load_func = block_load_func if block_load_func else tf.keras.models.load_model
         if not output_names:
             try:
                 output_names = model.block.last.task_names
@@ -92,7 +141,7 @@ class TFModelEncode(ModelEncode):
         self.schema = schema or model.schema
 
         super().__init__(
-            save_path,
+            model_or_path,
             output_names,
             data_iterator_func=data_iterator_func(self.schema, batch_size=batch_size),
             model_load_func=model_load_func,
@@ -111,7 +160,13 @@ class TFModelEncode(ModelEncode):
 
 
 class ItemEmbeddings(TFModelEncode):
-    def __init__(self, model: Model, batch_size: int = 512, save_path: tp.Optional[str] = None):
+    def __init__(
+        self,
+        model: Model,
+        batch_size: int = 512,
+        save_path: tp.Optional[str] = None,
+        in_memory: bool = False,
+    ):
         item_block = model.block.first.item_block()
         schema = item_block.schema
 
@@ -121,6 +176,7 @@ class ItemEmbeddings(TFModelEncode):
             batch_size=batch_size,
             schema=schema,
             output_concat_func=np.concatenate,
+            in_memory=in_memory,
         )
 
 
@@ -130,6 +186,7 @@ class QueryEmbeddings(TFModelEncode):
         model: RetrievalModel,
         batch_size: int = 512,
         save_path: tp.Optional[str] = None,
+        in_memory: bool = False,
     ):
         query_block = model.block.first.query_block()
         schema = query_block.schema
@@ -140,9 +197,21 @@ class QueryEmbeddings(TFModelEncode):
             batch_size=batch_size,
             schema=schema,
             output_concat_func=np.concatenate,
+            in_memory=in_memory,
         )
 
 
+def traced_model_call(model):
+    """Wraps the inference call of `model` in a `tf.function`, so that it is
+    traced once and reused across batches and partitions"""
+
+    @tf.function(experimental_relax_shapes=True)
+    def call(inputs):
+        return model(inputs, training=False)
+
+    return call
+
+
 def model_encode(model, batch):
     # TODO: How to handle list outputs?
 
@@ -161,6 +230,74 @@ def encode_output(output: tf.Tensor):
     return output.numpy()
 
 
+def compute_partitions(ddf, num_workers: tp.Optional[int] = 1):
+    """Computes a dask dataframe of encoded partitions.
+
+    Parameters
+    ----------
+    ddf : dask.dataframe.DataFrame
+        Dask dataframe, usually the result of `map_partitions()` with a `ModelEncode`
+    num_workers : tp.Optional[int], optional
+        Number of threads used to encode the partitions in parallel. The threads
+        share the same model, which releases the GIL while running TensorFlow ops,
+        so more threads only help when there are idle CPU cores.
+        By default 1, which encodes one partition at a time.
+
+    Returns
+    -------
+    DataFrameType
+        The concatenated partitions, in the same order as the input partitions
+    """
+    if num_workers and num_workers > 1:
+        return ddf.compute(scheduler="threads", num_workers=num_workers)
+
+    return ddf.compute(scheduler="synchronous")
+
+
+def export_embeddings(
+    block: tp.Union[Block, tf.keras.Model],
+    data: DataFrameType,
+    writer: EmbeddingWriter,
+    id_column: str,
+    batch_size: int = 512,
+    schema: tp.Optional[Schema] = None,
+) -> EmbeddingWriter:
+    """Encodes `data` with `block` and streams the embeddings to `writer`, one batch
+    at a time, without concatenating the outputs in memory.
+
+    Parameters
+    ----------
+    block : tp.Union[Block, tf.keras.Model]
+        Block that returns the embeddings from the input features
+    data : DataFrameType
+        Dataframe (or dask dataframe) with the input features
+    writer : EmbeddingWriter
+        Writer for the embeddings (e.g. `ParquetEmbeddingWriter`)
+    id_column : str
+        Name of the input feature with the ids to write with the embeddings
+    batch_size : int, optional
+        Batch size used to encode the data, by default 512
+    schema : tp.Optional[Schema], optional
+        Schema of the input features, by default the block schema
+
+    Returns
+    -------
+    EmbeddingWriter
+        The writer, after all batches were written
+    """
+    schema = schema or block.schema
+    encode = traced_model_call(block)
+
+    for batch in data_iterator_func(schema, batch_size=batch_size)(data):
+        inputs = batch[0]
+        if id_column not in inputs:
+            raise ValueError(f"The id column {id_column} is not among the input features")
+        embeddings = encode(inputs)
+        writer.write(embeddings.numpy(), inputs[id_column].numpy())
+
+    return writer
+
+
 def data_iterator_func(schema, batch_size: int = 512):
     import merlin.io.dataset
 
@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from typing import Any, Sequence, Union
+from typing import Any, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import tensorflow as tf
@@ -113,29 +113,261 @@ def rescore_false_negatives(
 ):
     """
     Zeroes the logits of accidental negatives.
+    Instead of comparing every positive id with every negative id, the negative ids
+    are sorted once and the accidental hits of each positive are located with a
+    binary search (`tf.searchsorted`), so that only the hits are rescored.
     """
     # Removing dimensions of size 1 from the shape of the item ids, if applicable
-    positive_item_ids = tf.cast(tf.squeeze(positive_item_ids), neg_samples_item_ids.dtype)
-    neg_samples_item_ids = tf.squeeze(neg_samples_item_ids)
-
-    # Reshapes positive and negative ids so that false_negatives_mask matches the scores shape
-    false_negatives_mask = tf.equal(
-        tf.expand_dims(positive_item_ids, -1), tf.expand_dims(neg_samples_item_ids, 0)
+    positive_item_ids = tf.reshape(tf.cast(positive_item_ids, neg_samples_item_ids.dtype), (-1,))
+    neg_samples_item_ids = tf.reshape(neg_samples_item_ids, (-1,))
+
+    sorted_positions = tf.argsort(neg_samples_item_ids, stable=True)
+    sorted_neg_ids = tf.gather(neg_samples_item_ids, sorted_positions)
+    first_hits = tf.searchsorted(sorted_neg_ids, positive_item_ids, side="left")
+    num_hits = tf.searchsorted(sorted_neg_ids, positive_item_ids, side="right") - first_hits
+
+    # (row, column) indices of the false negatives in the scores
+    hits_rows = tf.repeat(tf.range(tf.shape(positive_item_ids)[0]), num_hits)
+    hits_offsets = tf.range(tf.reduce_sum(num_hits)) - tf.repeat(
+        tf.cumsum(num_hits, exclusive=True), num_hits
     )
+    hits_cols = tf.gather(sorted_positions, tf.repeat(first_hits, num_hits) + hits_offsets)
+    hits_indices = tf.stack([hits_rows, hits_cols], axis=1)
+    num_false_negatives = tf.shape(hits_indices)[:1]
 
+    negative_scores = tf.reshape(
+        negative_scores, (tf.shape(positive_item_ids)[0], tf.shape(neg_samples_item_ids)[0])
+    )
     # Setting a very small value for false negatives (accidental hits) so that it has
     # negligicle effect on the loss functions
-    negative_scores = tf.where(
-        false_negatives_mask,
-        tf.ones_like(negative_scores) * false_negatives_score,
+    negative_scores = tf.tensor_scatter_nd_update(
         negative_scores,
+        hits_indices,
+        tf.fill(num_false_negatives, tf.cast(false_negatives_score, negative_scores.dtype)),
     )
 
-    valid_negatives_mask = tf.logical_not(false_negatives_mask)
+    valid_negatives_mask = tf.tensor_scatter_nd_update(
+        tf.ones_like(negative_scores, dtype=tf.bool),
+        hits_indices,
+        tf.zeros(num_false_negatives, dtype=tf.bool),
+    )
 
     return tf.squeeze(negative_scores), valid_negatives_mask
 
 
+def streaming_top_k(
+    queries: tf.Tensor, candidates: tf.Tensor, k: int, chunk_size: int = 16384
+) -> Tuple[tf.Tensor, tf.Tensor]:
+    """Computes the top-k dot-product scores of the queries over the candidates
+    (and their indices), walking the candidates in chunks of `chunk_size` rows and
+    merging the top-k of each chunk with the running top-k. So, the peak memory is
+    (batch size x (k + chunk_size)) instead of (batch size x number of candidates).
+
+    Parameters
+    ----------
+    queries : tf.Tensor
+        2D tensor with the query embeddings
+    candidates : tf.Tensor
+        2D tensor with the candidate embeddings (e.g. an embedding table).
+        Its number of rows should not be smaller than k.
+    k : int
+        Number of top candidates to retrieve
+    chunk_size : int, optional
+        Number of candidates scored at once, by default 16384
+
+    Returns
+    -------
+    Tuple[tf.Tensor, tf.Tensor]
+        2D tensors with the top-k scores and the corresponding candidate indices (rows)
+    """
+    batch_size = tf.shape(queries)[0]
+    num_candidates = tf.shape(candidates)[0]
+
+    def body(start, top_scores, top_indices):
+        chunk_scores = tf.matmul(queries, candidates[start : start + chunk_size], transpose_b=True)
+        chunk_indices = start + tf.range(tf.shape(chunk_scores)[1])
+        scores = tf.concat([top_scores, chunk_scores], axis=1)
+        indices = tf.concat(
+            [top_indices, tf.broadcast_to(chunk_indices, tf.shape(chunk_scores))], axis=1
+        )
+        top_scores, top_positions = tf.math.top_k(scores, k=k)
+        return start + chunk_size, top_scores, tf.gather(indices, top_positions, batch_dims=1)
+
+    _, top_scores, top_indices = tf.while_loop(
+        lambda start, *_: start < num_candidates,
+        body,
+        [
+            tf.constant(0),
+            tf.fill([batch_size, k], tf.constant(float("-inf"), dtype=queries.dtype)),
+            tf.fill([batch_size, k], -1),
+        ],
+    )
+    return top_scores, top_indices
+
+
+def tiled_logsumexp(
+    inputs: tf.Tensor,
+    weights: tf.Tensor,
+    bias: tf.Tensor,
+    exclude_ids: tf.Tensor,
+    tile_size: int = 16384,
+    transpose_b: bool = True,
+) -> tf.Tensor:
+    """Computes, for each row of the inputs, the log-sum-exp of its logits
+    `inputs @ weights + bias` over all classes except `exclude_ids`, walking the
+    classes in tiles of `tile_size`. The gradient recomputes the logits of each tile
+    instead of keeping them, so the peak memory is (batch size x tile_size) instead of
+    (batch size x number of classes) both in the forward and backward passes.
+
+    Parameters
+    ----------
+    inputs : tf.Tensor
+        2D tensor (batch size, dim)
+    weights : tf.Tensor
+        2D tensor with the weights of the classes, (number of classes, dim) if
+        `transpose_b=True` (e.g. an embedding table) or (dim, number of classes)
+        otherwise (e.g. the kernel of a `Dense` layer)
+    bias : tf.Tensor
+        1D tensor with the bias of the classes
+    exclude_ids : tf.Tensor
+        1D tensor with the class excluded from the log-sum-exp of each row
+    tile_size : int, optional
+        Number of classes scored at once, by default 16384
+    transpose_b : bool, optional
+        Whether the classes are the rows of the weights, by default True
+
+    Returns
+    -------
+    tf.Tensor
+        1D tensor (batch size,) with the log-sum-exp of each row
+    """
+    class_axis = 0 if transpose_b else 1
+    num_classes = tf.shape(weights)[class_axis]
+    num_tiles = (num_classes + tile_size - 1) // tile_size
+    exclude_ids = tf.reshape(tf.cast(exclude_ids, tf.int32), (-1, 1))
+
+    def tile_logits(x, w, b, tile):
+        start = tile * tile_size
+        size = tf.minimum(tile_size, num_classes - start)
+        if transpose_b:
+            w_tile = tf.slice(w, [start, 0], [size, -1])
+        else:
+            w_tile = tf.slice(w, [0, start], [-1, size])
+        logits = tf.matmul(x, w_tile, transpose_b=transpose_b) + tf.slice(b, [start], [size])
+        excluded = tf.equal(exclude_ids, start + tf.expand_dims(tf.range(size), 0))
+        logits = tf.where(excluded, tf.constant(float("-inf"), dtype=logits.dtype), logits)
+
+        return logits, w_tile
+
+    @tf.custom_gradient
+    def logsumexp(x, w, b):
+        def body(tile, running_max, running_sum):
+            logits, _ = tile_logits(x, w, b, tile)
+            new_max = tf.maximum(running_max, tf.reduce_max(logits, axis=1))
+            # Avoids (-inf) - (-inf) while no class was accumulated yet
+            shift = tf.where(tf.math.is_finite(new_max), new_max, tf.zeros_like(new_max))
+            running_sum = running_sum * tf.exp(running_max - shift) + tf.reduce_sum(
+                tf.exp(logits - tf.expand_dims(shift, 1)), axis=1
+            )
+            return tile + 1, new_max, running_sum
+
+        batch_size = tf.shape(x)[:1]
+        _, running_max, running_sum = tf.while_loop(
+            lambda tile, *_: tile < num_tiles,
+            body,
+            [
+                tf.constant(0),
+                tf.fill(batch_size, tf.constant(float("-inf"), dtype=x.dtype)),
+                tf.zeros(batch_size, dtype=x.dtype),
+            ],
+            # Running the tiles one by one, so that only one tile of logits is kept in memory
+            parallel_iterations=1,
+        )
+        shift = tf.where(tf.math.is_finite(running_max), running_max, tf.zeros_like(running_max))
+        lse = shift + tf.math.log(running_sum)
+
+        def grad(upstream):
+            safe_lse = tf.where(tf.math.is_finite(lse), lse, tf.zeros_like(lse))
+
+            def grad_body(tile, dx, dw_tiles, db_tiles):
+                logits, w_tile = tile_logits(x, w, b, tile)
+                # Gradient of the log-sum-exp w.r.t. the logits is their softmax
+                dlogits = tf.expand_dims(upstream, 1) * tf.exp(logits - tf.expand_dims(safe_lse, 1))
+                dx += tf.matmul(dlogits, w_tile, transpose_b=not transpose_b)
+                dw_tiles = dw_tiles.write(tile, tf.matmul(dlogits, x, transpose_a=True))
+                db_tiles = db_tiles.write(tile, tf.reduce_sum(dlogits, axis=0))
+                return tile + 1, dx, dw_tiles, db_tiles
+
+            _, dx, dw_tiles, db_tiles = tf.while_loop(
+                lambda tile, *_: tile < num_tiles,
+                grad_body,
+                [
+                    tf.constant(0),
+                    tf.zeros_like(x),
+                    tf.TensorArray(x.dtype, size=num_tiles, infer_shape=False),
+                    tf.TensorArray(x.dtype, size=num_tiles, infer_shape=False),
+                ],
+                parallel_iterations=1,
+            )
+            dw = dw_tiles.concat()
+            if not transpose_b:
+                dw = tf.transpose(dw)
+
+            return dx, dw, db_tiles.concat()
+
+        return lse, grad
+
+    return logsumexp(inputs, weights, bias)
+
+
+def tiled_softmax_logits(
+    inputs: tf.Tensor,
+    weights: tf.Tensor,
+    bias: tf.Tensor,
+    labels: tf.Tensor,
+    tile_size: int = 16384,
+    transpose_b: bool = True,
+) -> tf.Tensor:
+    """Computes the logits `[positive, negatives]` (batch size, 2), where positive is
+    the logit of the label class and negatives is the log-sum-exp of the logits of
+    all the other classes (see `tiled_logsumexp()`). The softmax cross-entropy of these
+    logits with the first column as target is equal to the one of the logits over all
+    classes, without materializing them.
+
+    Parameters
+    ----------
+    inputs : tf.Tensor
+        2D tensor (batch size, dim)
+    weights : tf.Tensor
+        2D tensor with the weights of the classes (see `tiled_logsumexp()`)
+    bias : tf.Tensor
+        1D tensor with the bias of the classes
+    labels : tf.Tensor
+        Tensor with the label class of each row
+    tile_size : int, optional
+        Number of classes scored at once, by default 16384
+    transpose_b : bool, optional
+        Whether the classes are the rows of the weights, by default True
+
+    Returns
+    -------
+    tf.Tensor
+        2D tensor (batch size, 2) with the logits of the positive and negative classes
+    """
+    inputs = tf.cast(inputs, tf.float32)
+    weights = tf.cast(weights, tf.float32)
+    bias = tf.cast(bias, tf.float32)
+    labels = tf.reshape(tf.cast(labels, tf.int32), (-1,))
+
+    positive_weights = tf.gather(weights, labels, axis=0 if transpose_b else 1)
+    if not transpose_b:
+        positive_weights = tf.transpose(positive_weights)
+    positive_logits = tf.reduce_sum(inputs * positive_weights, axis=-1) + tf.gather(bias, labels)
+    negative_logits = tiled_logsumexp(inputs, weights, bias, labels, tile_size, transpose_b)
+
+    return tf.stack([positive_logits, negative_logits], axis=1)
+
+
 def extract_topk(k, predictions, labels):
     # Computes the number of relevant items per row (before extracting only the top-k)
     label_relevant_counts = tf.reduce_sum(labels, axis=-1)
@@ -253,6 +485,77 @@ def add_epsilon_to_zeros(tensor: tf.Tensor, epsilon: float = 1e-24) -> tf.Tensor
     return tf.where(tf.equal(tensor, 0.0), tensor + epsilon, tensor)
 
 
+def quantize_rows_int8(
+    values: tf.Tensor, symmetric: bool = True
+) -> Tuple[tf.Tensor, tf.Tensor, Optional[tf.Tensor]]:
+    """Quantizes each row of a 2D tensor to int8 with per-row scaling, so that
+    `values ~= (int8_values - zero_points) * scales`
+
+    Parameters
+    ----------
+    values : tf.Tensor
+        2D float tensor to quantize
+    symmetric : bool
+        Whether the values are scaled symmetrically around zero (`[-127, 127]`
+        is mapped to `[-max(abs(row)), max(abs(row))]`, without zero-points),
+        otherwise `[-128, 127]` is mapped to `[min(row), max(row)]`,
+        which has a lower error for rows that are not centered around zero.
+        By default True
+
+    Returns
+    -------
+    Tuple[tf.Tensor, tf.Tensor, Optional[tf.Tensor]]
+        The int8 quantized values, the float32 scale of each row (1D tensor) and the
+        float32 zero-point of each row (1D tensor), which is None if `symmetric` is True
+    """
+    values = tf.cast(values, tf.float32)
+    if symmetric:
+        scales = tf.reduce_max(tf.abs(values), axis=-1) / 127.0
+    else:
+        min_values = tf.reduce_min(values, axis=-1)
+        scales = (tf.reduce_max(values, axis=-1) - min_values) / 255.0
+    # Avoiding division by zero for rows with only zeros (or a single value)
+    scales = tf.where(tf.equal(scales, 0.0), tf.ones_like(scales), scales)
+    quantized = tf.round(values / tf.expand_dims(scales, -1))
+    if symmetric:
+        zero_points = None
+        quantized = tf.clip_by_value(quantized, -127.0, 127.0)
+    else:
+        zero_points = tf.round(-128.0 - min_values / scales)
+        quantized = tf.clip_by_value(quantized + tf.expand_dims(zero_points, -1), -128.0, 127.0)
+
+    return tf.cast(quantized, tf.int8), scales, zero_points
+
+
+def dequantize_rows_int8(
+    quantized: tf.Tensor,
+    scales: tf.Tensor,
+    zero_points: Optional[tf.Tensor] = None,
+    dtype: tf.DType = tf.float32,
+) -> tf.Tensor:
+    """Reverts `quantize_rows_int8()`, returning
+    `(quantized - zero_points) * scales` as `dtype`"""
+    values = tf.cast(quantized, tf.float32)
+    if zero_points is not None:
+        values -= tf.expand_dims(zero_points, -1)
+    return tf.cast(values * tf.expand_dims(scales, -1), dtype)
+
+
+def untrack_variable(layer: tf.keras.layers.Layer, variable: tf.Variable):
+    """Removes a variable created by `layer.add_weight()` from the weights and
+    the checkpoint dependencies of the layer (e.g. when it is replaced by other weights),
+    so that it is not saved with the layer anymore"""
+    for attr in ["_trainable_weights", "_non_trainable_weights"]:
+        weights = getattr(layer, attr)
+        weights[:] = [weight for weight in weights if weight is not variable]
+
+    dependencies = layer._self_unconditional_checkpoint_dependencies
+    for dependency in dependencies:
+        if dependency.ref is variable:
+            layer._self_unconditional_dependency_names.pop(dependency.name, None)
+    dependencies[:] = [dependency for dependency in dependencies if dependency.ref is not variable]
+
+
 def get_candidate_probs(
     item_freq_probs: Union[tf.Tensor, Sequence], is_prob_distribution: bool = False
 ):
@@ -15,7 +15,7 @@
 #
 
 from functools import partial
-from typing import Any, Callable, Dict, Optional, Text, Union
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple, Union
 
 import torch
 
@@ -33,6 +33,7 @@ from merlin.models.torch.utils.torch_utils import (
 from merlin.models.utils.doc_utils import docstring_parameter
 from merlin.models.utils.schema_utils import (
     categorical_cardinalities,
+    categorical_domains,
     get_embedding_sizes_from_schema,
 )
 from merlin.schema import Schema, Tags
@@ -43,6 +44,11 @@ EMBEDDING_FEATURES_PARAMS_DOCSTRING = """
         TableConfig can be used for multiple features.
     item_id: str, optional
         The name of the feature that's used for the item_id.
+    fuse_lookups: bool, optional
+        If enabled, the tables (with the same dimension and combiner) are stored in a single
+        ``torch.nn.EmbeddingBag``, each table starting at its own row offset, so that all the
+        features are looked up with a single call per batch (see ``FusedEmbeddingBag``),
+        by default False.
 """
 
 
@@ -69,29 +75,37 @@ class EmbeddingFeatures(InputBlock):
         post: Optional[TabularTransformationType] = None,
         aggregation: Optional[TabularAggregationType] = None,
         schema: Optional[Schema] = None,
+        fuse_lookups: bool = False,
     ):
         super().__init__(pre=pre, post=post, aggregation=aggregation, schema=schema)
         self.item_id = item_id
         self.feature_config = feature_config
         self.filter_features = FilterFeatures(list(feature_config.keys()))
+        self.fuse_lookups = fuse_lookups
 
         embedding_tables = {}
-        features_dim = {}
-        tables: Dict[str, TableConfig] = {}
-        for name, feature in self.feature_config.items():
-            table: TableConfig = feature.table
-            features_dim[name] = table.dim
-            if name not in tables:
-                tables[name] = table
-
-        for name, table in tables.items():
-            embedding_tables[name] = self.table_to_embedding_module(table)
+        fused_features: Dict[Tuple[int, str], Dict[str, FeatureConfig]] = {}
+        if fuse_lookups:
+            for name, feature in self.feature_config.items():
+                group = (feature.table.dim, feature.table.combiner)
+                fused_features.setdefault(group, {})[name] = feature
+        else:
+            for name, feature in self.feature_config.items():
+                embedding_tables[name] = self.table_to_embedding_module(feature.table)
 
         self.embedding_tables = torch.nn.ModuleDict(embedding_tables)
+        self.fused_embedding_bags = torch.nn.ModuleList(
+            [FusedEmbeddingBag(features) for features in fused_features.values()]
+        )
 
     @property
     def item_embedding_table(self):
         assert self.item_id is not None
+        if self.fuse_lookups:
+            raise ValueError(
+                "The item embedding table is not available when the lookups are fused, "
+                "use `fused_embedding_bags` instead"
+            )
 
         return self.embedding_tables[self.item_id]
 
@@ -119,6 +133,7 @@ class EmbeddingFeatures(InputBlock):
         aggregation=None,
         pre=None,
         post=None,
+        fuse_lookups: bool = False,
         **kwargs,
     ) -> Optional["EmbeddingFeatures"]:
         """Instantitates ``EmbeddingFeatures`` from a ``DatasetSchema``.
@@ -152,6 +167,11 @@ class EmbeddingFeatures(InputBlock):
             Automatically infers input size from features, by default True
         max_sequence_length : Optional[int], optional
             Maximum sequence length for list features,, by default None
+        fuse_lookups : bool, optional
+            Whether all the features are looked up with a single ``FusedEmbeddingBag``
+            call per batch, in which case the features with the same categorical domain
+            share the same table (otherwise each feature has its own table),
+            by default False
 
         Returns
         -------
@@ -182,21 +202,32 @@ class EmbeddingFeatures(InputBlock):
             emb_config[key] = (cardinality, embedding_size, embedding_initializer)
 
         feature_config: Dict[str, FeatureConfig] = {}
+        tables: Dict[str, TableConfig] = {}
+        domains = categorical_domains(schema)
         for name, (vocab_size, dim, emb_initilizer) in emb_config.items():
-            feature_config[name] = FeatureConfig(
-                TableConfig(
+            # When the lookups are fused, the features with the same domain share the same table
+            table_name = domains[name] if fuse_lookups else name
+            if table_name not in tables:
+                tables[table_name] = TableConfig(
                     vocabulary_size=vocab_size,
                     dim=dim,
-                    name=name,
+                    name=table_name,
                     combiner=combiner,
                     initializer=emb_initilizer,
                 )
-            )
+            feature_config[name] = FeatureConfig(tables[table_name])
 
         if not feature_config:
             return None
 
-        output = cls(feature_config, item_id=item_id, pre=pre, post=post, aggregation=aggregation)
+        output = cls(
+            feature_config,
+            item_id=item_id,
+            pre=pre,
+            post=post,
+            aggregation=aggregation,
+            fuse_lookups=fuse_lookups,
+        )
 
         if automatic_build and schema:
             output.build(
@@ -216,6 +247,12 @@ class EmbeddingFeatures(InputBlock):
     def forward(self, inputs, **kwargs):
         embedded_outputs = {}
         filtered_inputs = self.filter_features(inputs)
+        if self.fuse_lookups:
+            fused_outputs = {}
+            for fused_embedding_bag in self.fused_embedding_bags:
+                fused_outputs.update(fused_embedding_bag(filtered_inputs))
+            embedded_outputs = {name: fused_outputs[name] for name in filtered_inputs}
+            filtered_inputs = {}
         for name, val in filtered_inputs.items():
             if isinstance(val, tuple):
                 values, offsets = val
@@ -247,12 +284,88 @@ class EmbeddingFeatures(InputBlock):
         return sizes
 
 
+class FusedEmbeddingBag(torch.nn.Module):
+    """Looks up the embeddings of multiple features with a single ``torch.nn.EmbeddingBag``,
+    whose weight is the concatenation of the tables of the features, each table starting
+    at its own row offset (the features that share a table share its rows).
+    The ids of the features are shifted by the row offsets of their tables and concatenated,
+    so that all the features are looked up with a single call, whose outputs are then split
+    back per feature.
+
+    Parameters
+    ----------
+    feature_config: Dict[str, FeatureConfig]
+        The features to look up. Their tables must have the same dimension and combiner.
+    """
+
+    def __init__(self, feature_config: Dict[str, "FeatureConfig"]):
+        super().__init__()
+        tables: Dict[str, TableConfig] = {}
+        self.feature_tables: Dict[str, str] = {}
+        for name, feature in feature_config.items():
+            table_name = feature.table.name or name
+            tables.setdefault(table_name, feature.table)
+            self.feature_tables[name] = table_name
+
+        if len({(table.dim, table.combiner) for table in tables.values()}) > 1:
+            raise ValueError("The fused tables must have the same dim and combiner")
+
+        self.row_offsets: Dict[str, int] = {}
+        self.table_sizes: Dict[str, int] = {}
+        num_embeddings = 0
+        for table_name, table in tables.items():
+            self.row_offsets[table_name] = num_embeddings
+            self.table_sizes[table_name] = table.vocabulary_size
+            num_embeddings += table.vocabulary_size
+
+        first_table = next(iter(tables.values()))
+        self.embedding_bag = torch.nn.EmbeddingBag(
+            num_embeddings, first_table.dim, mode=first_table.combiner
+        )
+        for table_name, table in tables.items():
+            table.initializer(self.table_weight(table_name).data)
+
+    def table_weight(self, table_name: str) -> torch.Tensor:
+        """Returns the rows of the table (a view of the fused weight)"""
+        start = self.row_offsets[table_name]
+
+        return self.embedding_bag.weight[start : start + self.table_sizes[table_name]]
+
+    def forward(self, inputs: Dict[str, Any]) -> Dict[str, torch.Tensor]:
+        names: List[str] = []
+        indices, offsets, num_bags = [], [], []
+        num_values = 0
+        for name, val in inputs.items():
+            if name not in self.feature_tables:
+                continue
+            if isinstance(val, tuple):
+                values, bag_offsets = val
+                values = values.reshape(-1)
+                bag_offsets = bag_offsets[:, 0]
+            else:
+                if len(val.shape) == 1:
+                    val = val.unsqueeze(-1)
+                values = val.reshape(-1)
+                bag_offsets = torch.arange(0, values.shape[0], val.shape[1], device=values.device)
+            names.append(name)
+            indices.append(values.long() + self.row_offsets[self.feature_tables[name]])
+            offsets.append(bag_offsets.long() + num_values)
+            num_bags.append(bag_offsets.shape[0])
+            num_values += values.shape[0]
+
+        if not names:
+            return {}
+        embeddings = self.embedding_bag(torch.cat(indices), torch.cat(offsets))
+
+        return dict(zip(names, torch.split(embeddings, num_bags)))
+
+
 class EmbeddingBagWrapper(torch.nn.EmbeddingBag):
-    def forward(self, input, **kwargs):
+    def forward(self, input, offsets=None, **kwargs):
         # EmbeddingBag requires 2D tensors (or offsets)
-        if len(input.shape) == 1:
+        if offsets is None and len(input.shape) == 1:
             input = input.unsqueeze(-1)
-        return super().forward(input, **kwargs)
+        return super().forward(input, offsets, **kwargs)
 
 
 @docstring_parameter(
@@ -0,0 +1,161 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import abc
+import os
+from typing import Optional, Union
+
+import numpy as np
+
+from merlin.models.utils.dependencies import is_pyarrow_available
+
+
+class EmbeddingWriter(abc.ABC):
+    """Writes embeddings to disk one batch at a time, so that
+    the peak memory of an export is bounded by a single batch.
+
+    Parameters
+    ----------
+    path : str
+        Output path
+    dtype : Optional[Union[str, np.dtype]], optional
+        If set, embeddings are cast to this dtype before being written
+        (e.g. "float16" to halve the output size), by default None
+    id_column : str, optional
+        Name of the ids column, by default "id"
+    """
+
+    def __init__(
+        self, path: str, dtype: Optional[Union[str, np.dtype]] = None, id_column: str = "id"
+    ):
+        self.path = path
+        self.dtype = dtype
+        self.id_column = id_column
+        self.num_batches = 0
+        self.num_rows = 0
+
+    def write(self, embeddings: np.ndarray, ids: Optional[np.ndarray] = None) -> None:
+        """Writes a batch of embeddings
+
+        Parameters
+        ----------
+        embeddings : np.ndarray
+            2D array with the batch embeddings
+        ids : Optional[np.ndarray], optional
+            1D array with the ids of the batch embeddings, by default None
+        """
+        embeddings = np.asarray(embeddings)
+        if embeddings.ndim != 2:
+            raise ValueError(f"The embeddings must be a 2D array (got {embeddings.shape}).")
+        if self.dtype is not None:
+            embeddings = embeddings.astype(self.dtype, copy=False)
+        if ids is not None:
+            ids = np.asarray(ids).reshape(-1)
+            if ids.shape[0] != embeddings.shape[0]:
+                raise ValueError(
+                    f"The number of ids ({ids.shape[0]}) and embeddings "
+                    f"({embeddings.shape[0]}) should match."
+                )
+
+        self._write_batch(embeddings, ids)
+        self.num_batches += 1
+        self.num_rows += embeddings.shape[0]
+
+    @abc.abstractmethod
+    def _write_batch(self, embeddings: np.ndarray, ids: Optional[np.ndarray]) -> None:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetEmbeddingWriter(EmbeddingWriter):
+    """Writes embeddings to a single parquet file, with one row group per batch.
+    Embedding dimensions are stored in columns named "0", "1", ..., like in
+    `EmbeddingFeatures.embedding_table_df()`, preceded by the ids column (if provided).
+
+    Note that float16 columns require a pyarrow version with half-float parquet support.
+    """
+
+    def __init__(
+        self, path: str, dtype: Optional[Union[str, np.dtype]] = None, id_column: str = "id"
+    ):
+        if not is_pyarrow_available():
+            raise ImportError("pyarrow is required to write embeddings to parquet.")
+        super().__init__(path, dtype=dtype, id_column=id_column)
+        self._writer = None
+
+    def _write_batch(self, embeddings: np.ndarray, ids: Optional[np.ndarray]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns, names = [], []
+        if ids is not None:
+            columns.append(pa.array(ids))
+            names.append(self.id_column)
+        for dim in range(embeddings.shape[1]):
+            columns.append(pa.array(embeddings[:, dim]))
+            names.append(str(dim))
+        table = pa.Table.from_arrays(columns, names=names)
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class NumpyEmbeddingWriter(EmbeddingWriter):
+    """Writes each batch of embeddings to a separate `.npy` shard in the `path` directory
+    (`embeddings_00000.npy`, `embeddings_00001.npy`, ...), with the corresponding ids
+    (if provided) in `ids_00000.npy`, `ids_00001.npy`, ...
+    """
+
+    def __init__(
+        self, path: str, dtype: Optional[Union[str, np.dtype]] = None, id_column: str = "id"
+    ):
+        super().__init__(path, dtype=dtype, id_column=id_column)
+        os.makedirs(path, exist_ok=True)
+
+    def _write_batch(self, embeddings: np.ndarray, ids: Optional[np.ndarray]) -> None:
+        shard = f"{self.num_batches:05d}.npy"
+        np.save(os.path.join(self.path, f"embeddings_{shard}"), embeddings, allow_pickle=False)
+        if ids is not None:
+            np.save(os.path.join(self.path, f"ids_{shard}"), ids, allow_pickle=False)
+
+
+def embedding_writer(
+    path: str,
+    output_format: str = "parquet",
+    dtype: Optional[Union[str, np.dtype]] = None,
+    id_column: str = "id",
+) -> EmbeddingWriter:
+    """Creates an `EmbeddingWriter` for the `output_format` ("parquet" or "npy")"""
+    writers = {"parquet": ParquetEmbeddingWriter, "npy": NumpyEmbeddingWriter}
+    if output_format not in writers:
+        raise ValueError(
+            f"Invalid output format: {output_format}. Expected one of {list(writers.keys())}"
+        )
+
+    return writers[output_format](path, dtype=dtype, id_column=id_column)
@@ -205,3 +205,33 @@ def get_embedding_size_from_cardinality(
         embedding_size = int(math.ceil((embedding_size / 8)) * 8)
 
     return embedding_size
+
+
+def categorical_frequencies_from_parquet(
+    path: str, column: str, count_column: Optional[str] = None
+) -> np.ndarray:
+    """Reads the frequencies of the encoded ids of a categorical feature from
+    the unique values parquet file written by the NVTabular Categorify op
+    (e.g. `categories/unique.<column>.parquet`), whose rows are the encoded ids.
+
+    Parameters
+    ----------
+    path : str
+        Path of the unique values parquet file
+    column : str
+        Name of the categorical column
+    count_column : Optional[str], optional
+        Name of the column with the number of occurrences of each value,
+        by default "<column>_size"
+
+    Returns
+    -------
+    np.ndarray
+        The number of occurrences of each encoded id
+    """
+    import pandas as pd
+
+    count_column = count_column or f"{column}_size"
+    counts = pd.read_parquet(path, columns=[count_column])[count_column]
+
+    return counts.fillna(0).to_numpy(dtype=np.int64)
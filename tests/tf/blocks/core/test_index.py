@@ -143,3 +143,108 @@ def test_topk_recommender_outputs(ecommerce_data: Dataset):
     recall_at_10 = numpy_recall(positive_item_ids, topk_items, k=10)
 
     np.isclose(recall_at_10, eval_metrics["recall_at_10"], rtol=1e-6)
+
+
+@pytest.mark.parametrize("dtype", [None, "float16"])
+def test_topk_index_save_load(tmp_path, dtype):
+    import numpy as np
+    import tensorflow as tf
+
+    from merlin.models.tf.blocks.core.index import IndexBlock
+
+    values = tf.random.uniform((100, 16))
+    ids = tf.range(1000, 1100, dtype=tf.int64)
+    index = mm.TopKIndexBlock(k=10, values=values, ids=ids)
+    index.save(str(tmp_path), dtype=dtype)
+
+    assert np.load(str(tmp_path / "values.npy")).dtype == np.dtype(dtype or "float32")
+
+    loaded = mm.TopKIndexBlock.load(str(tmp_path))
+    assert isinstance(loaded, mm.TopKIndexBlock)
+    assert loaded._k == 10
+    assert loaded.values.dtype == tf.float32
+    tf.debugging.assert_equal(loaded.ids, ids)
+
+    queries = tf.random.uniform((8, 16))
+    expected_scores, expected_ids = index(queries)
+    top_scores, top_ids = loaded(queries)
+    assert top_ids.shape == (8, 10)
+    if dtype is None:
+        tf.debugging.assert_equal(top_ids, expected_ids)
+    tf.debugging.assert_near(top_scores, expected_scores, atol=5e-2)
+
+    loaded_index = IndexBlock.load(str(tmp_path))
+    assert tuple(tf.shape(loaded_index.values).numpy()) == (100, 16)
+
+    np.save(str(tmp_path / "values.npy"), values.numpy().astype("float64"))
+    with pytest.raises(ValueError) as excinfo:
+        IndexBlock.load(str(tmp_path))
+    assert "dtype float64" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("exclusion_format", ["ragged", "bitmap"])
+def test_topk_index_exclude(exclusion_format):
+    import tensorflow as tf
+
+    values = tf.random.uniform((50, 8))
+    ids = tf.range(100, 150, dtype=tf.int64)
+    index = mm.TopKIndexBlock(k=5, values=values, ids=ids)
+
+    queries = tf.random.uniform((4, 8))
+    _, top_ids = index(queries, k=50)
+    # Excluding the 3 best candidates of the first query and the best of the last one
+    excluded = tf.ragged.constant(
+        [top_ids[0, :3].numpy().tolist(), [], [], [top_ids[3, 0].numpy(), 9999]],
+        dtype=tf.int64,
+    )
+    if exclusion_format == "bitmap":
+        excluded = tf.reduce_any(
+            tf.equal(tf.expand_dims(ids, 0), tf.expand_dims(excluded.to_tensor(-1), -1)),
+            axis=1,
+        )
+
+    _, filtered_ids = index(queries, exclude=excluded)
+
+    tf.debugging.assert_equal(filtered_ids[0], top_ids[0, 3:8])
+    tf.debugging.assert_equal(filtered_ids[1:3], top_ids[1:3, :5])
+    tf.debugging.assert_equal(filtered_ids[3], top_ids[3, 1:6])
+
+    # The sorted ids used to map excluded ids are refreshed by `update()`
+    index.update(values, tf.reverse(ids, axis=[0]))
+    _, top_ids = index(queries, k=2)
+    _, filtered_ids = index(queries, k=1, exclude=top_ids[:, :1])
+    tf.debugging.assert_equal(filtered_ids, top_ids[:, 1:])
+
+
+def test_topk_index_quantized(tmp_path):
+    import numpy as np
+    import tensorflow as tf
+
+    from merlin.models.tf.utils import tf_utils
+
+    values = tf.random.normal((100, 16))
+    ids = tf.range(1000, 1100, dtype=tf.int64)
+    index = mm.TopKIndexBlock(k=10, values=values, ids=ids)
+    quantized_index = mm.TopKIndexBlock(k=10, values=values, ids=ids, quantize=True)
+    assert quantized_index.values.dtype == tf.int8
+
+    # The scores are the same as with the dequantized values
+    dequantized = tf_utils.dequantize_rows_int8(
+        *tf_utils.quantize_rows_int8(values, symmetric=False)
+    )
+    queries = tf.random.normal((8, 16))
+    top_scores, top_ids = quantized_index(queries)
+    expected_scores, expected_ids = mm.TopKIndexBlock(k=10, values=dequantized, ids=ids)(queries)
+    tf.debugging.assert_near(top_scores, expected_scores, atol=1e-4)
+    tf.debugging.assert_near(top_scores, index(queries)[0], atol=0.1)
+    np.testing.assert_allclose(quantized_index.float_values().numpy(), values.numpy(), atol=0.05)
+
+    quantized_index.update(values[:50], ids[:50])
+    assert tf.shape(quantized_index.scales)[0] == 50
+    assert quantized_index(queries)[1].shape == (8, 10)
+
+    quantized_index.save(str(tmp_path))
+    loaded = mm.TopKIndexBlock.load(str(tmp_path))
+    assert loaded.quantize
+    assert loaded.values.dtype == tf.int8
+    tf.debugging.assert_equal(loaded(queries)[1], quantized_index(queries)[1])
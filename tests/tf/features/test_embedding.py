@@ -14,6 +14,9 @@
 # limitations under the License.
 #
 
+import math
+import os
+
 import numpy as np
 import pytest
 from tensorflow.keras.initializers import RandomUniform
@@ -21,6 +24,7 @@ from tensorflow.keras.initializers import RandomUniform
 import merlin.models.tf as mm
 from merlin.io import Dataset
 from merlin.models.tf.utils import testing_utils
+from merlin.models.utils import schema_utils
 from merlin.schema import Tags
 
 
@@ -242,3 +246,497 @@ def test_shared_embeddings(music_streaming_data: Dataset):
     embeddings = inputs.select_by_name(Tags.CATEGORICAL.value)
 
     assert embeddings.table_config("item_genres") == embeddings.table_config("user_genres")
+
+
+@pytest.mark.parametrize("options_key", ["item_genres", "user_genres", "genres"])
+def test_shared_embeddings_table_options(music_streaming_data: Dataset, options_key):
+    schema = music_streaming_data.schema.select_by_name(["item_genres", "user_genres"])
+    # The options are set by any feature of the domain, or by the domain itself
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema,
+        embedding_options=mm.EmbeddingOptions(
+            embedding_dim_default=16,
+            compositional_embeddings={options_key: dict(strategy="quotient_remainder")},
+        ),
+    )
+    table = emb_module.table_config("item_genres")
+    assert table == emb_module.table_config("user_genres")
+    assert isinstance(table, mm.CompositionalTableConfig)
+    assert table.name == "genres"
+
+    batch = mm.sample_batch(music_streaming_data, batch_size=10, include_targets=False)
+    embeddings = emb_module(batch)
+    assert embeddings["user_genres"].shape == (10, 16)
+
+    with pytest.raises(ValueError) as excinfo:
+        mm.EmbeddingFeatures.from_schema(
+            schema,
+            embedding_options=mm.EmbeddingOptions(
+                compositional_embeddings={"item_genres": dict(strategy="quotient_remainder")},
+                dynamic_vocab_embeddings={"user_genres": dict(capacity=100)},
+            ),
+        )
+    assert "configured by the embeddings options of both item_genres and user_genres" in str(
+        excinfo.value
+    )
+
+
+@pytest.mark.parametrize("deduplicate_lookups", [False, True])
+def test_embedding_features_fuse_lookups(music_streaming_data: Dataset, deduplicate_lookups):
+    import tensorflow as tf
+
+    schema = music_streaming_data.schema.select_by_tag(Tags.CATEGORICAL)
+    embedding_options = dict(embedding_dim_default=8, embeddings_l2_reg=0.1)
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema, embedding_options=mm.EmbeddingOptions(**embedding_options)
+    )
+    fused_module = mm.EmbeddingFeatures.from_schema(
+        schema,
+        embedding_options=mm.EmbeddingOptions(
+            fuse_lookups=True, deduplicate_lookups=deduplicate_lookups, **embedding_options
+        ),
+    )
+    batch = mm.sample_batch(music_streaming_data, batch_size=100, include_targets=False)
+    outputs = emb_module(batch)
+    fused_module(batch)
+    for name, table in emb_module.embedding_tables.items():
+        fused_module.embedding_tables[name].assign(table)
+
+    with tf.GradientTape() as tape:
+        fused_outputs = fused_module(batch)
+    assert list(fused_outputs) == list(outputs)
+    for name in outputs:
+        np.testing.assert_allclose(fused_outputs[name].numpy(), outputs[name].numpy())
+    # The L2 regularization of all the embeddings is a single loss
+    assert len(fused_module.losses) == 1
+    np.testing.assert_allclose(
+        fused_module.losses[0].numpy(), tf.add_n(emb_module.losses).numpy(), rtol=1e-5
+    )
+    assert all(g is not None for g in tape.gradient(fused_outputs, fused_module.trainable_weights))
+
+    assert testing_utils.assert_serialization(fused_module).fuse_lookups
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "npy"])
+def test_embedding_features_streaming_export(tmp_path, tf_cat_features, output_format):
+    import glob
+
+    import pandas as pd
+
+    dim = 8
+    feature_config = {
+        f: mm.FeatureConfig(mm.TableConfig(100, dim, name=f, initializer=None))
+        for f in tf_cat_features.keys()
+    }
+    emb_module = mm.EmbeddingFeatures(feature_config)
+    _ = emb_module(tf_cat_features)
+    table = emb_module.embedding_tables["cat_a"].numpy()
+
+    dtype = "float32" if output_format == "parquet" else "float16"
+    export_path = str(tmp_path / f"cat_a.{output_format}")
+    emb_module.export_embedding_table(
+        "cat_a", export_path, batch_size=30, output_format=output_format, dtype=dtype
+    )
+
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        assert pq.ParquetFile(export_path).num_row_groups == 4
+        exported = pd.read_parquet(export_path)
+        assert list(exported.columns) == [str(i) for i in range(dim)]
+        exported = exported.values
+    else:
+        shards = sorted(glob.glob(f"{export_path}/embeddings_*.npy"))
+        assert len(shards) == 4
+        exported = np.concatenate([np.load(shard) for shard in shards])
+        assert exported.dtype == np.float16
+
+    np.testing.assert_allclose(exported, table, atol=1e-3)
+
+
+@pytest.mark.parametrize(
+    "compositional_options",
+    [
+        dict(strategy="quotient_remainder", operation="mult"),
+        dict(strategy="quotient_remainder", operation="concat"),
+        dict(strategy="multi_hash", operation="sum", num_buckets=100, num_hashes=3),
+    ],
+)
+def test_embedding_features_compositional(testing_data: Dataset, compositional_options):
+    import tensorflow as tf
+
+    schema = testing_data.schema.select_by_tag(Tags.CATEGORICAL)
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema,
+        embedding_options=mm.EmbeddingOptions(
+            embedding_dim_default=15,
+            compositional_embeddings={"item_id": compositional_options},
+        ),
+    )
+    batch = mm.sample_batch(testing_data, batch_size=100, include_targets=False)
+    embeddings = emb_module(batch)
+
+    table = emb_module.table_config("item_id")
+    assert isinstance(table, mm.CompositionalTableConfig)
+    assert embeddings["item_id"].shape == (100, 15)
+    tables = emb_module.embedding_tables["item_id"]
+    assert len(tables) == table.num_tables
+    assert sum(np.prod(t.shape) for t in tables) < table.vocabulary_size * table.dim
+
+    full_table = emb_module.get_embedding_table("item_id")
+    assert full_table.shape == (table.vocabulary_size, 15)
+    item_ids = tf.reshape(batch["item_id"], (-1,))
+    np.testing.assert_allclose(
+        embeddings["item_id"].numpy(), tf.gather(full_table, item_ids).numpy(), rtol=1e-6
+    )
+    if table.strategy == "quotient_remainder":
+        assert np.unique(full_table.numpy(), axis=0).shape[0] == table.vocabulary_size
+
+    copy_layer = testing_utils.assert_serialization(emb_module)
+    assert isinstance(copy_layer.table_config("item_id"), mm.CompositionalTableConfig)
+    assert copy_layer.table_config("item_id").strategy == table.strategy
+
+
+def test_compositional_table_sparse_lookup():
+    import tensorflow as tf
+
+    table = mm.CompositionalTableConfig(50, 4, operation="sum", combiner="mean")
+    tables = [tf.random.uniform(shape) for shape in table.table_shapes]
+    sp_ids = tf.sparse.from_dense(tf.constant([[3, 7, 0], [12, 0, 0], [0, 0, 0]]))
+
+    outputs = table.embedding_lookup_sparse(tables, sp_ids)
+    full_table = table.embedding_lookup(tables, tf.range(50))
+    expected = [
+        (full_table[3] + full_table[7]) / 2,
+        full_table[12],
+        tf.zeros(4),
+    ]
+
+    np.testing.assert_allclose(outputs.numpy(), tf.stack(expected).numpy(), rtol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "table",
+    [
+        mm.TableConfig(10, 4, name="plain"),
+        mm.CompositionalTableConfig(10, 4, strategy="multi_hash", num_buckets=5, name="hashed"),
+        mm.MixedDimensionTableConfig(10, 4, bucket_sizes=[4, 6], name="mixed"),
+        mm.DynamicVocabTableConfig(10, 4, capacity=8, eviction_policy="lfu", name="dynamic"),
+        mm.QuantizedTableConfig(10, 4, name="quantized"),
+    ],
+)
+def test_table_config_serialization(table):
+    from merlin.models.tf.features.embedding import deserialize_table_config, serialize_table_config
+
+    config = serialize_table_config(table)
+    assert config["class_name"] == type(table).__name__
+
+    copy_table = deserialize_table_config(config)
+    assert type(copy_table) is type(table)
+    assert serialize_table_config(copy_table) == config
+
+    with pytest.raises(ValueError):
+        deserialize_table_config({**config, "class_name": "UnknownTableConfig"})
+
+
+@pytest.mark.parametrize("combiner", ["mean", "sum", "sqrtn"])
+def test_embedding_features_pooled_multi_hot(combiner):
+    import tensorflow as tf
+
+    table = mm.TableConfig(20, 4, name="shared", combiner=combiner)
+    feature_config = {name: mm.FeatureConfig(table) for name in ["sparse", "ragged", "padded"]}
+    emb_module = mm.EmbeddingFeatures(feature_config, add_default_pre=False)
+
+    ids = [[3, 7, 7], [12], []]
+    ragged = tf.ragged.constant(ids, dtype=tf.int64)
+    inputs = dict(sparse=ragged.to_sparse(), ragged=ragged, padded=ragged.to_tensor())
+    outputs = emb_module(inputs)
+
+    expected = tf.nn.safe_embedding_lookup_sparse(
+        emb_module.embedding_tables["shared"], ragged.to_sparse(), None, combiner=combiner
+    )
+    for name in inputs:
+        assert outputs[name].shape == (3, 4)
+        np.testing.assert_allclose(outputs[name].numpy(), expected.numpy(), rtol=1e-6)
+
+    # The embeddings of all the multi-hot features are pooled by a single segment reduction
+    graph = tf.function(emb_module).get_concrete_function(inputs).graph
+    op_types = [op.type for op in graph.get_operations()]
+    assert op_types.count("UnsortedSegmentSum") == (1 if combiner == "sum" else 2)
+
+
+def test_embedding_features_mixed_dimension(testing_data: Dataset):
+    import tensorflow as tf
+
+    schema = testing_data.schema.select_by_tag(Tags.CATEGORICAL)
+    cardinality = schema_utils.categorical_cardinalities(schema)["item_id"]
+    frequencies = np.random.RandomState(0).zipf(1.5, cardinality)
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema,
+        embedding_options=mm.EmbeddingOptions(
+            embedding_dim_default=32,
+            mixed_dimension_embeddings={"item_id": dict(frequencies=frequencies)},
+        ),
+    )
+    batch = mm.sample_batch(testing_data, batch_size=100, include_targets=False)
+    embeddings = emb_module(batch)
+
+    table = emb_module.table_config("item_id")
+    assert isinstance(table, mm.MixedDimensionTableConfig)
+    assert table.bucket_dims == [32, 16, 8, 4]
+    assert sum(table.bucket_sizes) == cardinality
+    assert table.bucket_sizes[0] < table.bucket_sizes[-1]
+    assert embeddings["item_id"].shape == (100, 32)
+    num_params = sum(np.prod(w.shape) for w in emb_module.trainable_weights)
+    assert num_params < cardinality * 32
+
+    # The most frequent id is the first row of the head bucket
+    top_id = int(np.argmax(frequencies))
+    head_table = emb_module.embedding_tables["item_id"][0]
+    full_table = emb_module.get_embedding_table("item_id")
+    np.testing.assert_allclose(full_table[top_id].numpy(), head_table[0].numpy())
+
+    item_ids = tf.reshape(batch["item_id"], (-1,))
+    np.testing.assert_allclose(
+        embeddings["item_id"].numpy(), tf.gather(full_table, item_ids).numpy(), rtol=1e-6
+    )
+
+    copy_layer = testing_utils.assert_serialization(emb_module)
+    copy_table = copy_layer.table_config("item_id")
+    assert copy_table.bucket_sizes == table.bucket_sizes
+    assert copy_table.rank_by_frequency
+
+
+def test_mixed_dimension_table_buckets():
+    table = mm.MixedDimensionTableConfig(10, 8, bucket_dims=[8, 2], bucket_sizes=[3, 7])
+    assert [name for name, _ in table.table_weights()] == [
+        "bucket_0",
+        "bucket_1",
+        "bucket_1_projection",
+    ]
+
+    table = mm.MixedDimensionTableConfig(6, 8, frequencies=[1, 100, 1, 1, 50, 1], num_buckets=2)
+    assert table.bucket_sizes == [1, 5]
+
+    with pytest.raises(ValueError) as excinfo:
+        mm.MixedDimensionTableConfig(10, 8, bucket_dims=[8, 2], bucket_sizes=[3, 6])
+    assert "summing to the vocabulary size" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("run_eagerly", [True, False])
+def test_embedding_features_deduplicate_lookups(tf_cat_features, run_eagerly):
+    import tensorflow as tf
+
+    feature_config = {
+        f: mm.FeatureConfig(mm.TableConfig(100, 8, name=f, initializer=None))
+        for f in tf_cat_features.keys()
+    }
+    emb_module = mm.EmbeddingFeatures(feature_config)
+    dedup_module = mm.EmbeddingFeatures(feature_config, deduplicate_lookups=True)
+    _ = emb_module(tf_cat_features), dedup_module(tf_cat_features)
+    dedup_module.set_weights(emb_module.get_weights())
+
+    def embeddings_and_grads(module):
+        with tf.GradientTape() as tape:
+            outputs = module(tf_cat_features)
+            loss = tf.reduce_sum([tf.reduce_sum(out**2) for out in outputs.values()])
+        return outputs, tape.gradient(loss, module.trainable_weights)
+
+    if not run_eagerly:
+        embeddings_and_grads = tf.function(embeddings_and_grads)
+
+    outputs, grads = embeddings_and_grads(emb_module)
+    dedup_outputs, dedup_grads = embeddings_and_grads(dedup_module)
+
+    for name in outputs:
+        np.testing.assert_allclose(outputs[name].numpy(), dedup_outputs[name].numpy())
+    for grad, dedup_grad in zip(grads, dedup_grads):
+        assert isinstance(dedup_grad, tf.IndexedSlices)
+        _, num_unique = np.unique(dedup_grad.indices.numpy(), return_counts=True)
+        assert num_unique.max() == 1
+        np.testing.assert_allclose(
+            tf.convert_to_tensor(grad).numpy(), tf.convert_to_tensor(dedup_grad).numpy(), rtol=1e-5
+        )
+
+    assert testing_utils.assert_serialization(dedup_module).deduplicate_lookups
+
+
+@pytest.mark.parametrize("eviction_policy", ["lru", "lfu"])
+def test_memory_mapped_embedding_cache(tmp_path, eviction_policy):
+    import tensorflow as tf
+
+    from merlin.models.tf.features.embedding_cache import MemoryMappedEmbeddingCache
+
+    path = str(tmp_path / "table.npy")
+    cache_var = tf.Variable(tf.zeros((4, 2)))
+    cache = MemoryMappedEmbeddingCache(
+        path, 10, 2, cache_var, eviction_policy=eviction_policy, initializer=tf.ones
+    )
+    np.testing.assert_array_equal(np.asarray(cache.table), np.ones((10, 2)))
+
+    def lookup(ids):
+        slots = cache.lookup(tf.constant(ids))
+        return tf.gather(cache_var, slots).numpy()
+
+    np.testing.assert_array_equal(lookup([0, 1, 2, 1]), np.ones((4, 2)))
+    # The id 0 is the most frequently used one, but the least recently used one
+    for ids in [[0], [0], [1], [2]]:
+        lookup(ids)
+    # Updating the rows of the cache, like the optimizer would
+    cache_var.assign_add(tf.ones((4, 2)))
+    cache.prefetch(np.array([5, 6]))
+
+    # Loading 2 missing ids uses the empty slot and evicts 1 row
+    np.testing.assert_array_equal(lookup([5, 6]), np.ones((2, 2)))
+    assert cache.num_misses == 5
+    assert not cache._staged
+    evicted, kept = (0, [1, 2]) if eviction_policy == "lru" else (1, [0, 2])
+    assert cache._slot_of_id[evicted] == -1
+    table = np.asarray(cache.table)
+    np.testing.assert_array_equal(table[evicted], [2.0, 2.0])
+    np.testing.assert_array_equal(table[kept], np.ones((2, 2)))
+
+    cache.flush()
+    np.testing.assert_array_equal(np.asarray(cache.table)[kept], np.full((2, 2), 2.0))
+
+    with pytest.raises(ValueError) as excinfo:
+        cache.lookup(tf.range(5))
+    assert "more unique ids" in str(excinfo.value)
+
+
+def test_embedding_features_memory_mapped(tmp_path, testing_data: Dataset):
+    import tensorflow as tf
+
+    schema = testing_data.schema.select_by_tag(Tags.CATEGORICAL)
+    path = str(tmp_path / "item_id.npy")
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema,
+        embedding_options=mm.EmbeddingOptions(
+            embedding_dim_default=8,
+            memory_mapped_embeddings={"item_id": dict(path=path, cache_size=150)},
+        ),
+    )
+    table = emb_module.table_config("item_id")
+    assert isinstance(table, mm.MemoryMappedTableConfig)
+
+    batch = mm.sample_batch(testing_data, batch_size=100, include_targets=False)
+    item_ids = tf.reshape(batch["item_id"], (-1,)).numpy()
+    optimizer = tf.keras.optimizers.SGD(1.0)
+
+    @tf.function
+    def train_step(inputs):
+        with tf.GradientTape() as tape:
+            loss = tf.reduce_sum(emb_module(inputs)["item_id"])
+        gradients = tape.gradient(loss, emb_module.trainable_weights)
+        optimizer.apply_gradients(zip(gradients, emb_module.trainable_weights))
+
+    train_step(batch)
+    initial_rows = np.array(table.cache.table[item_ids])
+    emb_module.prefetch(mm.sample_batch(testing_data, batch_size=100, include_targets=False))
+    for _ in range(3):
+        train_step(mm.sample_batch(testing_data, batch_size=100, include_targets=False))
+    assert emb_module.embedding_tables["item_id"][0].shape == (150, 8)
+
+    full_table = emb_module.get_embedding_table("item_id").numpy()
+    assert full_table.shape == (table.vocabulary_size, 8)
+    assert not np.allclose(full_table[item_ids], initial_rows)
+    np.testing.assert_allclose(full_table, np.asarray(table.cache.table))
+
+    # The export streams the file in slices of `cache_size` rows
+    export_path = str(tmp_path / "item_id_embeddings")
+    emb_module.export_embedding_table("item_id", export_path, output_format="npy")
+    shards = sorted(os.listdir(export_path))
+    assert len(shards) == math.ceil(table.vocabulary_size / 150)
+    exported = np.concatenate([np.load(os.path.join(export_path, shard)) for shard in shards])
+    np.testing.assert_allclose(exported, full_table)
+
+    copy_layer = testing_utils.assert_serialization(emb_module)
+    assert copy_layer.table_config("item_id").path == path
+
+
+@pytest.mark.parametrize("eviction_policy", ["lru", "lfu"])
+def test_dynamic_vocab_table(eviction_policy):
+    import tensorflow as tf
+
+    table = mm.DynamicVocabTableConfig(
+        10, 2, capacity=3, eviction_policy=eviction_policy, initializer=tf.ones, name="ids"
+    )
+    emb_module = mm.EmbeddingFeatures({"ids": mm.FeatureConfig(table)}, add_default_pre=False)
+
+    def lookup(ids, training=True):
+        return emb_module({"ids": tf.constant(ids, tf.int64)}, training=training)["ids"].numpy()
+
+    raw_ids = [10**12, 7, 10**12]
+    np.testing.assert_array_equal(lookup(raw_ids), np.ones((3, 2)))
+    # Unknown ids are looked up as zeros during inference
+    np.testing.assert_array_equal(lookup([7, 42], training=False), [[1.0, 1.0], [0.0, 0.0]])
+
+    # The id 7 is the most recently used one, but the least frequently used one
+    for ids in [[10**12], [10**12], [7]]:
+        lookup(ids)
+    emb_module.embedding_tables["ids"][0].assign_add(tf.ones((3, 2)))
+    np.testing.assert_array_equal(lookup([1, 2]), np.ones((2, 2)))
+
+    evicted, kept = (10**12, 7) if eviction_policy == "lru" else (7, 10**12)
+    np.testing.assert_array_equal(lookup([evicted, kept], training=False), [[0, 0], [2, 2]])
+    slot_ids = emb_module.get_embedding_table_ids("ids").numpy()
+    assert sorted(slot_ids.tolist()) == sorted([1, 2, kept])
+
+    copy_layer = testing_utils.assert_serialization(emb_module)
+    assert copy_layer.table_config("ids").eviction_policy == eviction_policy
+
+
+def test_embedding_features_dynamic_vocab_export(tmp_path, testing_data: Dataset):
+    import pandas as pd
+    import tensorflow as tf
+
+    schema = testing_data.schema.select_by_tag(Tags.CATEGORICAL)
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema,
+        embedding_options=mm.EmbeddingOptions(
+            embedding_dim_default=8,
+            dynamic_vocab_embeddings={"item_id": dict(capacity=1000)},
+        ),
+    )
+    assert isinstance(emb_module.table_config("item_id"), mm.DynamicVocabTableConfig)
+
+    batch = mm.sample_batch(testing_data, batch_size=100, include_targets=False)
+    outputs = emb_module(batch, training=True)
+    assert outputs["item_id"].shape == (100, 8)
+    assert len(emb_module.trainable_weights) == len(emb_module.feature_config)
+
+    path = str(tmp_path / "item_id.parquet")
+    emb_module.export_embedding_table("item_id", path)
+    df = pd.read_parquet(path)
+    item_ids = np.unique(tf.reshape(batch["item_id"], (-1,)).numpy())
+    assert sorted(df["id"].tolist()) == item_ids.tolist()
+    embeddings = emb_module({"item_id": tf.constant(df["id"].values)})["item_id"].numpy()
+    np.testing.assert_allclose(df[[str(i) for i in range(8)]].values, embeddings)
+
+
+def test_embedding_features_quantize(testing_data: Dataset):
+    import tensorflow as tf
+
+    schema = testing_data.schema.select_by_tag(Tags.CATEGORICAL)
+    emb_module = mm.EmbeddingFeatures.from_schema(
+        schema, embedding_options=mm.EmbeddingOptions(embedding_dim_default=16)
+    )
+    batch = mm.sample_batch(testing_data, batch_size=100, include_targets=False)
+    float_outputs = emb_module(batch)
+
+    report = emb_module.quantize()
+    assert set(report) == set(emb_module.embedding_tables)
+    for table_report in report.values():
+        assert table_report["memory_saving"] > 0.6
+        assert table_report["max_abs_error"] < 1e-3
+
+    assert isinstance(emb_module.table_config("item_id"), mm.QuantizedTableConfig)
+    assert emb_module.embedding_tables["item_id"][0].dtype == tf.int8
+    assert len(emb_module.trainable_weights) == 0
+    outputs = emb_module(batch)
+    for name in float_outputs:
+        np.testing.assert_allclose(outputs[name].numpy(), float_outputs[name].numpy(), atol=1e-3)
+    assert emb_module.get_embedding_table("item_id").shape[1] == 16
+
+    copy_layer = testing_utils.assert_serialization(emb_module)
+    assert isinstance(copy_layer.table_config("item_id"), mm.QuantizedTableConfig)
@@ -248,3 +248,71 @@ def test_update_by_indices():
     queue.update_by_indices(indices=tf.constant([[1], [2]]), values=tf.constant([20, 21]))
     values = queue.list_all()
     tf.assert_equal(values, [10, 20, 21, 7, 6, 5, 4, 3, 2, 1])
+
+
+def test_indexof_with_ids_index():
+    queue = ml.FIFOQueue(capacity=10, dims=[], dtype=tf.int32, index_ids=True)
+    dense_queue = ml.FIFOQueue(capacity=10, dims=[], dtype=tf.int32)
+
+    def assert_same_indices(ids):
+        tf.assert_equal(queue.index_of(ids), dense_queue.index_of(ids))
+
+    for q in [queue, dense_queue]:
+        q.enqueue_many(tf.range(10, 0, -1, dtype=tf.int32))
+    assert_same_indices([0, 1, 2, 10])
+
+    # Overwriting the oldest items (ids 10, 9, 8) when wrapping around
+    for q in [queue, dense_queue]:
+        q.enqueue_many(tf.constant([20, 21, 22], dtype=tf.int32))
+    assert_same_indices([10, 9, 8, 7, 20, 21, 22])
+    tf.assert_equal(tf.cast(queue.index_of([10, 20, 7]), tf.int32), [-1, 0, 3])
+
+    queue.update_by_indices(indices=tf.constant([[1]]), values=tf.constant([30]))
+    tf.assert_equal(tf.cast(queue.index_of([21, 30]), tf.int32), [-1, 1])
+
+    queue.clear()
+    tf.assert_equal(tf.cast(queue.index_of([20, 30, 7]), tf.int32), [-1, -1, -1])
+
+    # Dequeued ids are no longer found
+    queue.enqueue_many(tf.range(1, 6, dtype=tf.int32))
+    _ = queue.dequeue_many(2)
+    tf.assert_equal(tf.cast(queue.index_of([1, 2, 3]), tf.int32), [-1, -1, 2])
+    _ = queue.dequeue()
+    queue.enqueue(tf.constant(1))
+    tf.assert_equal(tf.cast(queue.index_of([1, 3, 5]), tf.int32), [5, -1, 4])
+
+
+def test_queue_dequeue_many_at_full_capacity(fifo_queue_fixture):
+    queue = fifo_queue_fixture
+
+    inputs = tf.random.uniform((12, 5))
+    queue.enqueue_many(inputs)
+    assert queue.at_full_capacity
+
+    output = queue.dequeue_many(4)
+    assert tf.reduce_all(output == inputs[2:6])
+    assert queue.count() == 6
+    assert not queue.at_full_capacity
+
+
+@pytest.mark.parametrize("jit_compile", [False, True])
+def test_queue_enqueue_dequeue_many_traced(jit_compile):
+    queue = ml.FIFOQueue(capacity=10, dims=[2], dtype=tf.float32)
+
+    @tf.function(jit_compile=jit_compile)
+    def enqueue_dequeue(vals, n):
+        queue.enqueue_many(vals)
+        return queue.dequeue_many(n), queue.list_all()
+
+    inputs = [tf.random.uniform((4, 2)) for _ in range(4)]
+    dequeued, all_vals = enqueue_dequeue(inputs[0], 1)
+    tf.debugging.assert_equal(dequeued, inputs[0][:1])
+    tf.debugging.assert_equal(all_vals, inputs[0][1:])
+
+    for vals in inputs[1:]:
+        dequeued, all_vals = enqueue_dequeue(vals, 1)
+    # 16 items enqueued in a 10-sized queue and 4 dequeued
+    expected = tf.concat(inputs, axis=0)[6:]
+    tf.debugging.assert_equal(dequeued, expected[:1])
+    tf.debugging.assert_equal(all_vals, expected[1:])
+    assert queue.count() == 9
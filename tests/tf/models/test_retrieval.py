@@ -214,3 +214,74 @@ def test_youtube_dnn_retrieval(
     out = model({k: tf.cast(v, tf.int64) for k, v in batch.items()})
 
     assert out.shape[-1] == 51997
+
+
+def test_retrieval_evaluate_caches_item_corpus_index(
+    ecommerce_data: Dataset, monkeypatch, tmp_path
+):
+    from merlin.models.tf.blocks.core.index import IndexBlock
+
+    model = mm.TwoTowerModel(
+        ecommerce_data.schema,
+        query_tower=mm.MLPBlock([64]),
+        samplers=[mm.InBatchSampler()],
+        metrics=[mm.RecallAt(10)],
+        loss="categorical_crossentropy",
+    )
+    model.compile("adam", run_eagerly=False)
+    model.fit(ecommerce_data, batch_size=50, epochs=1)
+
+    num_encodings = []
+    get_candidates_dataset = IndexBlock.get_candidates_dataset
+
+    def counting_get_candidates_dataset(*args, **kwargs):
+        num_encodings.append(1)
+        return get_candidates_dataset(*args, **kwargs)
+
+    monkeypatch.setattr(IndexBlock, "get_candidates_dataset", counting_get_candidates_dataset)
+
+    metrics_1 = model.evaluate(
+        ecommerce_data, item_corpus=ecommerce_data, batch_size=50, return_dict=True
+    )
+    metrics_2 = model.evaluate(
+        ecommerce_data, item_corpus=ecommerce_data, batch_size=50, return_dict=True
+    )
+    assert len(num_encodings) == 1
+    assert metrics_1["recall_at_10"] == metrics_2["recall_at_10"]
+
+    # Training updates the item tower, so the index needs to be rebuilt
+    model.fit(ecommerce_data, batch_size=50, epochs=1)
+    _ = model.evaluate(ecommerce_data, item_corpus=ecommerce_data, batch_size=50)
+    assert len(num_encodings) == 2
+
+    # Setting or loading the weights (e.g. of a frozen item tower) also does
+    model.set_weights(model.get_weights())
+    _ = model.evaluate(ecommerce_data, item_corpus=ecommerce_data, batch_size=50)
+    assert len(num_encodings) == 3
+
+    model.save_weights(str(tmp_path / "weights"))
+    model.load_weights(str(tmp_path / "weights"))
+    _ = model.evaluate(ecommerce_data, item_corpus=ecommerce_data, batch_size=50)
+    assert len(num_encodings) == 4
+
+
+def test_two_tower_model_quantize_embeddings(ecommerce_data: Dataset):
+    import tensorflow as tf
+
+    model = mm.TwoTowerModel(ecommerce_data.schema, query_tower=mm.MLPBlock([64]))
+    model.compile(optimizer="adam", run_eagerly=False)
+    model.fit(ecommerce_data, batch_size=50, epochs=1)
+
+    report = model.quantize_embeddings(ecommerce_data, batch_size=50)
+    assert report["tables"]
+    assert report["memory_saving"] > 0.6
+    assert set(report["metrics_delta"]) == set(report["metrics"])
+    assert all(abs(delta) < 0.1 for delta in report["metrics_delta"].values())
+
+    item_features = ecommerce_data.schema.select_by_tag(Tags.ITEM).column_names
+    item_dataset = Dataset(ecommerce_data.to_ddf()[item_features].drop_duplicates().compute())
+    recommender = model.to_top_k_recommender(item_dataset, k=10, quantize=True)
+    batch = mm.sample_batch(ecommerce_data, batch_size=10, include_targets=False)
+    _, top_ids = recommender(batch)
+    assert top_ids.shape == (10, 10)
+    assert recommender.block.layers[-1].values.dtype == tf.int8
@@ -0,0 +1,172 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+import merlin.models.tf as ml
+from merlin.io import Dataset
+from merlin.models.tf.optimizers import LegacyOptimizer, get_optimizer, is_embedding_variable
+from merlin.models.utils import schema_utils
+
+
+@pytest.mark.parametrize(
+    "optimizer",
+    [ml.RowWiseAdagrad(0.1), ml.LazyAdam(0.1), ml.LazyAdam(0.1, row_wise_second_moment=True)],
+)
+def test_sparse_optimizers_only_update_looked_up_rows(optimizer):
+    table = tf.Variable(tf.random.uniform((10, 4)))
+    initial_table = table.numpy()
+    indices = tf.constant([1, 3, 1])
+    grad = tf.IndexedSlices(tf.ones((3, 4)), indices, dense_shape=tf.constant([10, 4]))
+
+    optimizer.apply_gradients([(grad, table)])
+
+    updated = np.isin(np.arange(10), [1, 3])
+    assert np.all(table.numpy()[updated] < initial_table[updated])
+    np.testing.assert_array_equal(table.numpy()[~updated], initial_table[~updated])
+    for slot_name in optimizer.get_slot_names():
+        slot = optimizer.get_slot(table, slot_name).numpy()
+        np.testing.assert_array_equal(slot[~updated], np.full_like(slot[~updated], slot[0]))
+
+
+def test_row_wise_adagrad_accumulators():
+    table = tf.Variable(tf.zeros((5, 2)))
+    grad = tf.IndexedSlices(
+        tf.constant([[1.0, 3.0], [2.0, 2.0]]), tf.constant([0, 2]), dense_shape=tf.constant([5, 2])
+    )
+    optimizer = ml.RowWiseAdagrad(0.5, initial_accumulator_value=0.0, epsilon=0.0)
+
+    optimizer.apply_gradients([(grad, table)])
+
+    accumulator = optimizer.get_slot(table, "accumulator")
+    assert accumulator.shape == (5,)
+    np.testing.assert_allclose(accumulator.numpy(), [5.0, 0.0, 4.0, 0.0, 0.0])
+    expected = np.zeros((5, 2))
+    expected[0] = -0.5 * np.array([1.0, 3.0]) / np.sqrt(5.0)
+    expected[2] = -0.5 * np.array([2.0, 2.0]) / 2.0
+    np.testing.assert_allclose(table.numpy(), expected, rtol=1e-6)
+
+
+def test_lazy_adam_dense_gradients_match_adam():
+    initial_values = np.random.uniform(size=(6, 3)).astype(np.float32)
+    lazy_var, adam_var = tf.Variable(initial_values), tf.Variable(initial_values)
+    lazy_adam, adam = ml.LazyAdam(0.01), get_optimizer("adam")
+    adam.learning_rate = 0.01
+
+    for _ in range(3):
+        grad = tf.random.uniform((6, 3))
+        lazy_adam.apply_gradients([(grad, lazy_var)])
+        adam.apply_gradients([(grad, adam_var)])
+
+    np.testing.assert_allclose(lazy_var.numpy(), adam_var.numpy(), rtol=1e-5)
+
+
+@pytest.mark.parametrize("run_eagerly", [True, False])
+def test_model_compile_embedding_optimizer(ecommerce_data: Dataset, run_eagerly):
+    model = ml.Model(
+        ml.InputBlock(ecommerce_data.schema),
+        ml.MLPBlock([8]),
+        ml.BinaryClassificationTask("click"),
+    )
+    model.compile(
+        optimizer="adam", embedding_optimizer=ml.RowWiseAdagrad(0.01), run_eagerly=run_eagerly
+    )
+    assert isinstance(model.optimizer, ml.MultiOptimizer)
+
+    losses = model.fit(ecommerce_data, batch_size=50, epochs=1, verbose=0)
+    assert all(np.isfinite(losses.history["loss"]))
+    num_steps = int(model.optimizer.iterations)
+    assert num_steps > 0
+    assert int(model.optimizer.default_optimizer.iterations) == num_steps
+    assert int(model.optimizer.embedding_optimizer.iterations) == num_steps
+
+    embedding_vars = [v for v in model.trainable_variables if is_embedding_variable(v)]
+    dense_vars = [v for v in model.trainable_variables if not is_embedding_variable(v)]
+    assert embedding_vars and dense_vars
+    for var in embedding_vars:
+        accumulator = model.optimizer.embedding_optimizer.get_slot(var, "accumulator")
+        assert accumulator.shape == var.shape[:1]
+    for var in dense_vars:
+        assert model.optimizer.default_optimizer.get_slot(var, "m").shape == var.shape
+        with pytest.raises(KeyError):
+            model.optimizer.embedding_optimizer.get_slot(var, "accumulator")
+
+    copy_optimizer = ml.MultiOptimizer.from_config(model.optimizer.get_config())
+    assert isinstance(copy_optimizer.embedding_optimizer, ml.RowWiseAdagrad)
+    assert isinstance(copy_optimizer.default_optimizer, LegacyOptimizer)
+    assert type(copy_optimizer.default_optimizer).__name__ == "Adam"
+
+
+def test_model_compile_embedding_optimizer_mixed_dimension(ecommerce_data: Dataset):
+    schema = ecommerce_data.schema
+    cardinality = schema_utils.categorical_cardinalities(schema)["item_id"]
+    frequencies = np.random.RandomState(0).zipf(1.5, cardinality)
+    inputs = ml.InputBlock(
+        schema,
+        embedding_options=ml.EmbeddingOptions(
+            embedding_dim_default=16,
+            mixed_dimension_embeddings={"item_id": dict(frequencies=frequencies)},
+        ),
+    )
+    model = ml.Model(inputs, ml.MLPBlock([8]), ml.BinaryClassificationTask("click"))
+    model.compile(optimizer="adam", embedding_optimizer=ml.RowWiseAdagrad(0.01))
+    model.fit(ecommerce_data, batch_size=50, epochs=1, verbose=0)
+
+    # The projections of the mixed-dimension buckets are dense weights, not embedding rows
+    names = {v.name: is_embedding_variable(v) for v in model.trainable_variables}
+    projections = [name for name in names if "_projection" in name]
+    buckets = [name for name in names if "item_id_bucket_" in name and name not in projections]
+    assert projections and buckets
+    assert not any(names[name] for name in projections)
+    assert all(names[name] for name in buckets)
+    for var in model.trainable_variables:
+        if var.name in projections:
+            assert model.optimizer.default_optimizer.get_slot(var, "m").shape == var.shape
+
+
+def test_multi_optimizer_learning_rate(ecommerce_data: Dataset):
+    model = ml.Model(
+        ml.InputBlock(ecommerce_data.schema),
+        ml.MLPBlock([8]),
+        ml.BinaryClassificationTask("click"),
+    )
+    model.compile(optimizer=ml.LazyAdam(0.01), embedding_optimizer=ml.RowWiseAdagrad(0.1))
+
+    # The learning rate is the one of the default optimizer
+    assert model.optimizer.lr is model.optimizer.default_optimizer.lr
+    np.testing.assert_allclose(tf.keras.backend.get_value(model.optimizer.learning_rate), 0.01)
+
+    callbacks = [
+        tf.keras.callbacks.LearningRateScheduler(lambda epoch, lr: lr / 2),
+        tf.keras.callbacks.ReduceLROnPlateau(monitor="loss", factor=0.5, patience=0),
+    ]
+    model.fit(ecommerce_data, batch_size=50, epochs=2, verbose=0, callbacks=callbacks)
+    assert tf.keras.backend.get_value(model.optimizer.lr) < 0.01 / 2
+    np.testing.assert_allclose(
+        tf.keras.backend.get_value(model.optimizer.embedding_optimizer.lr), 0.1
+    )
+
+
+def test_get_optimizer():
+    optimizer = get_optimizer("adam")
+    assert isinstance(optimizer, LegacyOptimizer)
+    assert isinstance(ml.MultiOptimizer("sgd", ml.LazyAdam()), LegacyOptimizer)
+    assert get_optimizer(ml.RowWiseAdagrad()) is not None
+    if LegacyOptimizer is not tf.keras.optimizers.Optimizer:
+        with pytest.raises(ValueError):
+            get_optimizer(tf.keras.optimizers.Adam())
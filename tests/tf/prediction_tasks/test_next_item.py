@@ -20,6 +20,7 @@ import tensorflow as tf
 import merlin.models.tf as ml
 from merlin.io import Dataset
 from merlin.models.tf.blocks.core.base import PredictionOutput
+from merlin.models.utils.constants import MIN_FLOAT
 from merlin.schema import Tags
 
 
@@ -195,6 +196,25 @@ def test_item_retrieval_scorer_downscore_false_negatives():
     )
 
 
+@pytest.mark.parametrize("run_eagerly", [True, False])
+def test_rescore_false_negatives(run_eagerly):
+    from merlin.models.tf.utils.tf_utils import rescore_false_negatives
+
+    # Duplicated ids on both sides, so that positives can have several (or no) hits
+    positive_item_ids = tf.constant([[3], [7], [3], [42], [0]], dtype=tf.int32)
+    neg_item_ids = tf.constant([7, 3, 11, 3, 0, 5, 7, 3], dtype=tf.int64)
+    negative_scores = tf.random.uniform(shape=(5, 8), dtype=tf.float32)
+
+    rescore = rescore_false_negatives if run_eagerly else tf.function(rescore_false_negatives)
+    scores, valid_negatives_mask = rescore(
+        positive_item_ids, neg_item_ids, negative_scores, -1000.0
+    )
+
+    expected_mask = tf.not_equal(tf.cast(positive_item_ids, tf.int64), neg_item_ids[None, :])
+    tf.debugging.assert_equal(valid_negatives_mask, expected_mask)
+    tf.debugging.assert_equal(scores, tf.where(expected_mask, negative_scores, -1000.0))
+
+
 def test_item_retrieval_scorer_only_positive_when_not_training():
     batch_size = 10
 
@@ -402,6 +422,111 @@ def test_last_item_prediction_task(
     assert out.shape[-1] == 51997
 
 
+def test_last_item_prediction_task_weight_tying_quantized(sequence_testing_data: Dataset):
+    inputs = ml.InputBlock(
+        sequence_testing_data.schema,
+        aggregation="concat",
+        seq=False,
+        max_seq_length=4,
+        masking="clm",
+        split_sparse=True,
+    )
+    task = ml.NextItemPredictionTask(
+        schema=sequence_testing_data.schema, masking=True, weight_tying=True
+    )
+    model = inputs.connect(ml.MLPBlock([64]), task)
+    model.compile(optimizer="adam", run_eagerly=False)
+    model.fit(sequence_testing_data, batch_size=50, epochs=1)
+
+    batch = ml.sample_batch(
+        sequence_testing_data, batch_size=50, include_targets=False, to_dense=True
+    )
+    batch = {k: tf.cast(v, tf.int64) for k, v in batch.items()}
+    float_logits = model(batch)
+
+    report = model.quantize_embeddings(sequence_testing_data, batch_size=50)
+    assert "item_id_seq" in report["tables"]
+    # The tied item embeddings are dequantized by the context
+    item_embeddings = model.context.get_embedding("item_id_seq")
+    assert item_embeddings.dtype == tf.float32
+    assert "item_id_seq/embedding" not in model.context.named_variables
+    tf.debugging.assert_near(model(batch), float_logits, atol=1e-2)
+
+
+@pytest.mark.parametrize("transpose_b", [True, False])
+def test_tiled_softmax_logits(transpose_b):
+    from merlin.models.tf.utils.tf_utils import tiled_softmax_logits
+
+    num_classes = 23
+    inputs = tf.random.uniform(shape=(6, 4), dtype=tf.float32)
+    weights = tf.Variable(tf.random.normal(shape=(num_classes, 4)))
+    if not transpose_b:
+        weights = tf.Variable(tf.transpose(weights))
+    bias = tf.Variable(tf.random.normal(shape=(num_classes,)))
+    labels = tf.constant([0, 5, 22, 7, 7, 16])
+
+    @tf.function
+    def loss_and_gradients(tiled):
+        with tf.GradientTape() as tape:
+            tape.watch(inputs)
+            if tiled:
+                logits = tiled_softmax_logits(
+                    inputs, weights, bias, labels, tile_size=5, transpose_b=transpose_b
+                )
+                targets = tf.one_hot(tf.zeros_like(labels), 2)
+            else:
+                logits = tf.matmul(inputs, weights, transpose_b=transpose_b) + bias
+                targets = tf.one_hot(labels, num_classes)
+            loss = tf.reduce_mean(tf.nn.softmax_cross_entropy_with_logits(targets, logits))
+        return loss, tape.gradient(loss, [inputs, weights, bias])
+
+    tiled_loss, tiled_gradients = loss_and_gradients(True)
+    loss, gradients = loss_and_gradients(False)
+    tf.debugging.assert_near(tiled_loss, loss, atol=1e-5)
+    for tiled_gradient, gradient in zip(tiled_gradients, gradients):
+        tf.debugging.assert_near(tiled_gradient, gradient, atol=1e-5)
+
+
+@pytest.mark.parametrize("weight_tying", [True, False])
+def test_last_item_prediction_task_logits_tiles(sequence_testing_data: Dataset, weight_tying):
+    inputs = ml.InputBlock(
+        sequence_testing_data.schema,
+        aggregation="concat",
+        seq=False,
+        max_seq_length=4,
+        masking="clm",
+        split_sparse=True,
+    )
+    task = ml.NextItemPredictionTask(
+        schema=sequence_testing_data.schema,
+        masking=True,
+        weight_tying=weight_tying,
+        logits_tile_size=10000,
+    )
+
+    model = inputs.connect(ml.MLPBlock([64]), task)
+    model.compile(optimizer="adam", run_eagerly=False)
+    # The ranking metrics are skipped during training and computed during evaluation,
+    # over the logits of all items
+    losses = model.fit(sequence_testing_data, batch_size=50, epochs=1)
+    assert all(loss >= 0 for loss in losses.history["loss"])
+    metrics = model.evaluate(sequence_testing_data, batch_size=50, return_dict=True)
+    assert metrics["loss"] >= 0
+    assert metrics["ndcg_10"] >= 0
+
+    batch = ml.sample_batch(
+        sequence_testing_data, batch_size=50, include_targets=False, to_dense=True
+    )
+    out = model({k: tf.cast(v, tf.int64) for k, v in batch.items()})
+    assert out.shape[-1] == 51997
+
+    with pytest.raises(ValueError) as excinfo:
+        ml.NextItemPredictionTask(
+            schema=sequence_testing_data.schema, sampled_softmax=True, logits_tile_size=100
+        )
+    assert "logits_tile_size cannot be combined" in str(excinfo.value)
+
+
 @pytest.mark.parametrize("run_eagerly", [True, False])
 @pytest.mark.parametrize("ignore_last_batch_on_sample", [True, False])
 def test_retrieval_task_inbatch_default_sampler(
@@ -431,3 +556,160 @@ def test_retrieval_task_inbatch_default_sampler(
         tf.assert_equal(tf.shape(output)[0], batch_size)
         # Number of negatives plus one positive
         tf.assert_equal(tf.shape(output)[1], expected_num_samples_inbatch + 1)
+
+
+@pytest.mark.parametrize("logq_correction", [True, False])
+def test_item_retrieval_scorer_alias_sampler_logq_correction(logq_correction):
+    batch_size, num_items, num_sampled = 10, 100, 30
+    item_freq = tf.range(1, num_items + 1, dtype=tf.float32)
+    sampler = ml.AliasPopularitySampler(
+        item_freq, max_num_samples=num_sampled, logq_correction=logq_correction
+    )
+
+    context = ml.ModelContext()
+    item_weights = context.add_embedding_weight("item_id", shape=(num_items, 5))
+    item_retrieval_scorer = ml.ItemRetrievalScorer(
+        samplers=[sampler],
+        sampling_downscore_false_negatives=False,
+        store_negative_ids=True,
+        context=context,
+    )
+
+    users_embeddings = tf.random.uniform(shape=(batch_size, 5), dtype=tf.float32)
+    items_embeddings = tf.random.uniform(shape=(batch_size, 5), dtype=tf.float32)
+    positive_items = tf.random.uniform(shape=(batch_size,), maxval=num_items, dtype=tf.int32)
+
+    outputs = item_retrieval_scorer.call_outputs(
+        PredictionOutput(
+            {"query": users_embeddings, "item": items_embeddings}, targets=positive_items
+        ),
+        training=True,
+    )
+    neg_ids = outputs.negative_item_ids
+    expected_neg_scores = tf.matmul(
+        users_embeddings, tf.gather(item_weights, neg_ids), transpose_b=True
+    )
+    if logq_correction:
+        expected_neg_scores -= tf.math.log(
+            num_sampled * tf.gather(item_freq, neg_ids) / tf.reduce_sum(item_freq)
+        )
+    # Ignoring sampled false negatives, which are downscored
+    neg_scores = tf.where(
+        outputs.valid_negatives_mask, outputs.predictions[:, 1:], expected_neg_scores
+    )
+    tf.debugging.assert_near(neg_scores, expected_neg_scores, atol=1e-4)
+
+
+def test_item_retrieval_scorer_hard_negative_sampler():
+    batch_size, num_items, k = 10, 100, 3
+    context = ml.ModelContext()
+    item_weights = context.add_embedding_weight("item_id", shape=(num_items, 5))
+    positive_items = tf.random.uniform(shape=(batch_size,), maxval=num_items, dtype=tf.int32)
+    context.add_variable(tf.Variable(positive_items, name="item_id"))
+
+    item_retrieval_scorer = ml.ItemRetrievalScorer(
+        samplers=[ml.HardNegativeSampler(k=k)], store_negative_ids=True, context=context
+    )
+
+    users_embeddings = tf.random.uniform(shape=(batch_size, 5), dtype=tf.float32)
+    items_embeddings = tf.random.uniform(shape=(batch_size, 5), dtype=tf.float32)
+    outputs = item_retrieval_scorer.call_outputs(
+        PredictionOutput(
+            {"query": users_embeddings, "item": items_embeddings}, targets=positive_items
+        ),
+        training=True,
+    )
+
+    # The hard negatives include the top-k items (besides the positive) of each query
+    scores = tf.matmul(users_embeddings, item_weights, transpose_b=True)
+    scores += tf.one_hot(positive_items, num_items) * -1e9
+    _, expected_top_ids = tf.math.top_k(scores, k=k)
+    assert set(outputs.negative_item_ids.numpy().tolist()) == set(
+        expected_top_ids.numpy().reshape(-1).tolist()
+    )
+    assert outputs.predictions.shape[1] == 1 + outputs.negative_item_ids.shape[0]
+
+
+def test_item_retrieval_scorer_sampled_softmax_top_k():
+    from merlin.models.tf.utils.tf_utils import streaming_top_k
+
+    batch_size, num_items, k = 8, 103, 5
+    context = ml.ModelContext()
+    item_weights = context.add_embedding_weight("item_id", shape=(num_items, 4))
+    context.add_variable(tf.Variable(tf.range(batch_size), name="item_id"))
+    item_retrieval_scorer = ml.ItemRetrievalScorer(
+        samplers=[ml.InBatchSampler()],
+        sampled_softmax_mode=True,
+        top_k=k,
+        top_k_chunk_size=10,
+        context=context,
+    )
+
+    queries = tf.random.uniform(shape=(batch_size, 4), dtype=tf.float32)
+    expected_scores, expected_ids = tf.math.top_k(
+        tf.matmul(queries, item_weights, transpose_b=True), k=k
+    )
+    scores, ids = streaming_top_k(queries, item_weights, k=k, chunk_size=16)
+    tf.debugging.assert_near(scores, expected_scores)
+    tf.debugging.assert_equal(ids, expected_ids)
+
+    item_retrieval_scorer.build(queries.shape)
+    top_scores, top_ids = item_retrieval_scorer.call(queries, training=False)
+    tf.debugging.assert_near(top_scores, expected_scores)
+    tf.debugging.assert_equal(top_ids, expected_ids)
+
+    # The positive items of the last 4 queries are not retrieved
+    _, bottom_ids = tf.math.top_k(-tf.matmul(queries, item_weights, transpose_b=True), k=1)
+    targets = tf.concat([expected_ids[:4, 1], bottom_ids[4:, 0]], axis=0)
+    outputs = item_retrieval_scorer.call_outputs(
+        PredictionOutput((top_scores, top_ids), targets=targets), training=False
+    )
+    assert tuple(outputs.predictions.shape) == (batch_size, k + 1)
+    tf.debugging.assert_equal(outputs.targets, tf.one_hot(tf.zeros(batch_size, tf.int32), k + 1))
+    positive_scores = tf.reduce_sum(queries * tf.gather(item_weights, targets), axis=-1)
+    tf.debugging.assert_near(outputs.predictions[:, 0], positive_scores)
+    # The retrieved positive items are masked in the top-k logits
+    tf.debugging.assert_near(
+        outputs.predictions[:4, 2], tf.fill([4], tf.cast(MIN_FLOAT, tf.float32))
+    )
+    tf.debugging.assert_near(outputs.predictions[4:, 1:], top_scores[4:])
+    # So the loss is not zero when the positive item is not retrieved
+    loss = tf.keras.losses.categorical_crossentropy(
+        outputs.targets, outputs.predictions, from_logits=True
+    )
+    assert all(loss[4:] > 0)
+    # The query is passed to `call_outputs()` per call, not stored in a variable
+    assert "query" not in context.named_variables
+
+
+@pytest.mark.parametrize("run_eagerly", [True, False])
+def test_last_item_prediction_task_sampled_softmax_top_k(
+    sequence_testing_data: Dataset, run_eagerly
+):
+    inputs = ml.InputBlock(
+        sequence_testing_data.schema,
+        aggregation="concat",
+        seq=False,
+        max_seq_length=4,
+        masking="clm",
+        split_sparse=True,
+    )
+    task = ml.NextItemPredictionTask(
+        schema=sequence_testing_data.schema,
+        masking=True,
+        sampled_softmax=True,
+        num_sampled=20,
+        top_k=20,
+        top_k_chunk_size=1000,
+    )
+
+    model = inputs.connect(ml.MLPBlock([64]), task)
+    model.compile(optimizer="adam", run_eagerly=run_eagerly)
+    model.fit(sequence_testing_data, batch_size=50, epochs=1)
+    metrics = model.evaluate(sequence_testing_data, batch_size=50, return_dict=True)
+    assert metrics["loss"] > 0
+    assert 0 <= metrics["recall_at_10"] <= 1
+
+    with pytest.raises(ValueError) as excinfo:
+        ml.NextItemPredictionTask(schema=sequence_testing_data.schema, top_k=20)
+    assert "top_k is only supported with sampled_softmax" in str(excinfo.value)
@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 
+import numpy as np
 import pytest
 import tensorflow as tf
 
@@ -374,3 +375,136 @@ def test_cached_uniform_sampler_trying_add_sample_before_built():
         input_data = ml.EmbeddingWithMetadata(embeddings=None, metadata={})
         _ = cached_batches_sampler.sample()
     assert "The CachedUniformSampler layer was not built yet." in str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "probs",
+    [
+        np.array([0.5, 0.0, 0.1, 0.25, 0.15]),
+        np.array([0.0, 0.0, 5.0, 0.1, 0.2]),
+        np.ones(4),
+        np.random.RandomState(0).lognormal(sigma=2.0, size=10000),
+    ],
+)
+def test_build_alias_tables(probs):
+    from merlin.models.tf.blocks.sampling.cross_batch import build_alias_tables
+
+    probs = probs / probs.sum()
+    accept_probs, aliases = build_alias_tables(probs)
+
+    # Probability of each item implied by the alias tables
+    num_items = len(probs)
+    implied_probs = accept_probs / num_items
+    np.add.at(implied_probs, aliases, (1.0 - accept_probs) / num_items)
+    np.testing.assert_allclose(implied_probs, probs, atol=1e-6)
+
+
+def test_alias_popularity_sampler():
+    num_classes = 50
+    num_sampled = 20000
+    item_freq = np.random.randint(1, 1000, size=num_classes)
+    item_freq[:2] = 0
+    item_weights = tf.random.uniform(shape=(num_classes, 5), dtype=tf.float32)
+    item_embeddings = tf.random.uniform(shape=(10, 5), dtype=tf.float32)
+    item_ids = tf.random.uniform(shape=(10,), minval=1, maxval=num_classes, dtype=tf.int32)
+
+    sampler = ml.AliasPopularitySampler(item_freq, max_num_samples=num_sampled)
+
+    input_data = ml.EmbeddingWithMetadata(item_embeddings, {"item_id": item_ids})
+    output_data = sampler(input_data.__dict__, item_weights)
+
+    sampled_ids = output_data.metadata["item_id"]
+    assert sampled_ids.shape[0] == num_sampled
+    tf.assert_equal(tf.nn.embedding_lookup(item_weights, sampled_ids), output_data.embeddings)
+    # Items with zero frequency are never sampled
+    assert tf.reduce_all(sampled_ids >= 2)
+    sampled_freq = np.bincount(sampled_ids.numpy(), minlength=num_classes) / num_sampled
+    np.testing.assert_allclose(sampled_freq, item_freq / item_freq.sum(), atol=0.02)
+
+    log_q = sampler.sampling_log_q(output_data)
+    expected_log_q = np.log(num_sampled * item_freq[sampled_ids.numpy()] / item_freq.sum())
+    np.testing.assert_allclose(log_q.numpy(), expected_log_q, rtol=1e-4)
+
+    # Updating the frequencies rebuilds the alias tables
+    new_item_freq = np.zeros(num_classes)
+    new_item_freq[[5, 7]] = [1, 3]
+    sampler.update(new_item_freq)
+    output_data = sampler(input_data.__dict__, item_weights)
+    sampled_freq = np.bincount(output_data.metadata["item_id"].numpy(), minlength=num_classes)
+    assert set(np.flatnonzero(sampled_freq)) == {5, 7}
+    assert abs(sampled_freq[7] / num_sampled - 0.75) < 0.02
+
+
+def _top_k_excluding(queries, item_weights, positive_ids, k):
+    scores = tf.matmul(queries, item_weights, transpose_b=True).numpy()
+    scores[np.arange(len(positive_ids)), positive_ids] = -np.inf
+    return set(np.argsort(-scores, axis=1)[:, :k].reshape(-1).tolist())
+
+
+def test_hard_negative_sampler():
+    num_items, k = 50, 5
+    item_weights = tf.Variable(tf.random.uniform(shape=(num_items, 8)))
+    queries = tf.random.uniform(shape=(4, 8))
+    positive_ids = tf.constant([0, 1, 2, 3], dtype=tf.int32)
+    input_data = ml.EmbeddingWithMetadata(tf.zeros((4, 8)), {"item_id": positive_ids})
+
+    sampler = ml.HardNegativeSampler(k=k, refresh_every_n_steps=2, background_refresh=False)
+    output_data = sampler(input_data.__dict__, item_weights=item_weights, query_embeddings=queries)
+
+    sampled_ids = output_data.metadata["item_id"].numpy()
+    assert len(set(sampled_ids)) == len(sampled_ids)
+    assert set(sampled_ids) == _top_k_excluding(queries, item_weights, positive_ids, k)
+    tf.assert_equal(tf.gather(item_weights, sampled_ids), output_data.embeddings)
+
+    # The index is only refreshed every 2 steps
+    old_item_weights = tf.identity(item_weights)
+    item_weights.assign(tf.random.uniform(shape=(num_items, 8)))
+    tf.assert_equal(sampler.index.values, old_item_weights)
+    _ = sampler(input_data.__dict__, item_weights=item_weights, query_embeddings=queries)
+    tf.assert_equal(sampler.index.values, item_weights)
+
+
+def test_hard_negative_sampler_background_refresh():
+    item_weights = tf.Variable(tf.random.uniform(shape=(20, 8)))
+    input_data = ml.EmbeddingWithMetadata(tf.zeros((2, 8)), {"item_id": tf.constant([0, 1])})
+    sampler = ml.HardNegativeSampler(k=3, refresh_every_n_steps=1)
+
+    @tf.function
+    def train_step(queries):
+        sampled = sampler(input_data.__dict__, item_weights=item_weights, query_embeddings=queries)
+        return sampled.embeddings
+
+    _ = train_step(tf.random.uniform(shape=(2, 8)))
+    item_weights.assign(tf.random.uniform(shape=(20, 8)))
+    sampled_embeddings = train_step(tf.random.uniform(shape=(2, 8)))
+    sampler.wait_for_refresh()
+
+    assert sampled_embeddings.shape[0] <= 6
+    assert int(sampler.num_steps) == 2
+    tf.assert_equal(sampler.index.values, item_weights)
+
+
+@pytest.mark.parametrize("storage_dtype", ["float16", "bfloat16", "int8"])
+@pytest.mark.parametrize("sampler_class", [ml.CachedCrossBatchSampler, ml.CachedUniformSampler])
+def test_cached_samplers_low_precision_storage(storage_dtype, sampler_class):
+    sampler = sampler_class(
+        capacity=30, ignore_last_batch_on_sample=False, storage_dtype=storage_dtype
+    )
+
+    item_embeddings = tf.random.uniform(shape=(10, 8), minval=-1.0, maxval=1.0)
+    input_data = ml.EmbeddingWithMetadata(item_embeddings, {"item_id": tf.range(10)})
+    _ = sampler(input_data.__dict__)
+    # Updating the embeddings of existing items (for CachedUniformSampler)
+    item_embeddings = tf.random.uniform(shape=(10, 8), minval=-1.0, maxval=1.0)
+    input_data = ml.EmbeddingWithMetadata(item_embeddings, {"item_id": tf.range(10)})
+    output_data = sampler(input_data.__dict__)
+
+    assert sampler.item_embeddings_queue.storage.dtype == tf.as_dtype(storage_dtype)
+    assert output_data.embeddings.dtype == tf.float32
+    tf.debugging.assert_near(output_data.embeddings[-10:], item_embeddings, atol=1e-2)
+
+
+def test_cached_sampler_invalid_storage_dtype():
+    with pytest.raises(ValueError) as excinfo:
+        _ = ml.CachedCrossBatchSampler(capacity=10, storage_dtype="int32")
+    assert "Invalid storage_dtype: int32" in str(excinfo.value)
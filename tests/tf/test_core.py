@@ -107,6 +107,25 @@ def test_block_context(ecommerce_data: Dataset):
     assert out.shape[-1] == 64
 
 
+def test_block_context_features_passthrough(ecommerce_data: Dataset):
+    inputs = ml.InputBlock(ecommerce_data.schema)
+    dummy = DummyFeaturesBlock()
+    model = inputs.connect(ml.MLPBlock([64]), dummy, context=ml.ModelContext())
+    batch = ml.sample_batch(ecommerce_data, batch_size=100, include_targets=False)
+    _ = model(batch)
+
+    # The context features are passed as tensors, instead of being assigned to variables
+    item_ids = dummy.context[Tags.ITEM_ID]
+    assert not isinstance(item_ids, tf.Variable)
+    tf.debugging.assert_equal(tf.reshape(item_ids, (-1,)), tf.reshape(batch["item_id"], (-1,)))
+    assert tf.reduce_all(dummy.context.named_variables["item_id"] == 0)
+
+    out = tf.function(model)(batch)
+    assert out.shape[-1] == 64
+    # The tensors of the traced call are out of scope, so the placeholder variable is returned
+    assert isinstance(dummy.context[Tags.ITEM_ID], tf.Variable)
+
+
 @pytest.mark.parametrize("run_eagerly", [True])
 def test_block_context_model(ecommerce_data: Dataset, run_eagerly: bool, tmp_path):
     dummy = DummyFeaturesBlock()
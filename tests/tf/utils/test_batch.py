@@ -61,3 +61,93 @@ def test_two_tower_extracted_embeddings_are_equal(ecommerce_data: Dataset):
         item_embs_2 = item_embs_2.to_pandas()
 
     np.testing.assert_array_equal(item_embs_1.values, item_embs_2.values)
+
+
+def test_two_tower_in_memory_embeddings_match_saved_model(ecommerce_data: Dataset):
+    import numpy as np
+
+    two_tower = ml.TwoTowerBlock(ecommerce_data.schema, query_tower=ml.MLPBlock([64, 128]))
+
+    model = two_tower.connect(
+        ml.ItemRetrievalTask(ecommerce_data.schema, target_name="click", metrics=[])
+    )
+    model.compile(run_eagerly=True, optimizer="adam")
+    model.fit(ecommerce_data, batch_size=50, epochs=1)
+
+    saved_embs = model.item_embeddings(ecommerce_data, batch_size=10).compute()
+    in_memory_embs = model.item_embeddings(ecommerce_data, batch_size=10, in_memory=True).compute()
+
+    if not isinstance(saved_embs, pd.DataFrame):
+        saved_embs = saved_embs.to_pandas()
+        in_memory_embs = in_memory_embs.to_pandas()
+
+    np.testing.assert_allclose(saved_embs.values, in_memory_embs.values, rtol=1e-5)
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_two_tower_parallel_embeddings_keep_order(ecommerce_data: Dataset, in_memory):
+    import numpy as np
+
+    two_tower = ml.TwoTowerBlock(ecommerce_data.schema, query_tower=ml.MLPBlock([64, 128]))
+
+    model = two_tower.connect(
+        ml.ItemRetrievalTask(ecommerce_data.schema, target_name="click", metrics=[])
+    )
+    model.compile(run_eagerly=True, optimizer="adam")
+    model.fit(ecommerce_data, batch_size=50, epochs=1)
+
+    data = Dataset(ecommerce_data.to_ddf().repartition(npartitions=4), schema=ecommerce_data.schema)
+    sequential_embs = model.item_embeddings(data, batch_size=10, in_memory=in_memory).compute()
+    parallel_embs = model.item_embeddings(
+        data, batch_size=10, in_memory=in_memory, num_workers=4
+    ).compute()
+
+    if not isinstance(sequential_embs, pd.DataFrame):
+        sequential_embs = sequential_embs.to_pandas()
+        parallel_embs = parallel_embs.to_pandas()
+
+    np.testing.assert_array_equal(
+        sequential_embs["item_id"].values, parallel_embs["item_id"].values
+    )
+    np.testing.assert_allclose(sequential_embs.values, parallel_embs.values, rtol=1e-5)
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "npy"])
+def test_two_tower_streaming_item_embeddings_export(
+    tmp_path, ecommerce_data: Dataset, output_format
+):
+    import glob
+
+    import numpy as np
+
+    two_tower = ml.TwoTowerBlock(ecommerce_data.schema, query_tower=ml.MLPBlock([64, 128]))
+
+    model = two_tower.connect(
+        ml.ItemRetrievalTask(ecommerce_data.schema, target_name="click", metrics=[])
+    )
+    model.compile(run_eagerly=True, optimizer="adam")
+    model.fit(ecommerce_data, batch_size=50, epochs=1)
+
+    item_embs = model.item_embeddings(ecommerce_data, batch_size=10).compute()
+    if not isinstance(item_embs, pd.DataFrame):
+        item_embs = item_embs.to_pandas()
+    item_embs = item_embs.set_index("item_id")[[str(i) for i in range(128)]]
+
+    export_path = str(tmp_path / "item_embeddings")
+    model.export_item_embeddings(
+        ecommerce_data, export_path, batch_size=10, output_format=output_format
+    )
+
+    if output_format == "parquet":
+        exported = pd.read_parquet(export_path).set_index("item_id")
+    else:
+        ids = np.concatenate([np.load(f) for f in sorted(glob.glob(f"{export_path}/ids_*.npy"))])
+        embeddings = np.concatenate(
+            [np.load(f) for f in sorted(glob.glob(f"{export_path}/embeddings_*.npy"))]
+        )
+        exported = pd.DataFrame(embeddings, index=ids, columns=[str(i) for i in range(128)])
+
+    assert len(exported) == len(item_embs)
+    np.testing.assert_allclose(
+        exported.loc[item_embs.index].values, item_embs.values, rtol=1e-4, atol=1e-5
+    )
@@ -0,0 +1,37 @@
+#
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from merlin.models.tf.utils.tf_utils import dequantize_rows_int8, quantize_rows_int8
+
+
+@pytest.mark.parametrize("symmetric", [True, False])
+def test_quantize_rows_int8(symmetric):
+    values = tf.concat([tf.random.uniform((8, 16), 2.0, 3.0), tf.zeros((1, 16))], axis=0)
+    quantized, scales, zero_points = quantize_rows_int8(values, symmetric=symmetric)
+
+    assert quantized.dtype == tf.int8
+    assert scales.shape == (9,)
+    assert (zero_points is None) == symmetric
+    dequantized = dequantize_rows_int8(quantized, scales, zero_points, dtype=tf.float16)
+    assert dequantized.dtype == tf.float16
+    # The asymmetric quantization uses the whole int8 range for the rows
+    # which are not centered around zero
+    atol = 3.0 / 127 if symmetric else 1.0 / 255
+    np.testing.assert_allclose(dequantized.numpy(), values.numpy(), atol=atol)
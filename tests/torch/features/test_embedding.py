@@ -21,6 +21,7 @@ import pytest
 import torch
 
 import merlin.models.torch as ml
+from merlin.models.utils.schema_utils import categorical_domains
 from merlin.schema import Tags
 
 
@@ -68,6 +69,43 @@ def test_embedding_features_custom_init(torch_cat_features):
     )
 
 
+def test_embedding_features_fuse_lookups(torch_cat_features):
+    # Single-hot features, each with its own table
+    feature_config = {
+        name: ml.FeatureConfig(ml.TableConfig(100, 15, name=name)) for name in torch_cat_features
+    }
+    inputs = dict(torch_cat_features)
+    # Padded 2-D and (values, offsets) multi-hot features, sharing the same table
+    shared_table = ml.TableConfig(100, 15, name="shared")
+    inputs["padded"] = torch.tensor([[1, 2, 0], [3, 0, 0], [4, 5, 6]])
+    feature_config["padded"] = ml.FeatureConfig(shared_table)
+    inputs["values_offsets"] = (torch.tensor([[1], [2], [3]]), torch.tensor([[0], [2]]))
+    feature_config["values_offsets"] = ml.FeatureConfig(shared_table)
+
+    emb_module = ml.EmbeddingFeatures(feature_config)
+    fused_module = ml.EmbeddingFeatures(feature_config, fuse_lookups=True)
+    # Each feature has its own module when the lookups are not fused
+    assert len({id(m) for m in emb_module.embedding_tables.values()}) == len(feature_config)
+    # While the fused features with the same table share its rows
+    (fused_embedding_bag,) = fused_module.fused_embedding_bags
+    assert fused_embedding_bag.embedding_bag.num_embeddings == 100 * (len(torch_cat_features) + 1)
+    with torch.no_grad():
+        for name, module in emb_module.embedding_tables.items():
+            table_name = feature_config[name].table.name
+            module.weight.copy_(fused_embedding_bag.table_weight(table_name))
+
+    embeddings = emb_module(inputs)
+    fused_embeddings = fused_module(inputs)
+
+    assert list(fused_embeddings.keys()) == list(embeddings.keys())
+    assert fused_embeddings["padded"].shape == (3, 15)
+    assert fused_embeddings["values_offsets"].shape == (2, 15)
+    for name, emb in embeddings.items():
+        np.testing.assert_allclose(
+            fused_embeddings[name].detach().numpy(), emb.detach().numpy(), rtol=1e-6
+        )
+
+
 def test_table_config_invalid_embedding_initializer():
     with pytest.raises(ValueError) as excinfo:
         ml.TableConfig(100, dim=15, initializer="INVALID INITIALIZER")
@@ -88,6 +126,25 @@ def test_embedding_features_yoochoose(tabular_schema, torch_tabular_data):
     assert emb_module.item_embedding_table.num_embeddings == max_value + 1
 
 
+def test_embedding_features_yoochoose_fuse_lookups(tabular_schema, torch_tabular_data):
+    schema = tabular_schema.select_by_tag(Tags.CATEGORICAL)
+    domains = categorical_domains(schema)
+
+    # By default, each feature has its own table
+    emb_module = ml.EmbeddingFeatures.from_schema(schema)
+    assert {name: f.table.name for name, f in emb_module.feature_config.items()} == {
+        name: name for name in schema.column_names
+    }
+
+    # When the lookups are fused, the features with the same domain share the same table
+    fused_module = ml.EmbeddingFeatures.from_schema(schema, fuse_lookups=True)
+    assert {name: f.table.name for name, f in fused_module.feature_config.items()} == {
+        name: domains[name] for name in schema.column_names
+    }
+    embeddings = fused_module(torch_tabular_data)
+    assert sorted(embeddings.keys()) == sorted(schema.column_names)
+
+
 def test_embedding_features_yoochoose_custom_dims(tabular_schema, torch_tabular_data):
     schema = tabular_schema.select_by_tag(Tags.CATEGORICAL)
 
@@ -1,6 +1,10 @@
+import numpy as np
 import pytest
 
-from merlin.models.utils.schema_utils import get_embedding_size_from_cardinality
+from merlin.models.utils.schema_utils import (
+    categorical_frequencies_from_parquet,
+    get_embedding_size_from_cardinality,
+)
 
 
 @pytest.mark.parametrize(
@@ -59,3 +63,14 @@ def test_get_embedding_size_from_cardinality_multiple_of_8(cardinality_x_expecte
     cardinality, expected_dim = cardinality_x_expected_dim
     dim = get_embedding_size_from_cardinality(cardinality, multiplier, ensure_multiple_of_8=True)
     assert dim == expected_dim
+
+
+def test_categorical_frequencies_from_parquet(tmp_path):
+    import pandas as pd
+
+    path = str(tmp_path / "unique.item_id.parquet")
+    pd.DataFrame({"item_id": [None, 10, 20], "item_id_size": [None, 5.0, 2.0]}).to_parquet(path)
+
+    frequencies = categorical_frequencies_from_parquet(path, "item_id")
+
+    np.testing.assert_array_equal(frequencies, [0, 5, 2])